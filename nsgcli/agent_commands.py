@@ -6,6 +6,7 @@ This module implements subset of NetSpyGlass CLI commands
 
 """
 
+from . import agent_tail
 from . import api
 from . import sub_command
 from .exec_commands import ExecCommands
@@ -22,6 +23,28 @@ AGENT_LOG_DIR = '/opt/nsg-agent/var/logs'
 HELP = """
 Call agents to execute various commands.
 
+In place of the agent name you can use a comma-separated list of names, a glob, a regular
+expression in slashes or @file with agent names (one per line). The command is then sent
+to each selected agent separately, several at a time, and a summary of failed, slow and
+timed out agents is printed at the end. Options concurrency=N (default 8), timeout=SEC
+(default 60) and slow=SEC (default 10) can follow the selector. With 'tail -f' and 'log -f',
+concurrency=N and timeout=SEC apply to every poll of the agents and slow=SEC is not allowed.
+
+        Example:
+
+            agent web-1,web-2 measurements
+            agent 'web-*' timeout=30 tail -20 /opt/nsg-agent/var/logs/agent.log
+            agent /^dc1-/ concurrency=4 ping 8.8.8.8
+            agent @agents.txt restart
+
+When several agents reply, the same reply is printed once. With option dedup=content before
+the command, replies with identical output are printed once even if they come from different
+agents (with a list or glob, only replies of the same agent are compared).
+
+        Example:
+
+            agent all dedup=content get_configuration
+
 log:    retrieve agent's log file
         this command assumes standard directory structure on the agent where logs are
         located in /opt/nsg-agent/var/logs
@@ -31,11 +54,14 @@ log:    retrieve agent's log file
             agent <agent_name> log [-NN] <log_file_name>
 
 
-tail: tail a file on an agent.
+tail: tail a file on an agent. With -f, keep printing new lines of the file until interrupted
+      with Ctrl-C. New lines are checked every second or every interval=SEC. Works with 'log' too.
 
         Example:
 
             agent <agent_name> tail -100 /opt/nsg-agent/var/logs/agent.log
+            agent <agent_name> tail -f -20 /opt/nsg-agent/var/logs/agent.log
+            agent 'web-*' tail -f interval=5 /opt/nsg-agent/var/logs/agent.log
 
 
 probe_snmp: discover working snmp configuration for the device
@@ -128,32 +154,17 @@ traceroute: Run traceroute with destination address on given agent.
 """
 
 
-class HashableAgentCommandResponse(set):
-
-    def __init__(self, acr):
-        super(HashableAgentCommandResponse, self).__init__()
-        self.acr = acr
-
-    def __eq__(self, other):
-        return self.acr['uuid'] == other.acr['uuid']
-
-    def __hash__(self):
-        # print(self.acr.items())
-        return hash(self.acr['uuid'])
-
-    def __getitem__(self, item):
-        return self.acr.__getitem__(item)
-
-    def __str__(self):
-        return str(self.acr)
-
-
 class AgentCommands(sub_command.SubCommand, object):
     # prompt = "exec # "
+    accepts_dedup_option = True
 
     def __init__(self, agent_name, base_url, token, net_id, region=None):
         super(AgentCommands, self).__init__(base_url, token, net_id, region=region)
         self.agent_name = agent_name
+        # agents followed by 'tail -f', when the command was given for several agents, and the number
+        # of agents polled at the same time
+        self.follow_agents = None
+        self.follow_concurrency = api.DEFAULT_CONCURRENCY
         self.current_region = region
         if region is None:
             self.prompt = 'agent {0} # '.format(self.agent_name)
@@ -186,19 +197,52 @@ class AgentCommands(sub_command.SubCommand, object):
 
     def do_tail(self, args):
         """
-        tail a file on an agent.
+        tail a file on an agent. With -f, keep printing lines as they are added to the file
+        until interrupted with Ctrl-C; new lines are checked every second or every interval=SEC.
 
         Example: agent agent_name tail -100 /opt/nsg-agent/var/logs/agent.log
+                 agent agent_name tail -f -20 interval=5 /opt/nsg-agent/var/logs/agent.log
         """
+        if agent_tail.is_follow(args):
+            self.follow(args)
+            return
         request = CMD_TEMPLATE_URL_WITH_AGENT.format(self.netid, 'tail', self.agent_name, 'args=' + args)
 
-        response, error = api.call(self.base_url, 'GET', request, token=self.token, stream=True,
-                                   response_format='json_array', error_format='json_array')
+        response, error = self.agent_call(request)
         if error is None:
             for acr in response:
                 status = self.parse_status(acr)
                 self.print_agent_response(acr, status)
 
+    def follow(self, args, count=None):
+        try:
+            lines, interval, path = agent_tail.parse_tail_args(args)
+        except agent_tail.TailError as e:
+            print('ERROR: {0}'.format(e))
+            return
+        agents = self.follow_agents or [self.agent_name]
+        follower = agent_tail.LogFollower(lambda agent, window: self.fetch_tail(agent, path, window), agents,
+                                          lines=lines, interval=interval, concurrency=self.follow_concurrency)
+        follower.run(count=count)
+
+    def fetch_tail(self, agent, path, lines):
+        """
+        fetch the last lines of the file from the agent
+
+        :return: tuple (dictionary agent name -> list of lines, error)
+        """
+        request = CMD_TEMPLATE_URL_WITH_AGENT.format(self.netid, 'tail', agent, 'args=-{0} {1}'.format(lines, path))
+        response, error = self.agent_call(request, quiet=True)
+        if error is not None:
+            return None, error
+        replies = {}
+        for acr in response:
+            status = self.parse_status(acr)
+            if status != 'ok':
+                return None, status
+            replies.setdefault(acr.get('agent') or agent, []).extend(acr.get('response') or [])
+        return replies, None
+
     def do_probe_snmp(self, arg):
         """
         try to discover working snmp configuration for the device
@@ -209,8 +253,7 @@ class AgentCommands(sub_command.SubCommand, object):
         request = CMD_TEMPLATE_URL_WITH_AGENT.format(self.netid, 'discover-snmp-access', self.agent_name,
                                                      'address=' + args.pop(0) + '&args=' + ' '.join(args))
 
-        response, error = api.call(self.base_url, 'GET', request, token=self.token, stream=True,
-                                   response_format='json_array', error_format='json_array')
+        response, error = self.agent_call(request)
         if error is None:
             for acr in response:
                 status = self.parse_status(acr)
@@ -253,8 +296,7 @@ class AgentCommands(sub_command.SubCommand, object):
         request = CMD_TEMPLATE_URL_WITH_AGENT.format(self.netid, 'ping', self.agent_name,
                                                      'address=' + args.pop(0) + '&args=' + ' '.join(args))
 
-        response, error = api.call(self.base_url, 'GET', request, token=self.token, stream=True,
-                                   response_format='json_array', error_format='json_array')
+        response, error = self.agent_call(request)
         if error is None:
             for acr in response:
                 status = self.parse_status(acr)
@@ -279,8 +321,7 @@ class AgentCommands(sub_command.SubCommand, object):
                                            'address=' + args.pop(0) + '&args=' + ' '.join(args))
 
         headers = {'Accept-Encoding': ''}  # to turn off gzip encoding to make response streaming work
-        response, error = api.call(self.base_url, 'GET', request, token=self.token, headers=headers, stream=True,
-                                   response_format='json_array', error_format='json_array')
+        response, error = self.agent_call(request, headers=headers)
         if error is None:
             for acr in response:
                 fping_status = ExecCommands.parse_fping_status(acr)
@@ -422,8 +463,7 @@ class AgentCommands(sub_command.SubCommand, object):
 
         # This call returns list of AgentCommandResponse objects in json format
         headers = {'Accept-Encoding': ''}
-        response, error = api.call(self.base_url, 'GET', request, token=self.token, stream=True,
-                                   headers=headers, response_format='json_array', error_format='json_array')
+        response, error = self.agent_call(request, headers=headers)
         if error is None:
             for acr in response:
                 status = self.parse_status(acr)
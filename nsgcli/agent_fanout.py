@@ -0,0 +1,339 @@
+"""
+Sending agent commands to many agents at once
+
+Agents are selected by a comma-separated list of names, a glob ('web-*'), a regular expression
+in slashes ('/^web-[0-9]+$/') or a file with agent names, one per line ('@agents.txt'). Globs
+and regular expressions are matched against the names of agents in the cluster status. The
+command is sent to every selected agent separately, with at most `concurrency` requests in
+flight; output of every agent is printed as it arrives, prefixed with the agent name. An agent
+that has not finished within the timeout is abandoned and its output is suppressed. A summary
+of failed, slow and timed out agents is printed at the end.
+
+:copyright: (c) 2026 by Happy Gears, Inc
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import concurrent.futures
+import fnmatch
+import re
+import sys
+import threading
+import time
+
+from tabulate import tabulate
+
+from . import agent_commands
+from . import api
+from . import response_handlers
+from . import sub_command
+
+CLUSTER_STATUS_TEMPLATE = 'v2/nsg/cluster/net/{0}/status'
+AGENT_ROLE = 'agent'
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_TIMEOUT_SEC = 60
+DEFAULT_SLOW_SEC = 10
+
+# how often the main thread checks for agents that ran out of time, seconds
+POLL_INTERVAL_SEC = 0.1
+
+FANOUT_OPTIONS = ['concurrency', 'timeout', 'slow']
+
+GLOB_CHARS = '*?['
+
+STATUS_OK = 'ok'
+STATUS_FAILED = 'failed'
+STATUS_TIMEOUT = 'timeout'
+STATUS_SLOW = 'slow'
+
+
+class AgentSelectorError(Exception):
+    pass
+
+
+def is_regex(selector):
+    return len(selector) > 2 and selector.startswith('/') and selector.endswith('/')
+
+
+def is_multi_agent(selector):
+    """
+    True if the selector can match more than one agent. A plain agent name and 'all' are not
+    multi-agent selectors: these are sent to the server as before.
+    """
+    return (selector.startswith('@') or ',' in selector or is_regex(selector)
+            or any(c in selector for c in GLOB_CHARS))
+
+
+def read_agent_file(file_name):
+    """
+    read agent names from the file, one or more per line separated by whitespace or commas;
+    lines that start with '#' are ignored
+    """
+    try:
+        with open(file_name, 'r') as f:
+            return sub_command.read_names(f)
+    except OSError as e:
+        raise AgentSelectorError('can not read agent names from {0}: {1}'.format(file_name, e))
+
+
+def agent_names(status_json, region=None):
+    """
+    :return: sorted names of the cluster members that have role 'agent', optionally only those
+             in the given region
+    """
+    names = []
+    for member in status_json.get('members', []):
+        roles = (member.get('role') or '').split(',')
+        if AGENT_ROLE not in roles:
+            continue
+        if region and region not in (member.get('region') or '').split(','):
+            continue
+        names.append(member['name'])
+    return sorted(names)
+
+
+def select_agents(selector, known_agents):
+    """
+    :param selector:      agent selector, see module docstring
+    :param known_agents:  function that returns names of all agents; it is called only when the
+                          selector has globs or a regular expression
+    :return: list of selected agent names without duplicates, in the order of the selector
+    """
+    if selector.startswith('@'):
+        patterns = read_agent_file(selector[1:])
+    elif is_regex(selector):
+        patterns = [selector]
+    else:
+        patterns = [p for p in selector.split(',') if p]
+    names = []
+    agents = None
+    for pattern in patterns:
+        if is_regex(pattern) or any(c in pattern for c in GLOB_CHARS):
+            if agents is None:
+                agents = known_agents()
+            matched = match_agents(pattern, agents)
+            if not matched:
+                raise AgentSelectorError('no agents match "{0}"'.format(pattern))
+            names.extend(matched)
+        else:
+            # explicit names are used as given, the server reports unknown agents
+            names.append(pattern)
+    return list(dict.fromkeys(names))
+
+
+def match_agents(pattern, agents):
+    if is_regex(pattern):
+        try:
+            regex = re.compile(pattern[1:-1])
+        except re.error as e:
+            raise AgentSelectorError('invalid regular expression {0}: {1}'.format(pattern, e))
+        return [a for a in agents if regex.search(a)]
+    return [a for a in agents if fnmatch.fnmatchcase(a, pattern)]
+
+
+def parse_fanout_options(words):
+    """
+    take leading options 'concurrency=N', 'timeout=SEC' and 'slow=SEC' off the list of words
+
+    :return: dictionary option name -> value
+    """
+    options = {}
+    while words and '=' in words[0] and words[0].split('=')[0] in FANOUT_OPTIONS:
+        name, value = words.pop(0).split('=', 1)
+        try:
+            options[name] = int(value) if name == 'concurrency' else float(value)
+        except ValueError:
+            raise AgentSelectorError('invalid value of option {0}: "{1}"'.format(name, value))
+        if options[name] <= 0:
+            raise AgentSelectorError('option {0} must be greater than 0'.format(name))
+    return options
+
+
+class AgentResult(object):
+
+    def __init__(self, agent):
+        self.agent = agent
+        self.started = None
+        self.finished = None
+        self.replies = 0
+        self.errors = []
+        self.timed_out = False
+        self.response = None  # streaming response of the agent command, closed when the agent times out
+
+    @property
+    def duration(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def status(self, slow_sec):
+        if self.timed_out:
+            return STATUS_TIMEOUT
+        if self.errors or not self.replies:
+            return STATUS_FAILED
+        if self.duration > slow_sec:
+            return STATUS_SLOW
+        return STATUS_OK
+
+    def error(self):
+        if self.errors:
+            return '; '.join(dict.fromkeys(self.errors))
+        if not self.replies and not self.timed_out:
+            return 'no reply'
+        return ''
+
+
+class FanOutAgentCommands(agent_commands.AgentCommands):
+    """
+    AgentCommands for one agent of the fan-out: records replies and errors in the AgentResult
+    and sends output lines to the fan-out instead of printing them
+    """
+
+    def __init__(self, fanout, result):
+        super(FanOutAgentCommands, self).__init__(result.agent, fanout.base_url, fanout.token, fanout.netid,
+                                                  region=fanout.region)
+        self.fanout = fanout
+        self.result = result
+        self.agent_timeout_sec = fanout.timeout_sec
+
+    def agent_call(self, req, method='GET', headers=None, quiet=True):
+        response, error = api.call(self.base_url, method, req, token=self.token, headers=headers, stream=True,
+                                   timeout=self.agent_timeout_sec, error_format='json_array', quiet=True)
+        if error is not None:
+            self.result.errors.append(str(error).strip())
+            return None, error
+        if not self.fanout.track_response(self.result, response):
+            return iter([]), None
+        return self.track_replies(response_handlers.JsonArrayResponseHandler.iter_data(response)), None
+
+    def track_replies(self, response):
+        for acr in response:
+            self.result.replies += 1
+            status = self.parse_status(acr)
+            if status != 'ok':
+                self.result.errors.append(status)
+            yield acr
+
+    def print_agent_response(self, acr, status):
+        self.fanout.emit(self.result, self.format_agent_response(acr, status))
+
+
+class AgentFanOut(object):
+    """
+    :param agents:        names of the agents to send the command to
+    :param concurrency:   max number of agents called at the same time
+    :param timeout_sec:   time each agent has to finish; also used as the timeout of its api calls
+    :param slow_sec:      agents that take longer than this are reported as slow
+    """
+
+    def __init__(self, base_url, token, netid, agents, region=None, concurrency=DEFAULT_CONCURRENCY,
+                 timeout_sec=DEFAULT_TIMEOUT_SEC, slow_sec=DEFAULT_SLOW_SEC, out=None):
+        self.base_url = base_url
+        self.token = token
+        self.netid = netid
+        self.region = region
+        self.agents = agents
+        self.concurrency = concurrency
+        self.timeout_sec = timeout_sec
+        self.slow_sec = slow_sec
+        self.out = out
+        self.results = [AgentResult(agent) for agent in agents]
+        self._lock = threading.Lock()
+
+    def emit(self, result, lines):
+        with self._lock:
+            # an agent that ran out of time may still be running; its output is dropped
+            if result.timed_out:
+                return
+            out = self.out or sys.stdout
+            for line in lines:
+                out.write(line + '\n')
+            out.flush()
+
+    def track_response(self, result, response):
+        """
+        remember the streaming response of the agent so that it can be closed when the agent runs
+        out of time
+
+        :return: False if the agent has already timed out; the response is closed then
+        """
+        with self._lock:
+            result.response = response
+            if not result.timed_out:
+                return True
+        response.close()
+        return False
+
+    def run(self, command):
+        """
+        send the command (e.g. 'tail -100 /opt/nsg-agent/var/logs/agent.log') to all agents
+        """
+        if not self.results:
+            return self
+        workers = max(1, min(self.concurrency, len(self.results)))
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        futures = []
+        try:
+            for result in self.results:
+                futures.append(executor.submit(self.run_agent, result, command))
+            pending = dict(zip(futures, self.results))
+            while pending:
+                done, _ = concurrent.futures.wait(list(pending), timeout=POLL_INTERVAL_SEC,
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    del pending[future]
+                now = time.monotonic()
+                for future, result in list(pending.items()):
+                    if result.started is not None and now - result.started > self.timeout_sec:
+                        with self._lock:
+                            result.timed_out = True
+                            result.finished = now
+                            response = result.response
+                        # the api timeout does not limit streaming calls while the agent keeps sending
+                        # replies; closing the response makes the next read fail and the worker exit
+                        if response is not None:
+                            response.close()
+                        del pending[future]
+        finally:
+            # agents that have not started yet are cancelled (shutdown(cancel_futures=True) requires
+            # python 3.9). Worker threads are joined at interpreter exit, which is why responses of
+            # abandoned agents are closed above
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+        return self
+
+    def run_agent(self, result, command):
+        result.started = time.monotonic()
+        try:
+            FanOutAgentCommands(self, result).onecmd(command)
+        except Exception as e:
+            # reading the response fails once it has been closed because the agent timed out
+            if not result.timed_out:
+                result.errors.append(str(e))
+        finally:
+            with self._lock:
+                if not result.timed_out:
+                    result.finished = time.monotonic()
+
+    def counts(self):
+        counts = {STATUS_OK: 0, STATUS_SLOW: 0, STATUS_FAILED: 0, STATUS_TIMEOUT: 0}
+        for result in self.results:
+            counts[result.status(self.slow_sec)] += 1
+        return counts
+
+    def failed(self):
+        return any(r.status(self.slow_sec) in [STATUS_FAILED, STATUS_TIMEOUT] for r in self.results)
+
+    def print_summary(self):
+        out = self.out or sys.stdout
+        counts = self.counts()
+        out.write('Agents: {0}, ok: {1}, slow: {2}, failed: {3}, timed out: {4}\n'.format(
+            len(self.results), counts[STATUS_OK], counts[STATUS_SLOW], counts[STATUS_FAILED], counts[STATUS_TIMEOUT]))
+        table = [[r.agent, r.status(self.slow_sec), round(r.duration, 3), r.error()]
+                 for r in sorted(self.results, key=lambda r: -r.duration)
+                 if r.status(self.slow_sec) != STATUS_OK]
+        if table:
+            out.write(tabulate(table, ['agent', 'status', 'time (s)', 'error'], tablefmt='fancy_outline') + '\n')
+        out.flush()
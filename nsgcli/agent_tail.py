@@ -0,0 +1,221 @@
+"""
+Following log files on agents ('agent <agent_name> tail -f file')
+
+Agents can only return the last N lines of a file, so the file is followed by polling: every
+poll fetches the last `window` lines and compares them with the lines seen before. Lines are
+compared by their hashes: the last ANCHOR_LINES lines of the previous window are searched for
+in the new window, from its end, and only the lines after them are printed. If they are not
+found (more lines were written between polls than the window holds, or the file has been
+rotated), the window is doubled for the next polls so that fewer lines are missed, and it
+shrinks back as the file gets quieter. If they are found more than once (the file repeats the
+same lines, e.g. heartbeats) and there are lines after the last match, these are printed after
+a marker that says that lines may be missing.
+
+The same file can be followed on several agents at once: all agents are polled concurrently
+and lines are printed as they arrive, prefixed with the agent name.
+
+:copyright: (c) 2026 by Happy Gears, Inc
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import sys
+import time
+
+from . import api
+
+DEFAULT_LINES = 10
+DEFAULT_INTERVAL_SEC = 1.0
+MIN_WINDOW = 50
+MAX_WINDOW = 5000
+# number of the last lines of the previous poll that are looked for in the next one
+ANCHOR_LINES = 20
+
+FOLLOW_FLAG = '-f'
+GAP_MESSAGE = '... no overlap with the previous poll, some lines may be missing'
+AMBIGUOUS_MESSAGE = '... repeated lines, could not tell which ones are new, some lines may be missing'
+
+
+class TailError(Exception):
+    pass
+
+
+def is_follow(args):
+    """
+    True if arguments of the command 'tail' or 'log' request follow mode
+    """
+    return FOLLOW_FLAG in args.split()
+
+
+def parse_tail_args(arg):
+    """
+    parse arguments of the command 'tail -f [-NN] [interval=SEC] file'
+
+    :return: tuple (number of lines to show initially, polling interval, file name)
+    """
+    lines = DEFAULT_LINES
+    interval = DEFAULT_INTERVAL_SEC
+    path = None
+    for word in arg.split():
+        if word == FOLLOW_FLAG:
+            continue
+        if word.startswith('-') and word[1:].isdigit():
+            lines = int(word[1:])
+        elif word.startswith('interval='):
+            try:
+                interval = float(word.split('=', 1)[1])
+            except ValueError:
+                raise TailError('interval must be a number of seconds')
+            if interval <= 0:
+                raise TailError('interval must be greater than 0')
+        elif path is None:
+            path = word
+        else:
+            raise TailError('unexpected argument "{0}"'.format(word))
+    if path is None:
+        raise TailError('usage: tail -f [-NN] [interval=SEC] file')
+    return lines, interval, path
+
+
+def find_overlap(previous, current, anchor_lines=ANCHOR_LINES):
+    """
+    find where the last `anchor_lines` lines of the previous poll are in this poll, searching from
+    the end; the search stops at the second match, so it takes linear time.
+
+    :param previous:  hashes of the lines returned by the previous poll
+    :param current:   hashes of the lines returned by this poll
+    :return: tuple (number of lines at the beginning of `current` that were seen in the previous
+             poll, True if the anchor lines were found more than once and the last match was used)
+    """
+    size = min(anchor_lines, len(previous))
+    if not size:
+        return 0, False
+    anchor = previous[-size:]
+    matches = []
+    for end in range(len(current), size - 1, -1):
+        if current[end - 1] == anchor[-1] and current[end - size:end] == anchor:
+            matches.append(end)
+            if len(matches) > 1:
+                break
+    if not matches:
+        return 0, False
+    return matches[0], len(matches) > 1
+
+
+class FollowedFile(object):
+    """
+    State of one file on one agent
+    """
+
+    def __init__(self, agent, window):
+        self.agent = agent
+        self.window = window
+        self.hashes = None  # hashes of the lines of the last poll, None before the first poll
+        self.gaps = 0
+
+    def update(self, lines, initial_lines):
+        """
+        :return: tuple (new lines, GAP_MESSAGE or AMBIGUOUS_MESSAGE if lines may have been missed, or None)
+        """
+        hashes = [hash(line) for line in lines]
+        if self.hashes is None:
+            self.hashes = hashes
+            return lines[-initial_lines:] if initial_lines else [], None
+        previous = self.hashes
+        if len(previous) < MIN_WINDOW and hashes[:len(previous)] == previous:
+            # the previous poll returned the whole file, the file has grown since then
+            overlap, ambiguous = len(previous), False
+        else:
+            overlap, ambiguous = find_overlap(previous, hashes)
+        gap = overlap == 0 and len(previous) > 0 and len(lines) >= self.window
+        self.hashes = hashes
+        new_lines = lines[overlap:]
+        if gap:
+            self.gaps += 1
+            self.window = min(self.window * 2, MAX_WINDOW)
+        elif len(new_lines) * 4 < self.window and self.window > MIN_WINDOW:
+            self.window = max(self.window // 2, MIN_WINDOW)
+        if gap:
+            return new_lines, GAP_MESSAGE
+        if ambiguous and new_lines:
+            # when the file has not changed, the last match is at the end of this poll and nothing
+            # can have been missed
+            self.gaps += 1
+            return new_lines, AMBIGUOUS_MESSAGE
+        return new_lines, None
+
+
+class LogFollower(object):
+    """
+    :param fetch:   function (agent, number of lines) -> (dictionary agent -> list of lines, error),
+                    see AgentCommands.fetch_tail(). The server can answer for more agents than
+                    were asked (e.g. 'all'), the lines of every agent are followed separately.
+    :param agents:  names of the agents to poll
+    """
+
+    def __init__(self, fetch, agents, lines=DEFAULT_LINES, interval=DEFAULT_INTERVAL_SEC,
+                 concurrency=api.DEFAULT_CONCURRENCY, out=None):
+        self.fetch = fetch
+        self.agents = agents
+        self.lines = lines
+        self.interval = interval
+        self.concurrency = concurrency
+        self.out = out
+        self.files = {}  # agent name as reported in replies -> FollowedFile
+        self.errors = {}  # agent name as requested -> last error
+        self.windows = {agent: max(MIN_WINDOW, lines) for agent in agents}
+        self.polls = 0
+
+    def _write(self, lines):
+        out = self.out if self.out is not None else sys.stdout
+        for line in lines:
+            out.write(line + '\n')
+        out.flush()
+
+    def run(self, count=None):
+        """
+        poll agents until interrupted with Ctrl-C or until they have been polled `count` times
+        """
+        next_tick = time.monotonic()
+        try:
+            while count is None or self.polls < count:
+                self.poll()
+                next_tick += self.interval
+                if count is not None and self.polls >= count:
+                    break
+                time.sleep(max(0, next_tick - time.monotonic()))
+        except KeyboardInterrupt:
+            pass
+
+    def poll(self):
+        self.polls += 1
+        requests = [(agent, self.windows[agent]) for agent in self.agents]
+        for idx, (replies, error) in api.iter_concurrently(lambda r: self.fetch_safely(*r), requests,
+                                                           concurrency=self.concurrency):
+            self.update(self.agents[idx], replies, error)
+
+    def fetch_safely(self, agent, window):
+        try:
+            return self.fetch(agent, window)
+        except Exception as e:
+            return None, str(e)
+
+    def update(self, agent, replies, error):
+        if error is not None:
+            # print errors once, not on every poll
+            if self.errors.get(agent) != error:
+                self._write(['{0} | ERROR: {1}'.format(agent, error)])
+            self.errors[agent] = error
+            return
+        self.errors.pop(agent, None)
+        for name, lines in replies.items():
+            followed = self.files.get(name)
+            if followed is None:
+                followed = self.files[name] = FollowedFile(name, self.windows[agent])
+            new_lines, message = followed.update(lines, self.lines)
+            output = ['{0} | {1}'.format(name, message)] if message else []
+            output.extend('{0} | {1}'.format(name, line) for line in new_lines)
+            self._write(output)
+        if replies:
+            # one request returns lines of all agents that replied, it has to fit the busiest one
+            self.windows[agent] = max(self.files[name].window for name in replies)
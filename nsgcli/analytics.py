@@ -0,0 +1,361 @@
+"""
+Client side post-processing of NsgQL table results
+
+NsgQL query can be followed by one or more processing stages separated by '|':
+
+    SELECT device, component, cpuUtil FROM cpuUtil | groupby device agg p95(cpuUtil), count() | top 20
+
+Rows of the query result are loaded into numpy column arrays, stages are applied to them
+one after another and the result is returned in the same 'columns'/'rows' structure the
+server returns, so that it can be printed by ResponseFormatter or written by the exporters.
+
+Stages:
+
+    groupby col1[,col2...] agg func(col)[, func(col)...]
+                            func is one of count, sum, min, max, mean, median or pNN (percentile)
+    top N [by col] [asc]    N rows with the largest (or smallest) values in the column, default
+                            is the last column
+    hist col [bins=N]       histogram of the values of the column
+    percentiles col [p1,p2,...]
+                            min, max, mean and percentiles of the values of the column
+
+:copyright: (c) 2026 by Happy Gears, Inc
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import numbers
+import re
+
+import numpy as np
+
+STAGE_GROUPBY = 'groupby'
+STAGE_TOP = 'top'
+STAGE_HIST = 'hist'
+STAGE_PERCENTILES = 'percentiles'
+
+STAGES = [STAGE_GROUPBY, STAGE_TOP, STAGE_HIST, STAGE_PERCENTILES]
+
+DEFAULT_HIST_BINS = 10
+DEFAULT_PERCENTILES = [50, 90, 95, 99]
+
+QUOTED_STRING = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'')
+STAGE_SEPARATOR = re.compile(r'\|\s*(?=(?:{0})\b)'.format('|'.join(STAGES)), re.IGNORECASE)
+AGG_FUNCTION = re.compile(r'^(\w+)\(\s*([^)]*?)\s*\)$')
+PERCENTILE_FUNCTION = re.compile(r'^p(\d+(?:\.\d+)?)$')
+
+
+class AnalyticsError(Exception):
+    pass
+
+
+def split_pipeline(command):
+    """
+    split the command into NsgQL query and the list of processing stages. Only '|' followed
+    by a stage name and not inside of a quoted string starts a stage.
+
+    :return: tuple (query, list of stage strings)
+    """
+    # replace quoted strings with placeholders of the same length to find separators outside of them
+    masked = QUOTED_STRING.sub(lambda m: '"' + 'x' * (len(m.group(0)) - 2) + '"', command)
+    positions = [m.start() for m in STAGE_SEPARATOR.finditer(masked)]
+    if not positions:
+        return command.strip(), []
+    query = command[:positions[0]].strip()
+    stages = []
+    for start, end in zip(positions, positions[1:] + [len(command)]):
+        stages.append(command[start + 1:end].strip())
+    return query, stages
+
+
+def has_stages(command):
+    return bool(split_pipeline(command)[1])
+
+
+class ColumnTable(object):
+    """
+    Table stored as a list of column names and a list of numpy arrays, one per column. Columns
+    where all values are numbers or null are stored as float arrays with NaN for null, other
+    columns are stored as object arrays.
+    """
+
+    def __init__(self, names, arrays):
+        self.names = names
+        self.arrays = arrays
+
+    @classmethod
+    def from_table(cls, table):
+        """
+        load NsgQL table result (dictionary or nsgql_stream.StreamedTable); rows are read one at a time
+        """
+        names = [col['text'] for col in table.get('columns', [])]
+        values = [[] for _ in names]
+        for row in table.get('rows', []):
+            for idx, column in enumerate(values):
+                column.append(row[idx] if idx < len(row) else None)
+        return cls(names, [to_array(column) for column in values])
+
+    def __len__(self):
+        return len(self.arrays[0]) if self.arrays else 0
+
+    def column(self, name):
+        try:
+            return self.arrays[self.names.index(name)]
+        except ValueError:
+            raise AnalyticsError('column "{0}" is not in the result, columns are: {1}'.format(
+                name, ', '.join(self.names)))
+
+    def numeric_column(self, name):
+        values = self.column(name)
+        if values.dtype != np.float64:
+            raise AnalyticsError('column "{0}" is not numeric'.format(name))
+        return values
+
+    def take(self, indexes):
+        return ColumnTable(self.names, [arr[indexes] for arr in self.arrays])
+
+    def to_table(self):
+        """
+        convert to the dictionary with 'columns' and 'rows', like the one returned by the server.
+        Rows are generated one at a time.
+        """
+        return {'columns': [{'text': name} for name in self.names], 'rows': self.rows()}
+
+    def rows(self):
+        columns = [[to_python(value) for value in arr.tolist()] for arr in self.arrays]
+        for row in zip(*columns):
+            yield list(row)
+
+
+def to_array(values):
+    if all(value is None or (isinstance(value, numbers.Number) and not isinstance(value, bool))
+           for value in values):
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def to_python(value):
+    if isinstance(value, float):
+        if value != value:
+            return None
+        if value.is_integer() and abs(value) < 2 ** 53:
+            return int(value)
+    return value
+
+
+def factorize(values):
+    """
+    :return: tuple (codes, unique values) such that unique values[codes] == values
+    """
+    if values.dtype == np.float64:
+        uniques, codes = np.unique(values, return_inverse=True)
+        return codes.reshape(-1), uniques
+    keys = np.array(['' if value is None else str(value) for value in values], dtype=object)
+    uniques, first, codes = np.unique(keys, return_index=True, return_inverse=True)
+    return codes.reshape(-1), values[first]
+
+
+def group_percentile(sorted_values, starts, counts, q):
+    """
+    percentile q of every group, with linear interpolation like numpy.percentile. Values of each
+    group must be sorted with NaN at the end; counts are numbers of non-NaN values in groups.
+    """
+    result = np.full(len(starts), np.nan)
+    has_values = counts > 0
+    position = starts + (counts - 1) * (q / 100.0)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.ceil(position).astype(np.int64)
+    lower = np.where(has_values, lower, 0)
+    upper = np.where(has_values, upper, 0)
+    fraction = position - np.floor(position)
+    interpolated = sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+    result[has_values] = interpolated[has_values]
+    return result
+
+
+def check_percentile(p):
+    if not 0 <= p <= 100:
+        raise AnalyticsError('percentile must be between 0 and 100, got {0:g}'.format(p))
+
+
+def parse_aggregates(text):
+    """
+    :return: list of tuples (title, function name, column name or None)
+    """
+    aggregates = []
+    for item in [i.strip() for i in text.split(',') if i.strip()]:
+        match = AGG_FUNCTION.match(item)
+        if item == 'count':
+            match = AGG_FUNCTION.match('count()')
+        if not match:
+            raise AnalyticsError('invalid aggregate "{0}", expected function(column)'.format(item))
+        func, column = match.group(1).lower(), match.group(2) or None
+        percentile = PERCENTILE_FUNCTION.match(func)
+        if func not in ['count', 'sum', 'min', 'max', 'mean', 'avg', 'median'] and not percentile:
+            raise AnalyticsError('unknown aggregate function "{0}"'.format(func))
+        if percentile:
+            check_percentile(float(percentile.group(1)))
+        if func != 'count' and column is None:
+            raise AnalyticsError('aggregate function "{0}" requires column'.format(func))
+        aggregates.append(('{0}({1})'.format(func, column or ''), func, column))
+    return aggregates
+
+
+def groupby(table, args):
+    keys_text, sep, agg_text = args.partition(' agg ')
+    key_names = [k.strip() for k in keys_text.split(',') if k.strip()]
+    if not key_names or not sep:
+        raise AnalyticsError('usage: groupby col1[,col2...] agg func(col)[, func(col)...]')
+    aggregates = parse_aggregates(agg_text)
+    key_columns = [table.column(name) for name in key_names]
+    if not len(table):
+        return ColumnTable(key_names + [a[0] for a in aggregates], [np.array([])] * (len(key_names) + len(aggregates)))
+
+    # combine codes of all key columns into one group id per row; ids are renumbered after
+    # every column so that they never overflow
+    group = np.zeros(len(table), dtype=np.int64)
+    for column in key_columns:
+        codes, uniques = factorize(column)
+        group = np.unique(group * len(uniques) + codes, return_inverse=True)[1].reshape(-1)
+    _, group_index = np.unique(group, return_index=True)
+    order = np.argsort(group, kind='stable')
+    sorted_group = group[order]
+    starts = np.flatnonzero(np.r_[True, sorted_group[1:] != sorted_group[:-1]])
+    sizes = np.diff(np.r_[starts, len(sorted_group)])
+
+    arrays = [column[group_index] for column in key_columns]
+    for title, func, column_name in aggregates:
+        if column_name is None:
+            arrays.append(sizes.astype(np.float64))
+            continue
+        values = table.numeric_column(column_name)
+        # sort values within each group, NaN last
+        value_order = np.lexsort((values, group))
+        sorted_values = values[value_order]
+        valid = ~np.isnan(sorted_values)
+        counts = np.add.reduceat(valid.astype(np.int64), starts)
+        if func == 'count':
+            arrays.append(counts.astype(np.float64))
+        elif func == 'sum':
+            arrays.append(np.add.reduceat(np.where(valid, sorted_values, 0.0), starts))
+        elif func in ['mean', 'avg']:
+            sums = np.add.reduceat(np.where(valid, sorted_values, 0.0), starts)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                arrays.append(np.where(counts > 0, sums / np.maximum(counts, 1), np.nan))
+        elif func == 'min':
+            arrays.append(np.fmin.reduceat(sorted_values, starts))
+        elif func == 'max':
+            arrays.append(np.fmax.reduceat(sorted_values, starts))
+        else:
+            q = 50.0 if func == 'median' else float(PERCENTILE_FUNCTION.match(func).group(1))
+            arrays.append(group_percentile(sorted_values, starts, counts, q))
+    return ColumnTable(key_names + [a[0] for a in aggregates], arrays)
+
+
+def top(table, args):
+    words = args.split()
+    usage = 'usage: top N [by col] [asc]'
+    try:
+        count = int(words.pop(0))
+    except (IndexError, ValueError):
+        raise AnalyticsError(usage)
+    if count < 1:
+        raise AnalyticsError('N must be greater than 0')
+    column_name = table.names[-1] if table.names else None
+    ascending = False
+    while words:
+        word = words.pop(0).lower()
+        if word == 'by' and words:
+            column_name = words.pop(0)
+        elif word in ['asc', 'desc']:
+            ascending = word == 'asc'
+        else:
+            raise AnalyticsError(usage)
+    if column_name is None or not len(table):
+        return table
+    values = table.column(column_name)
+    if values.dtype == np.float64:
+        # NaN goes last in both directions
+        keys = values if ascending else -values
+        order = np.argsort(keys, kind='stable')
+    else:
+        keys = np.array(['' if value is None else str(value) for value in values], dtype=object)
+        order = np.argsort(keys, kind='stable')
+        if not ascending:
+            order = order[::-1]
+    return table.take(order[:count])
+
+
+def hist(table, args):
+    words = args.split()
+    if not words:
+        raise AnalyticsError('usage: hist col [bins=N]')
+    bins = DEFAULT_HIST_BINS
+    for word in words[1:]:
+        if word.startswith('bins='):
+            try:
+                bins = int(word.split('=', 1)[1])
+            except ValueError:
+                raise AnalyticsError('bins must be an integer')
+        else:
+            raise AnalyticsError('usage: hist col [bins=N]')
+    if bins < 1:
+        raise AnalyticsError('bins must be greater than 0')
+    values = table.numeric_column(words[0])
+    values = values[~np.isnan(values)]
+    counts, edges = np.histogram(values, bins=bins)
+    return ColumnTable(['from', 'to', 'count'], [edges[:-1], edges[1:], counts.astype(np.float64)])
+
+
+def percentiles(table, args):
+    words = args.split()
+    if not words or len(words) > 2:
+        raise AnalyticsError('usage: percentiles col [p1,p2,...]')
+    ps = DEFAULT_PERCENTILES
+    if len(words) == 2:
+        try:
+            ps = [float(p) for p in words[1].split(',') if p]
+        except ValueError:
+            raise AnalyticsError('percentiles must be numbers')
+        if not ps:
+            raise AnalyticsError('usage: percentiles col [p1,p2,...]')
+        for p in ps:
+            check_percentile(p)
+    values = table.numeric_column(words[0])
+    values = values[~np.isnan(values)]
+    names = ['count', 'min', 'mean'] + ['p{0:g}'.format(p) for p in ps] + ['max']
+    if len(values):
+        stats = [len(values), values.min(), values.mean()] + list(np.percentile(values, ps)) + [values.max()]
+    else:
+        stats = [0] + [np.nan] * (len(names) - 1)
+    return ColumnTable(names, [np.array([s], dtype=np.float64) for s in stats])
+
+
+STAGE_FUNCTIONS = {
+    STAGE_GROUPBY: groupby,
+    STAGE_TOP: top,
+    STAGE_HIST: hist,
+    STAGE_PERCENTILES: percentiles,
+}
+
+
+def apply_stages(table, stages):
+    """
+    apply processing stages to the NsgQL table result and return the result as a dictionary
+    with 'columns' and 'rows'
+    """
+    column_table = ColumnTable.from_table(table)
+    for stage in stages:
+        name, _, args = stage.partition(' ')
+        func = STAGE_FUNCTIONS.get(name.lower())
+        if func is None:
+            raise AnalyticsError('unknown stage "{0}", expected one of {1}'.format(name, STAGES))
+        column_table = func(column_table, args.strip())
+    result = column_table.to_table()
+    for key in ['server', 'processingTimeMs', 'queryId']:
+        value = table.get(key)
+        if value is not None:
+            result[key] = value
+    return result
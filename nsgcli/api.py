@@ -6,10 +6,16 @@ This module implements the NetSpyGlass API
 
 """
 
+import concurrent.futures
 import copy
+import threading
+from urllib.parse import urlsplit
 
 import urllib3
+from requests.adapters import HTTPAdapter
 from requests_unixsocket import Session
+from requests_unixsocket import UnixAdapter
+from requests_unixsocket.adapters import UnixHTTPConnectionPool
 
 from . import error_handlers
 from . import response_handlers
@@ -19,9 +25,134 @@ try:
 except ImportError:
     import http.client
 
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONCURRENCY = 8
+
+# error returned by call() when the request could not be sent or the response could not be
+# received, as opposed to errors reported by the server
+REQUEST_ERROR_TEMPLATE = 'Received error when making request to endpoint: {}. Error: {}'
+
+NOT_MODIFIED = 304
+
+
+class ApiError(str):
+    """
+    error message returned by call(). status_code is the HTTP status of the response, or None
+    if the request could not be sent or the response could not be received
+    """
+
+    def __new__(cls, message, status_code=None):
+        error = super(ApiError, cls).__new__(cls, message)
+        error.status_code = status_code
+        return error
+
+    def is_transient(self):
+        """
+        True if the same request may succeed when it is repeated: transport errors and 5xx responses
+        """
+        return self.status_code is None or self.status_code >= 500
+
+
+# process-wide session pool: one keep-alive Session per base url (scheme + host:port or unix socket path)
+_pool_size = DEFAULT_POOL_SIZE
+_keep_alive = True
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def configure_sessions(pool_size=DEFAULT_POOL_SIZE, keep_alive=True):
+    """
+    Configure the process-wide session pool. Sessions that have already been created are
+    closed so that subsequent calls pick up new settings.
+
+    :param pool_size:    - max number of connections kept open per base url
+    :param keep_alive:   - if False, every request is sent with "Connection: close" and
+                           connections are not reused
+    """
+    global _pool_size, _keep_alive
+    with _sessions_lock:
+        _pool_size = max(1, int(pool_size))
+        _keep_alive = keep_alive
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def close_sessions():
+    """
+    Close all pooled sessions and their connections
+    """
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def session_key(url):
+    """
+    Sessions are shared by all urls with the same scheme and network location. For
+    'http+unix://' urls the network location is the (url-encoded) path to the socket.
+    """
+    parts = urlsplit(url)
+    return parts.scheme, parts.netloc
+
+
+class UnixSocketConnectionPool(UnixHTTPConnectionPool):
+    """
+    UnixHTTPConnectionPool that keeps up to maxsize connections open
+    """
+
+    def __init__(self, socket_url, timeout, maxsize):
+        urllib3.HTTPConnectionPool.__init__(self, 'localhost', timeout=timeout, maxsize=maxsize)
+        self.socket_path = socket_url
+        self.timeout = timeout
+
+
+class UnixSocketAdapter(UnixAdapter):
+    """
+    UnixAdapter creates a connection pool per request url (holding one connection), so connections
+    are not reused across endpoints. This adapter keeps one pool of up to pool_maxsize connections
+    per socket.
+    """
+
+    def __init__(self, pool_maxsize=DEFAULT_POOL_SIZE, timeout=60):
+        super(UnixSocketAdapter, self).__init__(timeout=timeout)
+        self.pool_maxsize = pool_maxsize
+
+    def get_connection(self, url, proxies=None):
+        if (proxies or {}).get(urlsplit(url.lower()).scheme):
+            raise ValueError('{0} does not support specifying proxies'.format(self.__class__.__name__))
+        # the network location of 'http+unix://' urls is the url-encoded path to the socket
+        socket_url = 'http+unix://' + urlsplit(url).netloc
+        with self.pools.lock:
+            pool = self.pools.get(socket_url)
+            if pool is None:
+                pool = UnixSocketConnectionPool(socket_url, self.timeout, self.pool_maxsize)
+                self.pools[socket_url] = pool
+        return pool
+
+
+def get_session(url):
+    """
+    Return pooled session for the given url, creating it if necessary
+    """
+    key = session_key(url)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=_pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.mount('http+unix://', UnixSocketAdapter(pool_maxsize=_pool_size))
+            if not _keep_alive:
+                session.headers['Connection'] = 'close'
+            _sessions[key] = session
+        return session
+
 
 def call(base_url, method, uri_path, data=None, token=None, timeout=180, headers=None, stream=True,
-         response_format=None, error_format=None):
+         response_format=None, error_format=None, quiet=False, conditional=False):
     """
     Make NetSpyGlass JSON API call to execute query
 
@@ -36,8 +167,14 @@ def call(base_url, method, uri_path, data=None, token=None, timeout=180, headers
     :param timeout:      - timeout, seconds
     :param headers:      - http request headers
     :param stream:       - if True, return result as a stream (default=True)
-    :param response_format:       - format of the response e.g. 'json', 'json_array' (default=None)
+    :param response_format:       - format of the response e.g. 'json', 'json_array' (default=None).
+                                    'json_array_stream' returns a generator that yields items of the
+                                    json array as they arrive
     :param error_format:       - format of the error e.g. 'json_array' (default=None)
+    :param quiet:        - if True, errors are returned but not printed
+    :param conditional:  - if True, the request has conditional headers (e.g. If-None-Match) and
+                           304 Not Modified is returned as a response rather than an error;
+                           the caller checks the status
     """
     # disable warning
     # InsecureRequestWarning: Unverified HTTPS request is being made. Adding certificate
@@ -54,24 +191,96 @@ def call(base_url, method, uri_path, data=None, token=None, timeout=180, headers
     try:
         response = make_call(url, method, data, timeout, headers=send_headers, stream=stream)
     except Exception as ex:
-        error = 'Received error when making request to endpoint: {}. Error: {}'.format(url, ex)
-        print(error)
+        error = ApiError(REQUEST_ERROR_TEMPLATE.format(url, ex))
+        if not quiet:
+            print(error)
         return None, error
     else:
-        error = check_error(response, error_format)
+        error = check_error(response, error_format, quiet=quiet, conditional=conditional)
         if error is None:
             return decode_response(response, response_format), None
         else:
             return None, error
 
 
-def check_error(response, error_format):
+def call_many(base_url, specs, concurrency=DEFAULT_CONCURRENCY, **kwargs):
+    """
+    Make many API calls concurrently and return results in the same order as the specs.
+
+    :param base_url:     - see call()
+    :param specs:        - a list of dictionaries with arguments of call() for each request, for example
+                           {'method': 'POST', 'uri_path': 'v2/nsg/discovery/net/1/submit/dev1'}
+    :param concurrency:  - max number of requests in flight
+    :param kwargs:       - default arguments of call() shared by all requests (e.g. token, timeout).
+                           Values in the spec override these.
+    :return: a list of tuples (response, error), one per spec
+    """
+    results = [(None, None)] * len(specs)
+    for idx, response, error in iter_many(base_url, specs, concurrency=concurrency, **kwargs):
+        results[idx] = (response, error)
+    return results
+
+
+def iter_many(base_url, specs, concurrency=DEFAULT_CONCURRENCY, **kwargs):
+    """
+    Same as call_many() but yields tuples (index, response, error) as requests complete,
+    where index is the position of the request in the list of specs.
+    """
+    call_args_list = []
+    for spec in specs:
+        call_args = dict(kwargs)
+        call_args.update(spec)
+        call_args_list.append(call_args)
+    for idx, (response, error) in iter_concurrently(lambda call_args: _call_safely(base_url, call_args),
+                                                    call_args_list, concurrency=concurrency):
+        yield idx, response, error
+
+
+def iter_concurrently(func, items, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Call func(item) for every item on a thread pool with at most `concurrency` calls in flight
+    and yield tuples (index, result) as calls complete
+    """
+    if not items:
+        return
+    workers = max(1, min(int(concurrency), len(items)))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(func, item): idx for idx, item in enumerate(items)}
+        for future in concurrent.futures.as_completed(futures):
+            yield futures[future], future.result()
+
+
+def in_order(indexed_results):
+    """
+    Takes tuples (index, ...) that arrive in any order, e.g. from iter_many() or iter_concurrently(),
+    and yields them in index order, each one as soon as it and all preceding ones have arrived
+    """
+    pending = {}
+    next_idx = 0
+    for item in indexed_results:
+        pending[item[0]] = item
+        while next_idx in pending:
+            yield pending.pop(next_idx)
+            next_idx += 1
+
+
+def _call_safely(base_url, call_args):
+    try:
+        return call(base_url, **call_args)
+    except Exception as ex:
+        return None, ApiError('Error while making request {0}: {1}'.format(call_args.get('uri_path'), ex))
+
+
+def check_error(response, error_format, quiet=False, conditional=False):
     status_code = response.status_code
+    if conditional and status_code == NOT_MODIFIED:
+        return None
     if status_code < 200 or status_code >= 300:
         if error_format is not None and error_format == 'json_array':
-            return error_handlers.JsonArrayErrorHandler.handle_error(response)
+            error = error_handlers.JsonArrayErrorHandler.handle_error(response, quiet=quiet)
         else:
-            return error_handlers.BaseErrorHandler.handle_error(response)
+            error = error_handlers.BaseErrorHandler.handle_error(response, quiet=quiet)
+        return ApiError(error if error is not None else 'API status code: {0}'.format(status_code), status_code)
     return None
 
 
@@ -81,6 +290,8 @@ def decode_response(response, response_format):
             return response_handlers.JsonResponseHandler.get_data(response)
         elif response_format == 'json_array':
             return response_handlers.JsonArrayResponseHandler.get_data(response)
+        elif response_format == 'json_array_stream':
+            return response_handlers.JsonArrayResponseHandler.iter_data(response)
         else:
             print('Unknown format provided to decode response. Received format: {}'.format(response_format))
     else:
@@ -90,7 +301,7 @@ def decode_response(response, response_format):
 def make_call(url, method, data, timeout, headers, stream=False):
     # timeout_obj = urllib3.Timeout(connect=timeout, read=timeout)
 
-    session = Session()
+    session = get_session(url)
     if method == 'GET':
         response = session.get(url, params=data, timeout=timeout, headers=headers, verify=False, stream=stream)
     elif method == 'POST':
@@ -6,15 +6,24 @@ This module implements subset of NetSpyGlass CLI commands
 
 """
 
-import json
+import sys
 
 from . import api
+from . import device_download
 from . import sub_command
 
+NSGQL_TEMPLATE = '/v2/query/net/{0}/data/'
+
 HELP = """
 Commands that operate with NSG devices: 
         
 device download (devID|name)                   download device object identified by its ID or name
+
+device download -o DIR [-c N] [-f FILE|-] [-q "NsgQL condition"] [devID|name ...]
+                                               download devices given as arguments, listed in the file
+                                               (or stdin) and matching NsgQL condition (e.g. -q "name ~ 'sw*'")
+                                               N at a time (default 8) to files in the directory. Devices
+                                               that have not changed since the last download are skipped
 """
 
 
@@ -23,6 +32,7 @@ class DeviceCommands(sub_command.SubCommand, object):
     Download device
 
     device download (devID|name)
+    device download -o DIR [-c N] [-f FILE|-] [-q "NsgQL condition"] [devID|name ...]
     """
 
     def __init__(self, base_url, token, net_id, time_format):
@@ -34,6 +44,64 @@ class DeviceCommands(sub_command.SubCommand, object):
         print(HELP)
 
     def do_download(self, arg):
-        request = 'v2/nsg/test/net/{0}/devices/{1}?source=devicepool&format=pbjson'.format(self.netid, arg)
-        response, error = api.call(self.base_url, 'GET', request, token=self.token, error_format='json_array')
-        print(response.content.decode(response.encoding))
\ No newline at end of file
+        """
+        device download (devID|name)
+        device download -o DIR [-c N] [-f FILE|-] [-q "NsgQL condition"] [devID|name ...]
+
+        a single device is printed. With -o, devices given as arguments, listed in the file
+        (or stdin if the file name is '-') and matching the NsgQL condition are downloaded
+        N at a time to files in the directory; devices that have not changed since the last
+        download to the same directory are skipped.
+        """
+        try:
+            options = device_download.parse_download_args(arg)
+        except device_download.DownloadError as e:
+            print('ERROR: {0}'.format(e))
+            return
+        if options['output_dir'] is None:
+            if len(options['devices']) != 1 or options['file'] or options['query']:
+                print('ERROR: option -o DIR is required to download more than one device')
+                return
+            response, error = self.call_download(options['devices'][0])
+            if error is None:
+                print(response.content.decode(response.encoding))
+            return
+        devices = list(options['devices'])
+        try:
+            if options['file'] == '-':
+                devices += sub_command.read_names(sys.stdin)
+            elif options['file']:
+                with open(options['file'], 'r') as f:
+                    devices += sub_command.read_names(f)
+        except OSError as e:
+            print('ERROR: can not read devices from {0}: {1}'.format(options['file'], e))
+            return
+        if options['query']:
+            ids, error = self.query_device_ids(options['query'])
+            if error is not None:
+                print('ERROR: {0}'.format(error))
+                return
+            devices += ids
+        devices = list(dict.fromkeys(devices))
+        downloader = device_download.DeviceDownloader(self.call_download, options['output_dir'],
+                                                      concurrency=options['concurrency'])
+        device_download.print_summary(downloader.run(devices))
+
+    def call_download(self, device, headers=None):
+        request = device_download.DOWNLOAD_TEMPLATE.format(self.netid, device)
+        return api.call(self.base_url, 'GET', request, token=self.token, headers=headers,
+                        error_format='json_array', quiet=headers is not None, conditional=headers is not None)
+
+    def query_device_ids(self, condition):
+        """
+        :return: tuple (list of IDs of the devices that match NsgQL condition, error)
+        """
+        data = {'targets': [{'nsgql': device_download.DEVICE_IDS_QUERY_TEMPLATE.format(condition), 'format': 'table'}]}
+        response, error = api.call(self.base_url, 'POST', NSGQL_TEMPLATE.format(self.netid), data=data,
+                                   token=self.token, response_format='json', quiet=True)
+        if error is not None:
+            return None, error
+        table = response[0] if isinstance(response, list) and response else response
+        if not isinstance(table, dict) or table.get('error'):
+            return None, self.get_error(table)
+        return [str(row[0]) for row in table.get('rows', []) if row and row[0] is not None], None
\ No newline at end of file
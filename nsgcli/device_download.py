@@ -0,0 +1,228 @@
+"""
+Downloading many devices to a directory ('device download -o DIR ...')
+
+Devices are downloaded concurrently and every response body is streamed to a temporary file in
+the output directory in chunks while its sha256 is computed, then renamed to <device>.json
+(see device_file_name()). The directory keeps a manifest with the hash, size and ETag of every
+device downloaded before. The next run sends the ETag in If-None-Match so that the server can
+answer 304 Not Modified without sending the device; if it sends the device anyway and the hash
+has not changed, the existing file is left untouched.
+
+:copyright: (c) 2026 by Happy Gears, Inc
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import hashlib
+import json
+import os
+import re
+import shlex
+import sys
+import tempfile
+import time
+
+from tabulate import tabulate
+
+from . import api
+
+DOWNLOAD_TEMPLATE = 'v2/nsg/test/net/{0}/devices/{1}?source=devicepool&format=pbjson'
+DEVICE_IDS_QUERY_TEMPLATE = 'SELECT id FROM devices WHERE {0}'
+
+MANIFEST_FILE = 'manifest.json'
+DEVICE_FILE_SUFFIX = '.json'
+# separates the sanitized device name from the hash of the original name. It is not a character
+# device_file_name() keeps, so names with a hash never collide with names that were kept as is
+NAME_HASH_SEPARATOR = '~'
+NAME_HASH_LENGTH = 12
+CHUNK_SIZE = 256 * 1024
+
+DOWNLOAD_CHANGED = 'downloaded'
+DOWNLOAD_UNCHANGED = 'unchanged'
+DOWNLOAD_FAILED = 'failed'
+DOWNLOAD_RESULTS = [DOWNLOAD_CHANGED, DOWNLOAD_UNCHANGED, DOWNLOAD_FAILED]
+
+MAX_LISTED_DEVICES = 100
+PROGRESS_INTERVAL_SEC = 0.2
+
+
+class DownloadError(Exception):
+    pass
+
+
+def parse_download_args(arg):
+    """
+    parse arguments of the command
+    'device download [-o DIR] [-c N] [-f FILE|-] [-q "NsgQL condition"] [dev1 dev2 ...]'
+
+    :return: dictionary with keys 'devices', 'file', 'query', 'output_dir' and 'concurrency'
+    """
+    try:
+        words = shlex.split(arg)
+    except ValueError as e:
+        raise DownloadError('invalid arguments: {0}'.format(e))
+    options = {'devices': [], 'file': None, 'query': None, 'output_dir': None,
+               'concurrency': api.DEFAULT_CONCURRENCY}
+    # the NsgQL condition must be quoted if it has spaces
+    names = {'-o': 'output_dir', '-c': 'concurrency', '-f': 'file', '-q': 'query'}
+    while words:
+        word = words.pop(0)
+        if word in names:
+            if not words:
+                raise DownloadError('option {0} requires an argument'.format(word))
+            options[names[word]] = words.pop(0)
+        else:
+            options['devices'].append(word)
+    try:
+        options['concurrency'] = int(options['concurrency'])
+    except ValueError:
+        raise DownloadError('invalid concurrency "{0}"'.format(options['concurrency']))
+    if options['concurrency'] < 1:
+        raise DownloadError('concurrency must be greater than 0')
+    return options
+
+
+def device_file_name(device):
+    """
+    name of the file of the device in the output directory. Characters that are not safe in file
+    names are replaced with '_'; if the name had to be changed, a hash of the original name is
+    appended so that different devices ('core sw1', 'core/sw1', 'core_sw1') get different files
+    """
+    name = re.sub(r'[^\w.-]', '_', device)
+    if name != device or name + DEVICE_FILE_SUFFIX == MANIFEST_FILE:
+        name_hash = hashlib.sha256(device.encode('utf-8')).hexdigest()[:NAME_HASH_LENGTH]
+        name = name + NAME_HASH_SEPARATOR + name_hash
+    return name + DEVICE_FILE_SUFFIX
+
+
+class Manifest(object):
+    """
+    Hashes, sizes and ETags of the devices in the output directory, stored in manifest.json
+    """
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, MANIFEST_FILE)
+        self.entries = {}
+        try:
+            with open(self.path, 'r') as f:
+                self.entries = json.load(f).get('devices', {})
+        except (OSError, ValueError):
+            pass
+
+    def get(self, device):
+        return self.entries.get(device)
+
+    def update(self, device, sha256, size, etag):
+        self.entries[device] = {'file': device_file_name(device), 'sha256': sha256, 'size': size, 'etag': etag,
+                                'updatedAt': int(time.time() * 1000)}
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'devices': self.entries}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+class DeviceDownloader(object):
+    """
+    :param call:    function (device, request headers) -> (response, error) that makes the streaming
+                    api call, see DeviceCommands.call_download()
+    """
+
+    def __init__(self, call, output_dir, concurrency=api.DEFAULT_CONCURRENCY, progress=None):
+        self.call = call
+        self.output_dir = output_dir
+        self.concurrency = concurrency
+        self.progress = progress
+        os.makedirs(output_dir, exist_ok=True)
+        self.manifest = Manifest(output_dir)
+
+    def run(self, devices):
+        """
+        :return: list of tuples (device, one of DOWNLOAD_RESULTS, error message) in the order of devices
+        """
+        progress = self.progress if self.progress is not None else sys.stderr
+        results = [None] * len(devices)
+        counts = dict.fromkeys(DOWNLOAD_RESULTS, 0)
+        shown_at = 0
+        try:
+            for done, (idx, result) in enumerate(
+                    api.iter_concurrently(self.download_safely, devices, concurrency=self.concurrency), 1):
+                results[idx] = (devices[idx],) + result
+                counts[result[0]] += 1
+                now = time.monotonic()
+                if now - shown_at >= PROGRESS_INTERVAL_SEC or done == len(devices):
+                    shown_at = now
+                    progress.write('\rdevices {0}/{1}: {2}'.format(
+                        done, len(devices), ', '.join('{0} {1}'.format(counts[r], r) for r in DOWNLOAD_RESULTS)))
+                    progress.flush()
+        finally:
+            self.manifest.save()
+        if devices:
+            progress.write('\n')
+            progress.flush()
+        return results
+
+    def download_safely(self, device):
+        try:
+            return self.download(device)
+        except Exception as e:
+            return DOWNLOAD_FAILED, str(e)
+
+    def download(self, device):
+        """
+        :return: tuple (one of DOWNLOAD_RESULTS, error message)
+        """
+        previous = self.manifest.get(device)
+        path = os.path.join(self.output_dir, device_file_name(device))
+        headers = {}
+        if previous and previous.get('etag') and os.path.exists(path):
+            headers['If-None-Match'] = previous['etag']
+        response, error = self.call(device, headers)
+        if error is not None:
+            return DOWNLOAD_FAILED, str(error).strip()
+        try:
+            return self.save_response(device, response, previous, path)
+        finally:
+            # return the connection to the pool even if the body has not been read to the end
+            response.close()
+
+    def save_response(self, device, response, previous, path):
+        if response.status_code == api.NOT_MODIFIED:
+            return DOWNLOAD_UNCHANGED, ''
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.output_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+            sha256 = digest.hexdigest()
+            etag = response.headers.get('ETag')
+            if previous and previous.get('sha256') == sha256 and os.path.exists(path):
+                os.remove(tmp_path)
+                result = DOWNLOAD_UNCHANGED
+            else:
+                os.replace(tmp_path, path)
+                result = DOWNLOAD_CHANGED
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.manifest.update(device, sha256, size, etag)
+        return result, ''
+
+
+def print_summary(results):
+    counts = dict.fromkeys(DOWNLOAD_RESULTS, 0)
+    for _, result, _ in results:
+        counts[result] += 1
+    print(tabulate([[r, counts[r]] for r in DOWNLOAD_RESULTS], ['result', 'devices'], tablefmt='fancy_outline'))
+    failed = [[device, message] for device, result, message in results if result == DOWNLOAD_FAILED]
+    if failed:
+        print(tabulate(failed[:MAX_LISTED_DEVICES], ['device', 'error'], tablefmt='fancy_outline'))
+        if len(failed) > MAX_LISTED_DEVICES:
+            print('... and {0} more'.format(len(failed) - MAX_LISTED_DEVICES))
@@ -6,9 +6,15 @@ This module implements subset of NetSpyGlass CLI commands
 
 """
 
+import sys
+import time
+import urllib.parse
+
 from tabulate import tabulate
 
 from . import api
+from . import discovery_report
+from . import discovery_watch
 from . import response_formatter
 from . import sub_command
 
@@ -24,6 +30,55 @@ FIELD_NAME_MAPPING = {
     'discoveryStatus': 'status'
 }
 
+QUEUE_TEMPLATE = 'v2/nsg/discovery/net/{0}/queue'
+SUBMIT_TEMPLATE = 'v2/nsg/discovery/net/{0}/submit/{1}'
+
+# results of bulk submit: accepted by the server, rejected by the server (e.g. device not found),
+# or failed because the request could not be sent
+SUBMIT_ACCEPTED = 'accepted'
+SUBMIT_REJECTED = 'rejected'
+SUBMIT_FAILED = 'failed'
+SUBMIT_RESULTS = [SUBMIT_ACCEPTED, SUBMIT_REJECTED, SUBMIT_FAILED]
+
+# max number of rejected and failed devices listed after bulk submit
+MAX_LISTED_DEVICES = 100
+
+PROGRESS_INTERVAL_SEC = 0.2
+
+
+class DiscoveryError(Exception):
+    pass
+
+
+def parse_submit_args(arg):
+    """
+    parse arguments of the command 'discovery submit [-f FILE|-] [-c N] [dev1 dev2 ...]'
+
+    :return: tuple (file name or None, concurrency, list of devices given on the command line)
+    """
+    words = [w for w in arg.split(' ') if w]
+    file_name = None
+    concurrency = api.DEFAULT_CONCURRENCY
+    devices = []
+    while words:
+        word = words.pop(0)
+        if word in ['-f', '-c']:
+            if not words:
+                raise DiscoveryError('option {0} requires an argument'.format(word))
+            value = words.pop(0)
+            if word == '-f':
+                file_name = value
+            else:
+                try:
+                    concurrency = int(value)
+                except ValueError:
+                    raise DiscoveryError('invalid concurrency "{0}"'.format(value))
+                if concurrency < 1:
+                    raise DiscoveryError('concurrency must be greater than 0')
+        else:
+            devices.append(word)
+    return file_name, concurrency, devices
+
 
 class DiscoveryCommands(sub_command.SubCommand, object):
     """
@@ -46,13 +101,25 @@ class DiscoveryCommands(sub_command.SubCommand, object):
         print("""Operations with network discovery:
         
 discovery queue                       shows current state of discovery queue
+
+discovery queue --watch [interval]    poll the queue every interval seconds (default 5) and show
+                                      devices completed per minute, average discovery duration
+                                      and time to drain the queue
         
 discovery submit dev1 dev2 dev3       put devices in front of the queue. Devices can be
                                       identified by deviceID, name, sysName or address
 
+discovery submit -f FILE [-c N]       submit devices listed in the file (or stdin if FILE is '-'),
+                                      N at a time (default 8), and print the summary of accepted,
+                                      rejected and failed devices
+
 discovery status dev                  print status of last 10 discovery attempts for the device 
                                       identified by deviceID, name or address
 
+discovery report [filter] [top=N]    statistics of the most recent discovery reports of all devices
+                                      (or devices matching the filter): lag percentiles and histogram,
+                                      ping and snmp failure rates and N slowest devices
+
 discovery pause                       pause discovery. In-progress discovery processes will finish
                                       but new devices already in the queue are not going to be scheduled
                                               
@@ -61,9 +128,19 @@ discovery resume                      resume discovery
 
     def do_queue(self, arg):
         """
-            show discovery status
+            show discovery status; with --watch [interval], keep polling the queue and show
+            the rate of discovery and the time to drain the queue
         """
-        request = 'v2/nsg/discovery/net/{0}/queue'.format(self.netid)
+        try:
+            watch = discovery_watch.parse_watch_args(arg)
+        except discovery_watch.QueueWatchError as e:
+            print('ERROR: {0}'.format(e))
+            return
+        if watch is not None:
+            interval, window = watch
+            discovery_watch.QueueWatcher(self.get_queue, interval=interval, window=window).run()
+            return
+        request = QUEUE_TEMPLATE.format(self.netid)
         resp_dict = self.get_command(request)  # nsgcli.api.call(self.base_url, 'GET', request, token=self.token)
         if resp_dict is None:
             return
@@ -101,6 +178,10 @@ discovery resume                      resume discovery
             print('Currently processing device: {}'.format(currently_processing))
             print()
 
+    def get_queue(self):
+        return api.call(self.base_url, 'GET', QUEUE_TEMPLATE.format(self.netid), token=self.token,
+                        response_format='json', quiet=True)
+
     def print_queue_contents(self, input_list, headers, columns, sort_column=None):
         row_list = []
         if sort_column is not None:
@@ -113,12 +194,98 @@ discovery resume                      resume discovery
         print(tabulate(row_list, headers, tablefmt='fancy_outline'))
 
     def do_submit(self, arg):
-        comps = arg.split(' ')
-        for d in comps:
-            request = 'v2/nsg/discovery/net/{0}/submit/{1}'.format(self.netid, d)
-            response = self.post_command(request)
-            if response is not None:
-                self.print_response(response)
+        """
+        discovery submit dev1 dev2 ...
+        discovery submit -f FILE|- [-c N]
+
+        devices given on the command line are submitted and the result is printed for each one.
+        Devices read from the file (or stdin if the file name is '-') are submitted N at a time
+        with progress shown on stderr, followed by the summary of accepted, rejected and failed devices.
+        """
+        try:
+            file_name, concurrency, devices = parse_submit_args(arg)
+        except DiscoveryError as e:
+            print('ERROR: {0}'.format(e))
+            return
+        if file_name is None:
+            specs = [{'method': 'POST', 'uri_path': SUBMIT_TEMPLATE.format(self.netid, d)} for d in devices]
+            results = api.call_many(self.base_url, specs, token=self.token, response_format='json', quiet=True)
+            for response, error in results:
+                if error is not None:
+                    print(error)
+                elif response is not None:
+                    self.print_response(response)
+            return
+        try:
+            if file_name == '-':
+                devices += sub_command.read_names(sys.stdin)
+            else:
+                with open(file_name, 'r') as f:
+                    devices += sub_command.read_names(f)
+        except OSError as e:
+            print('ERROR: can not read devices from {0}: {1}'.format(file_name, e))
+            return
+        results = self.submit_bulk(list(dict.fromkeys(devices)), concurrency)
+        self.print_submit_summary(results)
+
+    def submit_bulk(self, devices, concurrency, progress=None):
+        """
+        submit devices concurrently
+
+        :param progress:  stream to show progress in, default is stderr
+        :return: list of tuples (device, one of SUBMIT_RESULTS, error message) in the order of devices
+        """
+        progress = progress if progress is not None else sys.stderr
+        specs = [{'method': 'POST', 'uri_path': SUBMIT_TEMPLATE.format(self.netid, d)} for d in devices]
+        results = [None] * len(devices)
+        counts = dict.fromkeys(SUBMIT_RESULTS, 0)
+        shown_at = 0
+        for done, (idx, response, error) in enumerate(
+                api.iter_many(self.base_url, specs, concurrency=concurrency, token=self.token,
+                              response_format='json', quiet=True), 1):
+            result, message = self.classify_submit_result(response, error)
+            results[idx] = (devices[idx], result, message)
+            counts[result] += 1
+            now = time.monotonic()
+            if now - shown_at >= PROGRESS_INTERVAL_SEC or done == len(devices):
+                shown_at = now
+                progress.write('\rsubmitted {0}/{1}: {2}'.format(
+                    done, len(devices), ', '.join('{0} {1}'.format(counts[r], r) for r in SUBMIT_RESULTS)))
+                progress.flush()
+        if devices:
+            progress.write('\n')
+            progress.flush()
+        return results
+
+    def classify_submit_result(self, response, error):
+        """
+        requests that could not be sent or whose response could not be received or decoded have
+        failed; requests the server answered with an error have been rejected
+
+        :return: tuple (one of SUBMIT_RESULTS, error message)
+        """
+        if error is not None:
+            if getattr(error, 'status_code', None) is None:
+                return SUBMIT_FAILED, error
+            return SUBMIT_REJECTED, error
+        if response is None:
+            return SUBMIT_FAILED, 'could not decode the response'
+        if self.is_error(response):
+            return SUBMIT_REJECTED, self.get_error(response[0] if isinstance(response, list) else response)
+        return SUBMIT_ACCEPTED, ''
+
+    def print_submit_summary(self, results):
+        counts = dict.fromkeys(SUBMIT_RESULTS, 0)
+        for _, result, _ in results:
+            counts[result] += 1
+        print(tabulate([[r, counts[r]] for r in SUBMIT_RESULTS], ['result', 'devices'], tablefmt='fancy_outline'))
+        not_accepted = [[device, result, message] for device, result, message in results
+                        if result != SUBMIT_ACCEPTED]
+        if not_accepted:
+            print(tabulate(not_accepted[:MAX_LISTED_DEVICES], ['device', 'result', 'error'],
+                           tablefmt='fancy_outline'))
+            if len(not_accepted) > MAX_LISTED_DEVICES:
+                print('... and {0} more'.format(len(not_accepted) - MAX_LISTED_DEVICES))
 
     def do_pause(self, arg):
         request = 'v2/nsg/discovery/net/{0}/pause'.format(self.netid)
@@ -145,6 +312,43 @@ discovery resume                      resume discovery
         if response is not None:
             self.print_status(response, DISCOVERY_STATUS_FIELDS)
 
+    def do_report(self, arg):
+        """
+        discovery report [filter] [top=N] [page=N] [concurrency=N] [history]
+
+        statistics of the most recent discovery reports of all devices (or devices matching
+        the filter): percentiles of lag and discovery time, lag histogram, ping and snmp
+        failure rates and the slowest devices. With 'history', all reports are used, not
+        only the most recent one of each device.
+        """
+        try:
+            options = discovery_report.parse_report_args(arg)
+            reports = discovery_report.page_reports(
+                lambda offset, limit: self.get_reports(options['filter'], offset, limit,
+                                                       most_recent=not options['history']),
+                page_size=options['page'], concurrency=options['concurrency'])
+        except discovery_report.ReportError as e:
+            print('ERROR: {0}'.format(e))
+            return
+        discovery_report.print_report(discovery_report.DiscoveryReport(reports), reports, top=options['top'])
+
+    def get_reports(self, query, offset, limit, most_recent=True):
+        """
+        fetch one page of discovery reports
+
+        :return: tuple (list of reports, total number of reports or None, error)
+        """
+        request = discovery_report.REPORTS_TEMPLATE.format(
+            self.netid, offset, limit, urllib.parse.quote(query, safe=''), 'true' if most_recent else 'false',
+            ','.join(DISCOVERY_STATUS_FIELDS))
+        response, error = api.call(self.base_url, 'GET', request, token=self.token, response_format='json',
+                                   quiet=True)
+        if error is not None:
+            return None, None, error
+        if not isinstance(response, dict):
+            return None, None, 'could not decode discovery reports at offset {0}'.format(offset)
+        return response.get('reports', []), response.get('total'), None
+
     def print_status(self, response, fields):
         table_formatter = \
             response_formatter.ResponseFormatter(column_title_mapping=FIELD_NAME_MAPPING, time_format=self.time_format)
@@ -0,0 +1,243 @@
+"""
+Network-wide statistics of discovery reports ('discovery report [filter]')
+
+Discovery reports are paged through with the API call v2/ui/net/{netid}/reports/discovery/list.
+The first page is fetched alone; if the server reports the total number of reports, all other
+pages are fetched concurrently, otherwise pages are fetched `concurrency` at a time until a short
+page comes back. Only the fields in DISCOVERY_STATUS_FIELDS are requested.
+
+Statistics are computed with numpy over the whole set of reports: percentiles of lagSec and of
+discovery and processing durations (derived from start and finish times), a histogram of lagSec,
+the slowest devices and the rates of ping and SNMP failures.
+
+:copyright: (c) 2026 by Happy Gears, Inc
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import datetime
+import re
+
+import dateutil.parser
+import numpy as np
+from tabulate import tabulate
+
+from . import api
+
+REPORTS_TEMPLATE = ('v2/ui/net/{0}/reports/discovery/list?offset={1}&limit={2}&q={3}&most_recent={4}'
+                    '&s=createdAt&desc&fields={5}')
+
+DEFAULT_PAGE_SIZE = 500
+DEFAULT_TOP = 10
+PERCENTILES = [50, 90, 99]
+
+# upper bounds of the buckets of lagSec histogram, seconds
+LAG_BUCKETS_SEC = [10, 30, 60, 120, 300, 600, 1800, 3600]
+HISTOGRAM_WIDTH = 40
+
+# values of discoveryPingStatus and discoverySnmpStatus that do not count as failures
+OK_STATUSES = ['ok', 'success', 'succeeded']
+
+REPORT_OPTIONS = ['top', 'page', 'concurrency', 'history']
+
+TIME_WITH_OFFSET = re.compile(r'T.*[+-]\d\d:?\d\d$')
+
+
+class ReportError(Exception):
+    pass
+
+
+def parse_report_args(arg):
+    """
+    parse arguments of the command 'discovery report [filter] [top=N] [page=N] [concurrency=N] [history]'
+
+    :return: dictionary with keys 'filter', 'top', 'page', 'concurrency' and 'history'
+    """
+    options = {'filter': '', 'top': DEFAULT_TOP, 'page': DEFAULT_PAGE_SIZE,
+               'concurrency': api.DEFAULT_CONCURRENCY, 'history': False}
+    words = []
+    for word in arg.split():
+        name, _, value = word.partition('=')
+        if name == 'history' and not value:
+            options['history'] = True
+        elif value and name in REPORT_OPTIONS:
+            try:
+                options[name] = int(value)
+            except ValueError:
+                raise ReportError('invalid value of option {0}: "{1}"'.format(name, value))
+            if options[name] < 1:
+                raise ReportError('option {0} must be greater than 0'.format(name))
+        else:
+            words.append(word)
+    options['filter'] = ' '.join(words)
+    return options
+
+
+def page_reports(fetch_page, page_size=DEFAULT_PAGE_SIZE, concurrency=api.DEFAULT_CONCURRENCY):
+    """
+    :param fetch_page:  function (offset, limit) -> (list of reports, total number of reports or None, error)
+    :return: list of all reports in the order of pages
+    """
+    reports, total, error = fetch_page(0, page_size)
+    if error is not None:
+        raise ReportError(error)
+    reports = list(reports)
+    if len(reports) < page_size:
+        return reports
+    if total is not None:
+        offsets = list(range(page_size, total, page_size))
+        reports.extend(fetch_pages(fetch_page, offsets, page_size, concurrency)[0])
+        return reports
+    offset = page_size
+    while True:
+        offsets = [offset + i * page_size for i in range(concurrency)]
+        pages, complete = fetch_pages(fetch_page, offsets, page_size, concurrency)
+        reports.extend(pages)
+        if complete:
+            return reports
+        offset += concurrency * page_size
+
+
+def fetch_pages(fetch_page, offsets, page_size, concurrency):
+    """
+    :return: tuple (reports from the pages in order, True if a page was shorter than page_size)
+    """
+    reports = []
+    complete = False
+    results = api.iter_concurrently(lambda offset: fetch_page(offset, page_size), offsets, concurrency=concurrency)
+    for _, (page, _, error) in api.in_order(results):
+        if error is not None:
+            raise ReportError(error)
+        if complete:
+            continue
+        reports.extend(page)
+        complete = len(page) < page_size
+    return reports, complete
+
+
+def parse_times(values):
+    """
+    parse ISO 8601 times and return them as float64 array of seconds since the epoch, NaN if
+    the time is missing
+    """
+    strings = [v[:-1] if isinstance(v, str) and v.endswith('Z') else (v or 'NaT') for v in values]
+    if any(TIME_WITH_OFFSET.search(v) for v in strings):
+        # numpy does not handle explicit UTC offsets
+        times = np.array([parse_time(v) for v in strings], dtype='datetime64[ms]')
+    else:
+        times = np.array(strings, dtype='datetime64[ms]')
+    result = times.astype(np.int64).astype(np.float64) / 1000.0
+    result[np.isnat(times)] = np.nan
+    return result
+
+
+def parse_time(value):
+    if not value or value == 'NaT':
+        return np.datetime64('NaT')
+    dt = dateutil.parser.isoparse(value)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return np.datetime64(dt, 'ms')
+
+
+def to_float(values):
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def is_failure(values):
+    """
+    :return: boolean array, True where the status is present and is not one of OK_STATUSES
+    """
+    return np.array([v is not None and v != '' and str(v).lower() not in OK_STATUSES for v in values], dtype=bool)
+
+
+class DiscoveryReport(object):
+    """
+    Column arrays built from the list of discovery reports
+    """
+
+    def __init__(self, reports):
+        self.count = len(reports)
+        self.devices = [r.get('reportName') or r.get('address') or str(r.get('deviceId')) for r in reports]
+        self.lag = to_float([r.get('lagSec') for r in reports])
+        start = parse_times([r.get('discoveryStartTime') for r in reports])
+        finish = parse_times([r.get('discoveryFinishTime') for r in reports])
+        processed = parse_times([r.get('processingFinishTime') for r in reports])
+        self.discovery_sec = finish - start
+        self.processing_sec = processed - finish
+        self.ping_status = [r.get('discoveryPingStatus') for r in reports]
+        self.snmp_status = [r.get('discoverySnmpStatus') for r in reports]
+
+    def percentiles(self):
+        """
+        :return: list of rows [name, count, min, mean, p50, p90, p99, max]
+        """
+        rows = []
+        for name, values in [('lagSec', self.lag), ('discovery (sec)', self.discovery_sec),
+                             ('processing (sec)', self.processing_sec)]:
+            values = values[~np.isnan(values)]
+            if len(values):
+                rows.append([name, len(values), values.min(), values.mean()] +
+                            list(np.percentile(values, PERCENTILES)) + [values.max()])
+            else:
+                rows.append([name, 0] + [None] * (3 + len(PERCENTILES)))
+        return rows
+
+    def histogram(self):
+        """
+        :return: list of tuples (bucket label, count) of lagSec histogram
+        """
+        values = self.lag[~np.isnan(self.lag)]
+        edges = np.array([0] + LAG_BUCKETS_SEC + [np.inf])
+        counts, _ = np.histogram(np.clip(values, 0, None), bins=edges)
+        labels = ['< {0}s'.format(b) for b in LAG_BUCKETS_SEC] + ['>= {0}s'.format(LAG_BUCKETS_SEC[-1])]
+        return list(zip(labels, counts.tolist()))
+
+    def slowest(self, n):
+        """
+        :return: indexes of n reports with the largest lagSec, the slowest first
+        """
+        lag = np.where(np.isnan(self.lag), -np.inf, self.lag)
+        n = min(n, int(np.count_nonzero(~np.isnan(self.lag))))
+        if n <= 0:
+            return []
+        top = np.argpartition(-lag, n - 1)[:n]
+        return top[np.argsort(-lag[top], kind='stable')].tolist()
+
+    def failure_rates(self):
+        """
+        :return: list of rows [check, reports with status, failures, failure rate %]
+        """
+        rows = []
+        for name, statuses in [('ping', self.ping_status), ('snmp', self.snmp_status)]:
+            known = sum(1 for s in statuses if s is not None and s != '')
+            failures = int(is_failure(statuses).sum())
+            rows.append([name, known, failures, round(100.0 * failures / known, 2) if known else None])
+        return rows
+
+
+def print_report(report, reports, top=DEFAULT_TOP):
+    print('Reports: {0}'.format(report.count))
+    if not report.count:
+        return
+    headers = ['', 'count', 'min', 'mean'] + ['p{0}'.format(p) for p in PERCENTILES] + ['max']
+    print(tabulate(report.percentiles(), headers, tablefmt='fancy_outline', floatfmt='.1f'))
+
+    histogram = report.histogram()
+    largest = max(count for _, count in histogram) or 1
+    print('lagSec histogram:')
+    for label, count in histogram:
+        bar = '█' * int(round(count * HISTOGRAM_WIDTH / largest))
+        print('  {0:>8} {1:>8} {2}'.format(label, count, bar).rstrip())
+
+    print(tabulate(report.failure_rates(), ['check', 'reports', 'failures', 'failure rate %'],
+                   tablefmt='fancy_outline'))
+
+    slowest = report.slowest(top)
+    if slowest:
+        print('Slowest {0} devices:'.format(len(slowest)))
+        rows = [[reports[i].get('deviceId'), report.devices[i], reports[i].get('address'), report.lag[i],
+                 report.discovery_sec[i], reports[i].get('discoveryPingStatus'),
+                 reports[i].get('discoverySnmpStatus')] for i in slowest]
+        print(tabulate(rows, ['device ID', 'device', 'address', 'lagSec', 'discovery (sec)', 'ping', 'snmp'],
+                       tablefmt='fancy_outline', floatfmt='.1f'))
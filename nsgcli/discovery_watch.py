@@ -0,0 +1,227 @@
+"""
+Watching discovery queue ('discovery queue --watch [interval]')
+
+The queue is polled every `interval` seconds and a rolling window of snapshots is kept. A device
+is counted as completed when it is no longer queued or in progress; its discovery duration is
+taken from the pending processing list if it is there, otherwise the last duration seen while
+it was in progress is used. Devices that enter and leave the queue between two polls are not
+seen, so the rate is a lower bound when the interval is long.
+
+From the window the dashboard shows the number of devices completed per minute, their average
+duration and the estimated time to drain the queue, redrawn in place with ANSI escape sequences.
+
+:copyright: (c) 2026 by Happy Gears, Inc
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import collections
+import datetime
+import sys
+import time
+
+from .response_formatter import format_duration
+from .table_renderer import CLEAR_TO_END, CURSOR_UP
+
+DEFAULT_INTERVAL_SEC = 5.0
+DEFAULT_WINDOW = 12  # snapshots
+# number of the longest running discovery tasks shown on the dashboard
+TOP_IN_PROGRESS = 5
+
+WATCH_FLAG = '--watch'
+
+
+class QueueWatchError(Exception):
+    pass
+
+
+def parse_watch_args(arg):
+    """
+    parse arguments of the command 'discovery queue --watch [interval] [window=N]'
+
+    :return: tuple (interval, window), or None if the command has no --watch flag
+    """
+    words = arg.split()
+    if WATCH_FLAG not in words:
+        return None
+    words.remove(WATCH_FLAG)
+    interval = DEFAULT_INTERVAL_SEC
+    window = DEFAULT_WINDOW
+    for word in words:
+        try:
+            if word.startswith('window='):
+                window = int(word.split('=', 1)[1])
+            else:
+                interval = float(word)
+        except ValueError:
+            raise QueueWatchError('usage: discovery queue --watch [interval] [window=N]')
+    if interval <= 0:
+        raise QueueWatchError('interval must be greater than 0')
+    if window < 2:
+        raise QueueWatchError('window must be at least 2 snapshots')
+    return interval, window
+
+
+def device_key(entry):
+    return entry.get('deviceID', entry.get('id'))
+
+
+class QueueSnapshot(object):
+    """
+    State of the discovery queue returned by the API call v2/nsg/discovery/net/{netid}/queue
+    """
+
+    def __init__(self, response, taken_at):
+        self.taken_at = taken_at
+        self.enabled = bool(response.get('enabled'))
+        self.paused = bool(response.get('paused'))
+        self.queued = {device_key(e): e for e in response.get('queue') or []}
+        in_progress = response.get('inProgress') or response.get('communicating') or []
+        self.in_progress = {device_key(e): e for e in in_progress}
+        self.pending = response.get('pendingProcessing') or []
+        self.generation = response.get('currentGeneration') or {}
+
+    @property
+    def waiting(self):
+        return len(self.queued) + len(self.in_progress)
+
+
+class QueueStats(object):
+    """
+    Rolling window of queue snapshots
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.snapshots = collections.deque(maxlen=window)
+        # for every snapshot: durations of the devices completed since the previous snapshot
+        self.completed = collections.deque(maxlen=window)
+
+    def add(self, snapshot):
+        durations = []
+        if self.snapshots:
+            previous = self.snapshots[-1]
+            pending_durations = {device_key(e): e.get('duration') for e in snapshot.pending}
+            for key in set(previous.queued) | set(previous.in_progress):
+                if key in snapshot.queued or key in snapshot.in_progress:
+                    continue
+                last_seen = previous.in_progress.get(key, {}).get('duration')
+                durations.append(pending_durations.get(key, last_seen))
+        self.snapshots.append(snapshot)
+        self.completed.append(durations)
+
+    def span_sec(self):
+        if len(self.snapshots) < 2:
+            return 0
+        return self.snapshots[-1].taken_at - self.snapshots[0].taken_at
+
+    def completed_in_window(self):
+        # the first element belongs to the interval before the oldest snapshot in the window
+        return list(self.completed)[1:]
+
+    def rate_per_min(self):
+        """
+        devices completed per minute, or None until there are two snapshots
+        """
+        span = self.span_sec()
+        if span <= 0:
+            return None
+        return sum(len(d) for d in self.completed_in_window()) * 60.0 / span
+
+    def avg_duration(self):
+        durations = [d for ds in self.completed_in_window() for d in ds if d is not None]
+        if not durations:
+            return None
+        return sum(durations) / len(durations)
+
+    def eta_sec(self):
+        rate = self.rate_per_min()
+        if not self.snapshots or not rate:
+            return None
+        return self.snapshots[-1].waiting * 60.0 / rate
+
+
+def render(stats, interval, error=None):
+    """
+    :return: list of lines of the dashboard
+    """
+    lines = []
+    now = datetime.datetime.now().isoformat(' ', 'seconds')
+    lines.append('Discovery queue at {0}, every {1:g}s, window {2} polls'.format(
+        now, interval, stats.snapshots.maxlen))
+    if error is not None:
+        lines.append('ERROR: {0}'.format(error))
+    if not stats.snapshots:
+        return lines
+    snapshot = stats.snapshots[-1]
+    if not snapshot.enabled:
+        lines.append('Discovery is disabled by configuration')
+        return lines
+    state = 'paused' if snapshot.paused else 'running'
+    generation = snapshot.generation
+    lines.append('{0}; queued: {1}, in progress: {2}, pending processing: {3}, generation: {4} ({5} devices)'.format(
+        state, len(snapshot.queued), len(snapshot.in_progress), len(snapshot.pending),
+        generation.get('generation', '-'), generation.get('devicesToDiscover', '-')))
+    rate = stats.rate_per_min()
+    avg = stats.avg_duration()
+    lines.append('completed: {0} devices/min, average duration: {1}, time to drain the queue: {2}'.format(
+        '-' if rate is None else '{0:.1f}'.format(rate),
+        '-' if avg is None else '{0:.1f}s'.format(avg),
+        format_duration(stats.eta_sec())))
+    longest = sorted(snapshot.in_progress.values(), key=lambda e: -(e.get('duration') or 0))[:TOP_IN_PROGRESS]
+    for entry in longest:
+        lines.append('  {0:>8}  {1:<30} {2:<16} {3:>8}'.format(
+            str(device_key(entry)), str(entry.get('name', '')), str(entry.get('address', '')),
+            format_duration(entry.get('duration'))))
+    return lines
+
+
+class QueueWatcher(object):
+    """
+    :param fetch:   function () -> (queue response dictionary, error)
+    """
+
+    def __init__(self, fetch, interval=DEFAULT_INTERVAL_SEC, window=DEFAULT_WINDOW, out=None):
+        self.fetch = fetch
+        self.interval = interval
+        self.stats = QueueStats(window)
+        self.out = out
+        self.lines_drawn = 0
+        self.polls = 0
+
+    def _write(self, text):
+        out = self.out if self.out is not None else sys.stdout
+        out.write(text)
+        out.flush()
+
+    def run(self, count=None):
+        """
+        poll the queue until interrupted with Ctrl-C or until it has been polled `count` times
+        """
+        next_tick = time.monotonic()
+        try:
+            while count is None or self.polls < count:
+                self.poll()
+                next_tick += self.interval
+                if count is not None and self.polls >= count:
+                    break
+                time.sleep(max(0, next_tick - time.monotonic()))
+        except KeyboardInterrupt:
+            pass
+
+    def poll(self):
+        self.polls += 1
+        try:
+            response, error = self.fetch()
+        except Exception as e:
+            response, error = None, str(e)
+        if error is None and not isinstance(response, dict):
+            # the response body could not be decoded
+            error = 'invalid response of the discovery queue: {0}'.format(response)
+        if error is None:
+            self.stats.add(QueueSnapshot(response, time.monotonic()))
+        self.redraw(render(self.stats, self.interval, error))
+
+    def redraw(self, lines):
+        text = CURSOR_UP.format(self.lines_drawn) + CLEAR_TO_END if self.lines_drawn else ''
+        self._write(text + '\n'.join(lines) + '\n')
+        self.lines_drawn = len(lines)
@@ -27,7 +27,7 @@ def get_error(response):
 
 class BaseErrorHandler:
     @staticmethod
-    def handle_error(response):
+    def handle_error(response, quiet=False):
         msg_template = ("An error occurred. Error: "
                         "{0}, API status code: {1}")
         status_code = response.status_code
@@ -39,14 +39,16 @@ class BaseErrorHandler:
         else:
             error = get_error(response.content)
         error_message = msg_template.format(error, status_code)
-        print(error_message)
+        if not quiet:
+            print(error_message)
         return error_message
 
 
 class JsonArrayErrorHandler:
     @staticmethod
-    def handle_error(response):
+    def handle_error(response, quiet=False):
         for line in response.iter_lines():
             error_message = 'ERROR: {0}'.format(get_error(json.loads(line)))
-            print(error_message)
+            if not quiet:
+                print(error_message)
             return error_message
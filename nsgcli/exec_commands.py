@@ -23,6 +23,7 @@ EXEC_TEMPLATE_WITHOUT_REGION = 'apiv3/net/{0}/exec/{1}?address={2}&args={3}'
 
 class ExecCommands(sub_command.SubCommand, object):
     # prompt = "exec # "
+    accepts_dedup_option = True
 
     def __init__(self, base_url, token, net_id, region=None):
         super(ExecCommands, self).__init__(base_url, token, net_id, region=region)
@@ -40,6 +41,7 @@ class ExecCommands(sub_command.SubCommand, object):
 
     def help(self):
         print('Call agents to execute various commands. Arguments: {0}'.format(self.get_args()))
+        print('Start the command with dedup=content to print identical output of different agents once')
 
     def do_fping(self, arg):
         """
@@ -72,7 +74,7 @@ class ExecCommands(sub_command.SubCommand, object):
 
         headers = {'Accept-Encoding': ''}  # to turn off gzip encoding to make response streaming work
         response, error = api.call(self.base_url, 'GET', request, token=self.token, headers=headers, stream=True,
-                                   response_format='json_array', error_format='json_array')
+                                   response_format='json_array_stream', error_format='json_array')
         if error is None:
             for acr in response:
                 fping_status = ExecCommands.parse_fping_status(acr)
@@ -0,0 +1,288 @@
+"""
+Client side writers for NsgQL table results
+
+Writers read the 'columns'/'rows' structure of the NsgQL table response (either a dictionary
+or nsgql_stream.StreamedTable) and write rows as they arrive to a file or stdout.
+
+CSV, TSV and NDJSON writers stream row by row and can compress output with gzip. Parquet and
+Arrow writers require module pyarrow and write rows in batches (row groups). Parquet files are
+compressed with snappy, or gzip if requested; Arrow files can not be compressed with gzip.
+
+:copyright: (c) 2026 by Happy Gears, Inc
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import csv
+import gzip
+import io
+import itertools
+import json
+import os
+import sys
+
+EXPORT_CSV = 'csv'
+EXPORT_TSV = 'tsv'
+EXPORT_NDJSON = 'ndjson'
+EXPORT_PARQUET = 'parquet'
+EXPORT_ARROW = 'arrow'
+
+EXPORT_FORMATS = [EXPORT_CSV, EXPORT_TSV, EXPORT_NDJSON, EXPORT_PARQUET, EXPORT_ARROW]
+
+FILE_EXTENSIONS = {
+    EXPORT_CSV: '.csv',
+    EXPORT_TSV: '.tsv',
+    EXPORT_NDJSON: '.ndjson',
+    EXPORT_PARQUET: '.parquet',
+    EXPORT_ARROW: '.arrow',
+}
+
+DEFAULT_BATCH_SIZE = 64 * 1024
+# number of rows that column types of Parquet and Arrow files are inferred from
+DEFAULT_SAMPLE_SIZE = 64 * 1024
+
+
+class ExportError(Exception):
+    pass
+
+
+def column_names(table):
+    return [col['text'] for col in table.get('columns', [])]
+
+
+def output_path(path, index):
+    """
+    When the query has several statements, the first result goes to the given file and
+    the following ones go to files with the statement index inserted before the extension,
+    e.g. out.csv, out.1.csv, out.2.csv
+    """
+    if not path or path == '-' or index == 0:
+        return path
+    base, ext = os.path.splitext(path)
+    if ext == '.gz':
+        base, inner_ext = os.path.splitext(base)
+        ext = inner_ext + ext
+    return '{0}.{1}{2}'.format(base, index, ext)
+
+
+def open_text_output(path, compress=False):
+    """
+    returns text file object for given path; path None or '-' means stdout
+    """
+    if not path or path == '-':
+        if compress:
+            return io.TextIOWrapper(gzip.GzipFile(fileobj=sys.stdout.buffer, mode='wb'), encoding='utf-8',
+                                    newline='')
+        return _NonClosingWrapper(sys.stdout)
+    if compress:
+        return gzip.open(path, 'wt', encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+class _NonClosingWrapper(object):
+    """
+    file-like wrapper that lets writers "close" stdout without actually closing it
+    """
+
+    def __init__(self, out):
+        self._out = out
+
+    def write(self, data):
+        return self._out.write(data)
+
+    def close(self):
+        self._out.flush()
+
+
+class DelimitedWriter(object):
+    """
+    writes rows as CSV or TSV, with column names in the first line
+    """
+
+    def __init__(self, delimiter=','):
+        self.delimiter = delimiter
+
+    def write(self, table, path=None, compress=False):
+        out = open_text_output(path, compress)
+        try:
+            writer = csv.writer(out, delimiter=self.delimiter, lineterminator='\n')
+            writer.writerow(column_names(table))
+            count = 0
+            for row in table.get('rows', []):
+                writer.writerow(['' if value is None else value for value in row])
+                count += 1
+            return count
+        finally:
+            out.close()
+
+
+class NdjsonWriter(object):
+    """
+    writes every row as json object on its own line
+    """
+
+    def write(self, table, path=None, compress=False):
+        out = open_text_output(path, compress)
+        try:
+            names = column_names(table)
+            count = 0
+            for row in table.get('rows', []):
+                out.write(json.dumps(dict(zip(names, row))))
+                out.write('\n')
+                count += 1
+            return count
+        finally:
+            out.close()
+
+
+class ArrowWriter(object):
+    """
+    writes rows in columnar format (Parquet or Arrow IPC file), flushing every batch_size rows
+    as a row group / record batch.
+
+    The file has one schema, so column types are inferred before anything is written, from
+    the first max(batch_size, sample_size) rows: integers mixed with floats become float64,
+    columns with values of other mixed types or with only nulls become strings. A value in a
+    later row that does not fit the inferred type raises ExportError rather than being
+    converted with a loss.
+    """
+
+    def __init__(self, file_format=EXPORT_PARQUET, batch_size=DEFAULT_BATCH_SIZE, sample_size=DEFAULT_SAMPLE_SIZE):
+        try:
+            import pyarrow
+        except ImportError:
+            raise ExportError('export format "{0}" requires python module pyarrow; '
+                              'install it with "pip install pyarrow"'.format(file_format))
+        self.pa = pyarrow
+        self.file_format = file_format
+        self.batch_size = batch_size
+        self.sample_size = max(batch_size, sample_size)
+
+    def write(self, table, path=None, compress=False):
+        if compress and self.file_format == EXPORT_ARROW:
+            raise ExportError('export format "{0}" does not support gzip compression'.format(self.file_format))
+        try:
+            return self._write(table, path, compress)
+        except self.pa.ArrowException as e:
+            raise ExportError('could not write {0} file: {1}'.format(self.file_format, e))
+
+    def _write(self, table, path, compress):
+        names = column_names(table)
+        sink = path if path and path != '-' else sys.stdout.buffer
+        rows = iter(table.get('rows', []))
+        sample = list(itertools.islice(rows, self.sample_size))
+        schema = self.pa.schema([(name, self.infer_type([row_value(row, idx) for row in sample]))
+                                 for idx, name in enumerate(names)])
+        writer = self.open_writer(sink, schema, compress)
+        count = 0
+        try:
+            for batch in iter_batches(itertools.chain(sample, rows), self.batch_size):
+                record_batch = self.to_record_batch(batch, schema, count)
+                if self.file_format == EXPORT_ARROW:
+                    writer.write_batch(record_batch)
+                else:
+                    writer.write_table(self.pa.Table.from_batches([record_batch]))
+                count += len(batch)
+        finally:
+            writer.close()
+        return count
+
+    def infer_type(self, values):
+        kinds = {value_kind(v) for v in values if v is not None}
+        if kinds == {'bool'}:
+            return self.pa.bool_()
+        if kinds == {'int'}:
+            return self.pa.int64()
+        if kinds and kinds <= {'int', 'float'}:
+            return self.pa.float64()
+        if kinds == {'other'}:
+            try:
+                inferred = self.pa.array(values).type
+            except (self.pa.ArrowInvalid, self.pa.ArrowTypeError):
+                # e.g. strings mixed with lists
+                inferred = self.pa.null()
+            if not self.pa.types.is_null(inferred):
+                return inferred
+        return self.pa.string()
+
+    def to_record_batch(self, rows, schema, first_row):
+        arrays = []
+        for idx, field in enumerate(schema):
+            values = [row_value(row, idx) for row in rows]
+            if self.pa.types.is_string(field.type):
+                values = [to_string(v) for v in values]
+            else:
+                for offset, value in enumerate(values):
+                    if value is not None and not fits_type(value, str(field.type)):
+                        raise ExportError(
+                            'value {0!r} of column "{1}" in row {2} does not fit type {3} inferred from '
+                            'the first {4} rows'.format(value, field.name, first_row + offset + 1, field.type,
+                                                        self.sample_size))
+            arrays.append(self.pa.array(values, type=field.type))
+        return self.pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    def open_writer(self, sink, schema, compress):
+        if self.file_format == EXPORT_ARROW:
+            return self.pa.ipc.new_file(sink, schema)
+        import pyarrow.parquet
+        return pyarrow.parquet.ParquetWriter(sink, schema, compression='gzip' if compress else 'snappy')
+
+
+def row_value(row, idx):
+    return row[idx] if idx < len(row) else None
+
+
+def value_kind(value):
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int):
+        return 'int'
+    if isinstance(value, float):
+        return 'float'
+    return 'other'
+
+
+def fits_type(value, type_name):
+    """
+    check that the value can be stored in a column of bool, int64 or double type without a loss;
+    values of columns of other types are checked by pyarrow
+    """
+    kind = value_kind(value)
+    if type_name == 'bool':
+        return kind == 'bool'
+    if type_name == 'int64':
+        return kind == 'int' or (kind == 'float' and value.is_integer())
+    if type_name == 'double':
+        return kind in ('int', 'float')
+    return True
+
+
+def to_string(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def iter_batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def make_writer(export_format, batch_size=DEFAULT_BATCH_SIZE):
+    if export_format == EXPORT_CSV:
+        return DelimitedWriter(',')
+    if export_format == EXPORT_TSV:
+        return DelimitedWriter('\t')
+    if export_format == EXPORT_NDJSON:
+        return NdjsonWriter()
+    if export_format in [EXPORT_PARQUET, EXPORT_ARROW]:
+        return ArrowWriter(export_format, batch_size=batch_size)
+    raise ExportError('Unknown export format "{0}", expected one of {1}'.format(export_format, EXPORT_FORMATS))
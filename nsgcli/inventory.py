@@ -0,0 +1,241 @@
+"""
+Local device inventory used by 'search device'
+
+The inventory is built from one NsgQL query that returns id, name, address, vendor, serial
+number and box description of all devices, and is stored as gzip-compressed json (column names
+plus a list of rows) so that it survives restarts. When it is refreshed, rows are compared with
+the ones already in the index by device id and only added, changed and removed devices are
+re-indexed.
+
+Searches never go to the server:
+
+    exact       device id, name, address or serial number is equal to the text
+    prefix      name, address or serial number starts with the text (bisect over a sorted key list)
+    substring   the text appears in name, address, vendor, serial number or box description
+    fuzzy       only if nothing else matched: device name shares enough trigrams with the text
+                (Jaccard similarity of trigram sets)
+
+Matching is case insensitive. The inventory is stale when it is older than TTL; callers should
+search on the server then.
+
+:copyright: (c) 2026 by Happy Gears, Inc
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import bisect
+import collections
+import gzip
+import json
+import os
+import tempfile
+import time
+
+from . import schema_cache
+
+INVENTORY_COLUMNS = ['id', 'name', 'address', 'Vendor', 'SerialNumber', 'boxDescr']
+INVENTORY_QUERY = 'SELECT DISTINCT {0} FROM devices WHERE Role NOT IN ("Cluster", "SimulatedNode")'.format(
+    ','.join(INVENTORY_COLUMNS))
+
+DEFAULT_TTL_SEC = 6 * 3600
+DEFAULT_INVENTORY_DIR = os.path.join(os.path.expanduser('~'), '.nsgcli', 'inventory')
+DEFAULT_LIMIT = 100
+
+# fields matched by exact and prefix searches, by substring search and by fuzzy search
+KEY_FIELDS = ['name', 'address', 'SerialNumber']
+TEXT_FIELDS = ['name', 'address', 'Vendor', 'SerialNumber', 'boxDescr']
+FUZZY_FIELDS = ['name']
+FUZZY_THRESHOLD = 0.3
+
+MATCH_EXACT = 'exact'
+MATCH_PREFIX = 'prefix'
+MATCH_SUBSTRING = 'substring'
+MATCH_FUZZY = 'fuzzy'
+
+# separates fields in the text used for substring search so that matches do not span fields
+FIELD_SEPARATOR = '\x00'
+
+
+def inventory_file(base_url, netid, directory=DEFAULT_INVENTORY_DIR):
+    return schema_cache.cache_file(base_url, netid, directory) + '.gz'
+
+
+def normalize(value):
+    return '' if value is None else str(value).lower()
+
+
+def trigrams(text):
+    text = '  ' + text + ' '
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class DeviceInventory(object):
+    """
+    :param path:   gzip json file to store the inventory in, or None to keep it in memory only
+    """
+
+    def __init__(self, path=None, ttl_sec=DEFAULT_TTL_SEC):
+        self.path = path
+        self.ttl_sec = ttl_sec
+        self.columns = list(INVENTORY_COLUMNS)
+        self.updated_at = 0
+        self.rows = {}  # device id -> row
+        self._keys = []  # sorted list of tuples (lower case key, device id as string) for prefix search
+        self._ids = {}  # device id as string -> device id
+        self._texts = {}  # device id -> lower case text for substring search
+        self._trigrams = collections.defaultdict(set)  # trigram -> ids of devices
+        self._device_trigrams = {}  # device id -> set of trigrams
+        self.load()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def is_stale(self):
+        return not self.rows or time.time() - self.updated_at > self.ttl_sec
+
+    def update(self, table):
+        """
+        bring the inventory up to date with the result of INVENTORY_QUERY
+
+        :return: tuple (number of added, changed and removed devices)
+        """
+        names = [col['text'] for col in table.get('columns', [])]
+        indexes = [names.index(c) if c in names else None for c in self.columns]
+        new_rows = {}
+        for row in table.get('rows', []):
+            values = [row[i] if i is not None and i < len(row) else None for i in indexes]
+            if values[0] is not None:
+                new_rows[values[0]] = values
+        removed = [device_id for device_id in self.rows if device_id not in new_rows]
+        added = [device_id for device_id in new_rows if device_id not in self.rows]
+        changed = [device_id for device_id, row in new_rows.items()
+                   if device_id in self.rows and self.rows[device_id] != row]
+        for device_id in removed + changed:
+            self._unindex(device_id)
+            del self.rows[device_id]
+        for device_id in added + changed:
+            self.rows[device_id] = new_rows[device_id]
+            self._index(device_id)
+        self._keys.sort()
+        self.updated_at = time.time()
+        return len(added), len(changed), len(removed)
+
+    def _field(self, row, name):
+        return normalize(row[self.columns.index(name)])
+
+    def _index(self, device_id):
+        # adds keys to the end of self._keys, the caller sorts it
+        row = self.rows[device_id]
+        self._ids[str(device_id)] = device_id
+        for field in KEY_FIELDS:
+            key = self._field(row, field)
+            if key:
+                self._keys.append((key, str(device_id)))
+        self._texts[device_id] = FIELD_SEPARATOR.join(self._field(row, f) for f in TEXT_FIELDS)
+        grams = set()
+        for field in FUZZY_FIELDS:
+            value = self._field(row, field)
+            if value:
+                grams |= trigrams(value)
+        self._device_trigrams[device_id] = grams
+        for gram in grams:
+            self._trigrams[gram].add(device_id)
+
+    def _unindex(self, device_id):
+        row = self.rows[device_id]
+        for field in KEY_FIELDS:
+            key = self._field(row, field)
+            if key:
+                idx = bisect.bisect_left(self._keys, (key, str(device_id)))
+                if idx < len(self._keys) and self._keys[idx] == (key, str(device_id)):
+                    del self._keys[idx]
+        self._ids.pop(str(device_id), None)
+        self._texts.pop(device_id, None)
+        for gram in self._device_trigrams.pop(device_id, set()):
+            ids = self._trigrams.get(gram)
+            if ids is not None:
+                ids.discard(device_id)
+                if not ids:
+                    del self._trigrams[gram]
+
+    def _rebuild_index(self):
+        self._keys = []
+        self._ids = {}
+        self._texts = {}
+        self._trigrams = collections.defaultdict(set)
+        self._device_trigrams = {}
+        for device_id in self.rows:
+            self._index(device_id)
+        self._keys.sort()
+
+    def search(self, text, limit=DEFAULT_LIMIT):
+        """
+        :return: list of tuples (row, kind of match), best matches first
+        """
+        query = normalize(text).strip()
+        if not query:
+            return []
+        matches = collections.OrderedDict()
+        if query in self._ids:
+            matches[self._ids[query]] = MATCH_EXACT
+        start = bisect.bisect_left(self._keys, (query, ''))
+        prefix_ids = []
+        for key, device_id in self._keys[start:]:
+            if not key.startswith(query):
+                break
+            if key == query:
+                matches.setdefault(self._ids[device_id], MATCH_EXACT)
+            else:
+                prefix_ids.append(self._ids[device_id])
+        for device_id in prefix_ids:
+            matches.setdefault(device_id, MATCH_PREFIX)
+        for device_id, device_text in self._texts.items():
+            if device_id not in matches and query in device_text:
+                matches[device_id] = MATCH_SUBSTRING
+        if not matches:
+            for device_id, _ in self.fuzzy(query):
+                matches[device_id] = MATCH_FUZZY
+        result = [(self.rows[device_id], kind) for device_id, kind in matches.items()]
+        return result[:limit] if limit else result
+
+    def fuzzy(self, query):
+        """
+        :return: list of tuples (device id, similarity) of devices similar to the query, most similar first
+        """
+        query_grams = trigrams(query)
+        shared = collections.Counter()
+        for gram in query_grams:
+            for device_id in self._trigrams.get(gram, ()):
+                shared[device_id] += 1
+        scored = []
+        for device_id, count in shared.items():
+            score = count / float(len(query_grams) + len(self._device_trigrams[device_id]) - count)
+            if score >= FUZZY_THRESHOLD:
+                scored.append((device_id, score))
+        scored.sort(key=lambda item: -item[1])
+        return scored
+
+    def load(self):
+        if not self.path:
+            return
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError, EOFError):
+            return
+        self.columns = data.get('columns', self.columns)
+        self.updated_at = data.get('updated_at', 0)
+        self.rows = {row[0]: row for row in data.get('rows', []) if row}
+        self._rebuild_index()
+
+    def save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        # write to temporary file and rename it so that other processes never see partial file
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as f:
+            data = {'columns': self.columns, 'updated_at': self.updated_at, 'rows': list(self.rows.values())}
+            f.write(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+        os.replace(tmp_path, self.path)
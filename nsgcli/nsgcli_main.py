@@ -9,6 +9,8 @@ This module implements subset of NetSpyGlass CLI commands
 import json
 
 from . import agent_commands
+from . import agent_fanout
+from . import agent_tail
 from . import api
 from . import device_commands
 from . import discovery_commands
@@ -30,9 +32,10 @@ CLUSTER_ARGS = ['status', 'summary', 'os', 'jvm', 'tsdb', 'python', 'c3p0']
 SERVER_ARGS = ['pause', 'status']
 EXEC_ARGS = ['ping', 'fping', 'traceroute']
 FIND_AGENT_ARGS = ['find_agent']
-DISCOVERY_ARGS = ['start', 'pause', 'resume', 'submit', 'status']
+DISCOVERY_ARGS = ['start', 'pause', 'resume', 'submit', 'status', 'report']
 HUD_ARGS = ['reset']
 DEVICE_ARGS = ['download']
+FOLLOW_COMMANDS = ['tail', 'log']  # agent commands that support follow mode (-f)
 NSGQL_ARGS = ['rebuild']  # command "nsgql rebuild" rebuilds NsgQL dynamic schema
 
 
@@ -294,7 +297,10 @@ class NsgCLI(sub_command.SubCommand, object):
     ##########################################################################################
     def do_agent(self, arg):
         """
-        agent [agent_name|all] command args
+        agent [agent_name|all|selector] command args
+
+        selector is a comma-separated list of agent names, a glob, a regular expression in
+        slashes or @file with agent names, see agent_fanout
         """
         if not arg:
             print('Invalid command {0}: command "agent" requires at least one argument: agent name'.format(arg))
@@ -309,6 +315,10 @@ class NsgCLI(sub_command.SubCommand, object):
         else:
             agent_name = args.pop(0)
 
+        if agent_fanout.is_multi_agent(agent_name):
+            self.agent_fanout(agent_name, args)
+            return
+
         work_args = ' '.join(args)
         if not work_args:
             sub_cmd = agent_commands.AgentCommands(agent_name, self.base_url, self.token, self.netid,
@@ -319,6 +329,53 @@ class NsgCLI(sub_command.SubCommand, object):
                                                    region=self.current_region)
             sub_cmd.onecmd(work_args)
 
+    def agent_fanout(self, selector, args):
+        """
+        agent <selector> [concurrency=N] [timeout=SEC] [slow=SEC] command args
+
+        send the command to every agent matched by the selector, see agent_fanout
+        """
+        args = [a for a in args if a]
+        try:
+            options = agent_fanout.parse_fanout_options(args)
+            if not args:
+                print('Invalid command: command "agent {0}" requires a command to send to the agents'.format(selector))
+                return
+            agents = agent_fanout.select_agents(selector, self.get_agent_names)
+        except agent_fanout.AgentSelectorError as e:
+            print('ERROR: {0}'.format(e))
+            return
+        if args[0] in FOLLOW_COMMANDS and agent_tail.is_follow(' '.join(args[1:])):
+            # following runs until interrupted, all agents are polled by one follower
+            if 'slow' in options:
+                print('ERROR: option slow can not be used with -f')
+                return
+            sub_cmd = agent_commands.AgentCommands(selector, self.base_url, self.token, self.netid,
+                                                   region=self.current_region)
+            sub_cmd.follow_agents = agents
+            if 'concurrency' in options:
+                sub_cmd.follow_concurrency = options['concurrency']
+            if 'timeout' in options:
+                # limits every poll of an agent
+                sub_cmd.agent_timeout_sec = options['timeout']
+            sub_cmd.onecmd(' '.join(args))
+            return
+        fanout = agent_fanout.AgentFanOut(self.base_url, self.token, self.netid, agents,
+                                          region=self.current_region,
+                                          concurrency=options.get('concurrency', agent_fanout.DEFAULT_CONCURRENCY),
+                                          timeout_sec=options.get('timeout', agent_fanout.DEFAULT_TIMEOUT_SEC),
+                                          slow_sec=options.get('slow', agent_fanout.DEFAULT_SLOW_SEC))
+        fanout.run(' '.join(args))
+        fanout.print_summary()
+
+    def get_agent_names(self):
+        request = agent_fanout.CLUSTER_STATUS_TEMPLATE.format(self.netid)
+        response, error = api.call(self.base_url, 'GET', request, token=self.token, response_format='json',
+                                   quiet=True)
+        if error is not None:
+            raise agent_fanout.AgentSelectorError('can not get the list of agents: {0}'.format(error))
+        return agent_fanout.agent_names(response, region=self.current_region)
+
     def help_agent(self):
         sub_cmd = agent_commands.AgentCommands('', self.base_url, self.token, self.netid, region=self.current_region)
         sub_cmd.help()
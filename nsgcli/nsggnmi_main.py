@@ -6,7 +6,6 @@ This module sends gnmi commands to the NSG Agent via NSG API server
 
 """
 from nsgcli import api
-from nsgcli.agent_commands import HashableAgentCommandResponse
 from nsgcli.sseclient import SSEClient
 from jsonpath_ng import parse
 
@@ -65,17 +64,14 @@ class NsgGnmiCommandLine:
                                    token=self.token,
                                    headers=headers,
                                    stream=True,
-                                   response_format='json_array',
+                                   response_format='json_array_stream',
                                    error_format='json_array',
                                    timeout=180)
 
         if error is None:
-            replies = []
             for acr in response:
                 status = self.parse_status(acr)
                 if status == 'ok':
-                    replies.append((status, HashableAgentCommandResponse(acr)))
-                for status, acr in replies:
                     self.print_agent_response(acr, status, self.xpath)
 
     def compose_gnmi_api_url(self, address, command):
@@ -0,0 +1,180 @@
+"""
+Batch execution of named NsgQL queries
+
+Batch file has one named query per line:
+
+    # comment
+    devices: SELECT id, name, address FROM devices ORDER BY name
+    cpu:     SELECT device, component, cpuUtil FROM cpuUtil
+             WHERE cpuUtil > 80
+
+Lines that start with white space continue the query on the previous line. Queries are
+executed by a pool of workers that share http connections (see api.get_session) and the
+result of each query is written to its own file in the output directory, named after the query.
+
+:copyright: (c) 2026 by Happy Gears, Inc
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import os
+import re
+import time
+
+from tabulate import tabulate
+
+import nsgcli.api
+from . import exporters
+from . import nsgql_stream
+from . import response_formatter
+
+QUERY_NAME = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+# file extensions used when results are not exported with one of the exporters
+TABLE_EXTENSION = '.txt'
+JSON_EXTENSION = '.json'
+
+
+class BatchError(Exception):
+    pass
+
+
+def parse_batch(lines):
+    """
+    returns list of tuples (name, query) in the order they appear in the batch file
+    """
+    queries = []
+    names = set()
+    for line_no, line in enumerate(lines, 1):
+        line = line.rstrip('\r\n')
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+        if line[0].isspace():
+            if not queries:
+                raise BatchError('line {0}: continuation line before the first query'.format(line_no))
+            name, query = queries[-1]
+            queries[-1] = (name, query + ' ' + line.strip())
+            continue
+        name, sep, query = line.partition(':')
+        name = name.strip()
+        if not sep or not query.strip():
+            raise BatchError('line {0}: expected "name: query"'.format(line_no))
+        if not QUERY_NAME.match(name):
+            raise BatchError('line {0}: query name "{1}" can only have letters, digits, "_", "-" '
+                             'and "."'.format(line_no, name))
+        if name in names:
+            raise BatchError('line {0}: duplicate query name "{1}"'.format(line_no, name))
+        names.add(name)
+        queries.append((name, query.strip()))
+    return queries
+
+
+def read_batch_file(file_name):
+    with open(file_name, 'r') as f:
+        return parse_batch(f)
+
+
+class BatchResult(object):
+
+    def __init__(self, name, path=None, rows=None, elapsed_sec=0.0, error=None):
+        self.name = name
+        self.path = path
+        self.rows = rows
+        self.elapsed_sec = elapsed_sec
+        self.error = error
+
+
+class BatchRunner(object):
+    """
+    Executes named queries using NsgQLCommandLine.post_data() and writes results. Tables are
+    written with the exporter selected by nsgql.export_format or, if it is not set, printed
+    with ResponseFormatter. Results in other formats are written as json.
+    """
+
+    def __init__(self, nsgql, output_dir='.', workers=nsgcli.api.DEFAULT_CONCURRENCY):
+        self.nsgql = nsgql
+        self.output_dir = output_dir
+        self.workers = workers
+
+    def run(self, queries):
+        """
+        execute queries, print a line as each one completes and then the summary.
+        Returns the list of BatchResult objects in the order of queries.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        started = time.time()
+        results = [None] * len(queries)
+        for idx, result in nsgcli.api.iter_concurrently(self.run_query, queries, concurrency=self.workers):
+            results[idx] = result
+            if result.error:
+                print('{0}: failed in {1:.3f} sec: {2}'.format(result.name, result.elapsed_sec, result.error))
+            else:
+                print('{0}: {1} rows in {2:.3f} sec'.format(result.name, result.rows, result.elapsed_sec))
+        self.print_summary(results, time.time() - started)
+        return results
+
+    def run_query(self, query):
+        name, nsgql_query = query
+        started = time.time()
+        path = None
+        rows = None
+        try:
+            response, error = self.nsgql.post_data([nsgql_query], quiet=True)
+            if error is None:
+                path = self.result_path(name)
+                rows, error = self.write_result(response, path)
+        except Exception as e:
+            error = 'ERROR: {0}'.format(e)
+        return BatchResult(name, path=path, rows=rows, elapsed_sec=time.time() - started, error=error)
+
+    def result_path(self, name):
+        if self.nsgql.format == 'table' and not self.nsgql.raw and self.nsgql.export_format:
+            ext = exporters.FILE_EXTENSIONS[self.nsgql.export_format]
+            if self.nsgql.compress and self.nsgql.export_format not in [exporters.EXPORT_PARQUET,
+                                                                        exporters.EXPORT_ARROW]:
+                ext += '.gz'
+        elif self.nsgql.format == 'table' and not self.nsgql.raw:
+            ext = TABLE_EXTENSION
+        else:
+            ext = JSON_EXTENSION
+        return os.path.join(self.output_dir, name + ext)
+
+    def write_result(self, response, path):
+        """
+        write the result of one query to the file. Returns tuple (number of rows, error)
+        """
+        if self.nsgql.raw or self.nsgql.format != 'table':
+            with open(path, 'wb') as f:
+                f.write(response.content)
+            return None, None
+        tables = nsgql_stream.iter_tables(response)
+        table = next(tables, None)
+        if table is None:
+            return None, 'server returned no data'
+        error = self.nsgql.is_error(table)
+        if error:
+            return None, 'Server error: {0}'.format(error)
+        if self.nsgql.export_format:
+            writer = exporters.make_writer(self.nsgql.export_format)
+            rows = writer.write(table, path, compress=self.nsgql.compress)
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                formatter = response_formatter.ResponseFormatter(time_format=self.nsgql.time_format,
+                                                                 stream_sample_size=self.nsgql.stream_sample_rows,
+                                                                 overflow=self.nsgql.overflow, out=f)
+                rows = formatter.print_result_as_table(table)
+        # read the rest of the response so that the connection can be reused
+        for _ in tables:
+            pass
+        return rows, None
+
+    def print_summary(self, results, elapsed_sec):
+        table = []
+        for result in results:
+            table.append([result.name, 'failed' if result.error else 'ok',
+                          '' if result.rows is None else result.rows,
+                          round(result.elapsed_sec, 3), result.path if not result.error else result.error])
+        print(tabulate(table, ['query', 'status', 'rows', 'elapsed (sec)', 'output'], tablefmt='fancy_outline'))
+        failed = len([r for r in results if r.error])
+        print('Queries: {0}, failed: {1}, workers: {2}, total query time: {3:.3f} sec, elapsed: {4:.3f} sec'.format(
+            len(results), failed, self.workers, sum(r.elapsed_sec for r in results), elapsed_sec))
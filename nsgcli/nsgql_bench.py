@@ -0,0 +1,204 @@
+"""
+Benchmark of NsgQL query execution
+
+Runs the query N times, optionally several at a time, and measures each phase separately:
+
+    connect    time to open TCP connection to the server (plus TLS handshake for https). This is
+               measured with a separate probe connection because API calls reuse pooled connections
+    ttfb       time from sending the request to receiving the first byte of the response body
+    download   time from the first to the last byte of the response body
+    decode     time to parse the response json
+    format     time to format the result as a table (the output is discarded)
+    server     processing time reported by the server (processingTimeMs)
+    total      time from sending the request to the end of formatting
+
+:copyright: (c) 2026 by Happy Gears, Inc
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import datetime
+import io
+import json
+import socket
+import ssl
+import time
+from urllib.parse import unquote, urlsplit
+
+import numpy as np
+from tabulate import tabulate
+
+import nsgcli.api
+from . import response_formatter
+from .version import __version__
+
+PHASES = ['connect', 'ttfb', 'download', 'decode', 'format', 'server', 'total']
+PERCENTILES = [50, 90, 99]
+
+CHUNK_SIZE = 64 * 1024
+
+
+class BenchError(Exception):
+    pass
+
+
+def parse_bench_args(arg):
+    """
+    parse arguments of the command 'bench N [concurrency=C] [save=file] query'
+
+    :return: tuple (runs, concurrency, file name or None, query)
+    """
+    words = arg.split()
+    usage = 'usage: bench N [concurrency=C] [save=file] query'
+    if len(words) < 2:
+        raise BenchError(usage)
+    try:
+        runs = int(words.pop(0))
+    except ValueError:
+        raise BenchError(usage)
+    if runs < 1:
+        raise BenchError('number of runs must be greater than 0')
+    concurrency = 1
+    save_file = None
+    while words and '=' in words[0] and words[0].split('=')[0] in ['concurrency', 'save']:
+        name, value = words.pop(0).split('=', 1)
+        if name == 'concurrency':
+            try:
+                concurrency = int(value)
+            except ValueError:
+                raise BenchError(usage)
+            if concurrency < 1:
+                raise BenchError('concurrency must be greater than 0')
+        else:
+            save_file = value
+    if not words:
+        raise BenchError('query is missing')
+    return runs, concurrency, save_file, ' '.join(words)
+
+
+def measure_connect(base_url, timeout):
+    """
+    open and close a new connection to the server and return the time it took, in seconds
+    """
+    parts = urlsplit(base_url)
+    started = time.perf_counter()
+    if parts.scheme == 'http+unix':
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(unquote(parts.netloc))
+    else:
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        sock = socket.create_connection((parts.hostname, port), timeout=timeout)
+        if parts.scheme == 'https':
+            # api calls do not verify server certificates, neither does the probe
+            context = ssl.create_default_context()
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+            sock = context.wrap_socket(sock, server_hostname=parts.hostname)
+    elapsed = time.perf_counter() - started
+    sock.close()
+    return elapsed
+
+
+class QueryBenchmark(object):
+    """
+    :param nsgql:   NsgQLCommandLine; queries are sent with its post_data() bypassing the result cache
+    """
+
+    def __init__(self, nsgql, query, runs, concurrency=1):
+        self.nsgql = nsgql
+        self.query = query
+        self.runs = runs
+        self.concurrency = concurrency
+        self.samples = []
+        self.errors = []
+
+    def run(self):
+        results = nsgcli.api.iter_concurrently(self.run_once, list(range(self.runs)), concurrency=self.concurrency)
+        for _, (sample, error) in results:
+            if error is not None:
+                self.errors.append(error)
+            else:
+                self.samples.append(sample)
+        return self
+
+    def run_once(self, _):
+        sample = {}
+        try:
+            sample['connect'] = measure_connect(self.nsgql.base_url, self.nsgql.timeout_sec)
+        except OSError as e:
+            return None, 'connect: {0}'.format(e)
+        started = time.perf_counter()
+        response, error = self.nsgql.post_data([self.query], quiet=True, use_cache=False)
+        if error is not None:
+            return None, error
+        try:
+            chunks = []
+            first_byte = None
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if first_byte is None:
+                    first_byte = time.perf_counter()
+                chunks.append(chunk)
+            downloaded = time.perf_counter()
+            if first_byte is None:
+                first_byte = downloaded
+            data = json.loads(b''.join(chunks))
+            decoded = time.perf_counter()
+        except Exception as e:
+            return None, 'ERROR: {0}'.format(e)
+        table = data[0] if isinstance(data, list) and data else data
+        error = self.nsgql.is_error(table)
+        if error:
+            return None, 'Server error: {0}'.format(error)
+        formatter = response_formatter.ResponseFormatter(time_format=self.nsgql.time_format, out=io.StringIO())
+        formatter.print_result_as_table(table)
+        formatted = time.perf_counter()
+        sample['ttfb'] = first_byte - started
+        sample['download'] = downloaded - first_byte
+        sample['decode'] = decoded - downloaded
+        sample['format'] = formatted - decoded
+        sample['server'] = table.get('processingTimeMs', 0) / 1000.0
+        sample['total'] = formatted - started
+        return sample, None
+
+    def summary(self):
+        """
+        :return: dictionary phase -> {'p50': ms, 'p90': ms, 'p99': ms, 'mean': ms, 'max': ms}
+        """
+        result = {}
+        if not self.samples:
+            return result
+        for phase in PHASES:
+            values = np.array([s[phase] for s in self.samples]) * 1000.0
+            stats = {'p{0}'.format(p): float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+            stats['mean'] = float(values.mean())
+            stats['max'] = float(values.max())
+            result[phase] = stats
+        return result
+
+    def print_report(self):
+        summary = self.summary()
+        headers = ['phase (ms)'] + ['p{0}'.format(p) for p in PERCENTILES] + ['mean', 'max']
+        table = [[phase] + [round(summary[phase][h], 3) for h in headers[1:]] for phase in PHASES if phase in summary]
+        print(tabulate(table, headers, tablefmt='fancy_outline'))
+        print('Runs: {0}, concurrency: {1}, errors: {2}'.format(self.runs, self.concurrency, len(self.errors)))
+        for error in sorted(set(self.errors)):
+            print('  {0}'.format(error))
+
+    def to_dict(self):
+        return {
+            'query': self.query,
+            'base_url': self.nsgql.base_url,
+            'netid': self.nsgql.netid,
+            'client_version': __version__,
+            'time': datetime.datetime.utcnow().isoformat() + 'Z',
+            'runs': self.runs,
+            'concurrency': self.concurrency,
+            'summary': self.summary(),
+            'samples': [{phase: s[phase] * 1000.0 for phase in PHASES} for s in self.samples],
+            'errors': self.errors,
+        }
+
+    def save(self, file_name):
+        with open(file_name, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
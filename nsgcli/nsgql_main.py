@@ -7,20 +7,48 @@ This module implements subset of NetSpyGlass CLI commands
 """
 
 import json
+import re
+import time
 from cmd import Cmd
 
 import nsgcli.api
+from . import analytics
+from . import exporters
+from . import nsgql_bench
+from . import nsgql_paging
+from . import nsgql_stream
+from . import nsgql_watch
+from . import nsgql_windows
+from . import query_cache
 from . import response_formatter
+from . import response_handlers
+from . import table_renderer
+from . import timeseries
 
 TIME_FORMAT_MS = 'ms'
 TIME_FORMAT_ISO_UTC = 'iso_utc'
 TIME_FORMAT_ISO_LOCAL = 'iso_local'
 
+# tables with more rows than this are printed as rows arrive, see ResponseFormatter
+DEFAULT_STREAM_SAMPLE_ROWS = 1000
+
+NSGQL_KEYWORDS = ['SELECT', 'FROM', 'WHERE', 'GROUP', 'ORDER', 'BY', 'LIMIT', 'AND', 'OR', 'NOT', 'LIKE', 'REGEXP',
+                  'IN', 'IS', 'NULL', 'DESC', 'ASC', 'DISTINCT']
+# words after which completion offers table names
+TABLE_NAME_CONTEXT = ['FROM', 'DESCRIBE', 'JOIN']
+SCHEMA_ARGS = ['refresh', 'clear']
+
 
 class NsgQLCommandLine(Cmd):
 
     def __init__(self, base_url=None, token=None, netid=1, output_format='table', raw=False,
-                 time_format=TIME_FORMAT_MS, timeout_set=180):
+                 time_format=TIME_FORMAT_MS, timeout_set=180, stream_sample_rows=DEFAULT_STREAM_SAMPLE_ROWS,
+                 overflow=table_renderer.OVERFLOW_TRUNCATE, export_format=None, output_file=None, compress=False,
+                 result_cache=None, statement_concurrency=1, page_size=None,
+                 prefetch_pages=nsgql_paging.DEFAULT_PREFETCH, page_retries=nsgql_paging.DEFAULT_RETRIES,
+                 downsample=None, points=timeseries.DEFAULT_POINTS, chart=None, time_from=None, time_to='now',
+                 window=nsgql_windows.DEFAULT_WINDOW, window_parallel=nsgql_windows.DEFAULT_WINDOW_PARALLEL,
+                 schema_cache=None):
         Cmd.__init__(self)
         self.base_url = base_url
         self.access_token = token
@@ -29,6 +57,24 @@ class NsgQLCommandLine(Cmd):
         self.raw = raw
         self.time_format = time_format
         self.timeout_sec = timeout_set
+        self.stream_sample_rows = stream_sample_rows
+        self.overflow = overflow
+        self.export_format = export_format
+        self.output_file = output_file
+        self.compress = compress
+        self.result_cache = result_cache
+        self.statement_concurrency = statement_concurrency
+        self.page_size = page_size
+        self.prefetch_pages = prefetch_pages
+        self.page_retries = page_retries
+        self.downsample = downsample
+        self.points = points
+        self.chart = chart
+        self.time_from = time_from
+        self.time_to = time_to
+        self.window = window
+        self.window_parallel = window_parallel
+        self.schema_cache = schema_cache
 
     def do_q(self, arg):
         """Quits the program."""
@@ -64,33 +110,375 @@ class NsgQLCommandLine(Cmd):
     def do_DESCRIBE(self, arg):
         self.execute('DESCRIBE {0}'.format(arg))
 
+    def do_schema(self, arg):
+        """
+        schema [refresh|clear]
+
+        Show status of the local schema cache used for completion of table, column and tag
+        names, refresh it in the background or clear it (e.g. after NsgQL schema has changed on the server)
+        """
+        if self.schema_cache is None:
+            print('Schema cache is off')
+            return None
+        if arg.strip() == 'refresh':
+            self.schema_cache.refresh()
+            print('Refreshing schema cache in the background')
+        elif arg.strip() == 'clear':
+            self.schema_cache.invalidate()
+            print('Schema cache cleared')
+        elif arg.strip():
+            print('Unknown argument "{0}", expected one of {1}'.format(arg.strip(), SCHEMA_ARGS))
+        else:
+            status = self.schema_cache.status()
+            updated = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(status['updated_at'])) \
+                if status['updated_at'] else 'never'
+            print('Tables: {0}, described: {1}, updated: {2}, pending refreshes: {3}'.format(
+                status['tables'], status['described'], updated, status['pending']))
+            if status['error']:
+                print('Last error: {0}'.format(status['error']))
+
+    def complete_schema(self, text, _line, _begidx, _endidx):
+        return [arg for arg in SCHEMA_ARGS if arg.startswith(text)]
+
+    def complete_select(self, text, line, begidx, endidx):
+        return self.complete_query(text, line, begidx, endidx)
+
+    def complete_SELECT(self, text, line, begidx, endidx):
+        return self.complete_query(text, line, begidx, endidx)
+
+    def complete_describe(self, text, line, begidx, endidx):
+        return self.complete_query(text, line, begidx, endidx)
+
+    def complete_DESCRIBE(self, text, line, begidx, endidx):
+        return self.complete_query(text, line, begidx, endidx)
+
+    def complete_transpose(self, text, line, begidx, endidx):
+        return self.complete_query(text, line, begidx, endidx)
+
+    def complete_TRANSPOSE(self, text, line, begidx, endidx):
+        return self.complete_query(text, line, begidx, endidx)
+
+    def complete_watch(self, text, line, begidx, endidx):
+        return self.complete_query(text, line, begidx, endidx)
+
+    def complete_query(self, text, line, begidx, _endidx):
+        """
+        complete table names after FROM and DESCRIBE, and column and tag names of the tables used
+        in the query (or of all cached tables) elsewhere. Only the local schema cache is used,
+        missing or stale data is requested in the background.
+        """
+        if self.schema_cache is None:
+            return []
+        words = line[:begidx].split()
+        previous = words[-1].upper() if words else ''
+        if previous in TABLE_NAME_CONTEXT:
+            candidates = self.schema_cache.tables()
+        else:
+            tables = re.findall(r'\bFROM\s+(\w+)', line, re.IGNORECASE)
+            names = set()
+            for table in tables:
+                columns, tags = self.schema_cache.columns(table)
+                names.update(columns)
+                names.update(tags)
+            if not tables:
+                columns, tags = self.schema_cache.all_columns()
+                names.update(columns)
+                names.update(tags)
+            candidates = sorted(names) + NSGQL_KEYWORDS
+        prefix = text.lower()
+        return [name for name in candidates if name.lower().startswith(prefix)]
+
+    def do_watch(self, arg):
+        """
+        watch <seconds> [key=col1,col2] [count=N] query
+
+        Execute query every <seconds> seconds and update the table in place, highlighting
+        values that changed. Rows are matched by the values of key columns (default: the
+        first column). Press Ctrl-C to stop.
+        """
+        try:
+            interval, key_columns, count, query = nsgql_watch.parse_watch_args(arg)
+        except (nsgql_watch.WatchError, ValueError) as e:
+            print('ERROR: {0}'.format(e))
+            return None
+        # every poll must go to the server even if the result cache is on
+        watcher = nsgql_watch.QueryWatcher(self.fetch_uncached_table, query, interval, key_columns=key_columns,
+                                           time_format=self.time_format)
+        watcher.run(count=count)
+
+    def do_bench(self, arg):
+        """
+        bench N [concurrency=C] [save=file] query
+
+        Execute query N times, C at a time, and print percentiles of the time spent in each
+        phase: connect, time to first byte, download, json decode, formatting and server
+        processing time. With save=file, samples and summary are also saved as json.
+        """
+        try:
+            runs, concurrency, save_file, query = nsgql_bench.parse_bench_args(arg)
+        except (nsgql_bench.BenchError, ValueError) as e:
+            print('ERROR: {0}'.format(e))
+            return None
+        benchmark = nsgql_bench.QueryBenchmark(self, query, runs, concurrency=concurrency).run()
+        benchmark.print_report()
+        if save_file:
+            try:
+                benchmark.save(save_file)
+                print('Saved results to {0}'.format(save_file))
+            except OSError as e:
+                print('ERROR: can not save results to {0}: {1}'.format(save_file, e))
+
     def execute(self, arg):
+        statements = [q for q in arg.split(';') if q.strip()]
+        if any(analytics.has_stages(q) for q in statements):
+            self.execute_pipeline(statements)
+            return None
+        if self.time_from is not None and self.format == 'time_series' and not self.raw:
+            self.execute_windowed(statements)
+            return None
+        if self.statement_concurrency > 1 and len(statements) > 1:
+            self.execute_concurrently(statements)
+            return None
+        if self.page_size and self.format == 'table' and not self.raw and \
+                any(nsgql_paging.is_pageable(q) for q in statements):
+            self.execute_paged(statements)
+            return None
         response, error = self.post_data(arg.split(';'))
         if error is None:
-            table_formatter = response_formatter.ResponseFormatter(time_format=self.time_format)
-            if self.raw:
-                print(response.content)
+            self.print_response(response)
+
+    def execute_pipeline(self, statements):
+        """
+        execute statements one by one and apply client side processing stages to the results
+        of the statements that have them, see analytics
+        """
+        for idx, statement in enumerate(statements):
+            query, stages = analytics.split_pipeline(statement)
+            if not stages:
+                response, error = self.post_data([query])
+                if error is None:
+                    self.print_response(response, first_index=idx)
+                continue
+            if self.format != 'table' or self.raw:
+                print('ERROR: processing stages require query result format "table"')
                 return None
+            response, error = self.post_data([query])
+            if error is not None:
+                continue
             try:
-                deserialized = response.json()
-            except Exception as e:
-                print('ERROR: {0}, response={1}'.format(e, response.content))
-                return None
-            # print(deserialized)
-            # print(type(line))
-            # print(line)
-            if self.format == 'table':
-                for resp in deserialized:
+                for table in nsgql_stream.iter_tables(response):
+                    error = self.is_error(table)
+                    if error:
+                        print('Server error: {0}'.format(error))
+                        continue
+                    self.print_table(analytics.apply_stages(table, stages), idx)
+            except (analytics.AnalyticsError, nsgql_stream.StreamParseError, exporters.ExportError) as e:
+                print('ERROR: {0}'.format(e))
+
+    def execute_windowed(self, statements):
+        """
+        split time range [self.time_from, self.time_to) into windows of self.window_ms, execute
+        every statement for all windows concurrently, with at most self.window_parallel requests
+        in flight, and print series stitched together
+        """
+        try:
+            now_ms = int(time.time() * 1000)
+            start_ms = nsgql_windows.parse_time(self.time_from, now_ms)
+            end_ms = nsgql_windows.parse_time(self.time_to, now_ms)
+            windows = nsgql_windows.split_range(start_ms, end_ms, nsgql_windows.parse_duration(self.window))
+        except nsgql_windows.WindowError as e:
+            print('ERROR: {0}'.format(e))
+            return None
+        for statement in statements:
+            queries = [nsgql_windows.window_query(statement, start, end) for start, end in windows]
+            series_lists = [[] for _ in windows]
+            errors = []
+            results = nsgcli.api.iter_concurrently(self.fetch_statement, queries, concurrency=self.window_parallel)
+            for idx, (response, error) in results:
+                if error is None:
+                    try:
+                        series_lists[idx], window_errors = timeseries.decode_series(response.json())
+                        error = '; '.join(str(e) for e in window_errors) or None
+                    except ValueError as e:
+                        error = str(e)
+                if error is not None:
+                    errors.append('window {0} .. {1}: {2}'.format(
+                        timeseries.format_time(windows[idx][0]), timeseries.format_time(windows[idx][1]), error))
+            self.print_series(timeseries.stitch(series_lists), sorted(errors))
+
+    def execute_concurrently(self, statements):
+        """
+        send each statement as its own request, with at most self.statement_concurrency requests
+        in flight. Results are printed in statement order, each one as soon as it and all
+        preceding statements have completed.
+        """
+        results = nsgcli.api.iter_concurrently(self.fetch_statement, statements,
+                                               concurrency=self.statement_concurrency)
+        for idx, (response, error) in nsgcli.api.in_order(results):
+            if error is not None:
+                print(error)
+                continue
+            self.print_response(response, first_index=idx)
+
+    def execute_paged(self, statements):
+        """
+        execute statements one by one; SELECT statements without LIMIT are split into pages
+        of self.page_size rows, see nsgql_paging
+        """
+        for idx, statement in enumerate(statements):
+            pageable = nsgql_paging.is_pageable(statement)
+            if pageable and not nsgql_paging.has_order_by(statement):
+                print('WARNING: query has no ORDER BY, pages could overlap or miss rows; '
+                      'it is executed without paging')
+                pageable = False
+            if not pageable:
+                response, error = self.post_data([statement])
+                if error is None:
+                    self.print_response(response, first_index=idx)
+                continue
+            table = nsgql_paging.PagedTable(self.fetch_table, statement, self.page_size,
+                                            prefetch=self.prefetch_pages, retries=self.page_retries)
+            if table.error:
+                print('Server error: {0}'.format(table.error))
+                continue
+            try:
+                self.print_table(table, idx)
+            except nsgql_paging.PageError as e:
+                print('ERROR: {0}'.format(e))
+
+    def fetch_table(self, query, use_cache=True):
+        """
+        execute single query and return its result as a dictionary (columns, rows etc)
+        """
+        response, error = self.post_data([query], quiet=True, use_cache=use_cache)
+        if error is not None:
+            return None, error
+        try:
+            tables = [t.to_dict() for t in nsgql_stream.iter_tables(response)]
+        except nsgql_stream.StreamParseError as e:
+            # the response was cut off or garbled in transit, the request can be repeated
+            return None, nsgcli.api.ApiError(str(e))
+        if not tables:
+            return None, 'server returned no data'
+        error = self.is_error(tables[0])
+        if error:
+            return None, error
+        return tables[0], None
+
+    def fetch_uncached_table(self, query):
+        return self.fetch_table(query, use_cache=False)
+
+    def fetch_statement(self, statement):
+        """
+        execute one statement and read the whole response so that the request is complete
+        when this function returns
+        """
+        response, error = self.post_data([statement], quiet=True)
+        if error is not None or isinstance(response, response_handlers.BufferedResponse):
+            return response, error
+        try:
+            return response_handlers.BufferedResponse(response.content,
+                                                      cache_status=getattr(response, 'cache_status', None)), None
+        except Exception as e:
+            return None, 'ERROR: {0}'.format(e)
+
+    def print_response(self, response, first_index=0):
+        """
+        print or export results of the query
+
+        :param response:     http response
+        :param first_index:  index of the first statement of the query in the command, used
+                             to name export files
+        """
+        if self.raw:
+            print(response.content)
+            return None
+        if self.format == 'table':
+            # parse the response incrementally and pass rows to the formatter as they arrive
+            try:
+                for idx, resp in enumerate(nsgql_stream.iter_tables(response), first_index):
                     error = self.is_error(resp)
                     if error:
                         print('Server error: {0}'.format(error))
                         continue
-                    table_formatter.print_result_as_table(resp)
-                return
-            print(json.dumps(deserialized))
-            # print(deserialized)
+                    self.print_table(resp, idx, cache_status=self.cache_status(response))
+            except (nsgql_stream.StreamParseError, exporters.ExportError) as e:
+                print('ERROR: {0}'.format(e))
+            return None
+        if self.export_format:
+            print('ERROR: export format {0} requires query result format "table"'.format(self.export_format))
+            return None
+        try:
+            deserialized = response.json()
+        except Exception as e:
+            print('ERROR: {0}, response={1}'.format(e, response.content))
+            return None
+        if self.format == 'time_series' and (self.downsample or self.chart):
+            self.print_time_series(deserialized)
+            return None
+        print(json.dumps(deserialized))
+
+    def print_time_series(self, deserialized):
+        """
+        decode time series, downsample them if downsampling method has been set and print them
+        either as json in the same format the server uses or as charts
+        """
+        series_list, errors = timeseries.decode_series(deserialized)
+        self.print_series(series_list, errors)
+
+    def print_series(self, series_list, errors):
+        for error in errors:
+            print('Server error: {0}'.format(error))
+        try:
+            result = []
+            for series in series_list:
+                original_count = len(series)
+                if self.downsample:
+                    series = timeseries.downsample(series, self.downsample, self.points)
+                if self.chart:
+                    for line in timeseries.render(series, self.chart, original_count=original_count):
+                        print(line)
+                else:
+                    result.append(series.to_dict())
+        except timeseries.TimeSeriesError as e:
+            print('ERROR: {0}'.format(e))
+            return None
+        if not self.chart:
+            print(json.dumps(result))
+
+    def print_table(self, table, index, cache_status=None):
+        """
+        print table result or write it with the exporter if export format has been set
+        """
+        if self.export_format:
+            self.export_table(table, index)
+        else:
+            table_formatter = response_formatter.ResponseFormatter(time_format=self.time_format,
+                                                                   stream_sample_size=self.stream_sample_rows,
+                                                                   overflow=self.overflow)
+            table_formatter.print_result_as_table(table, cache_status=cache_status)
+
+    @staticmethod
+    def cache_status(response):
+        status = getattr(response, 'cache_status', None)
+        if status == query_cache.CACHE_HIT:
+            return '{0} (age {1:.0f} sec)'.format(status, response.age_sec)
+        return status
+
+    def export_table(self, table, index):
+        """
+        write query result using client side writer selected by self.export_format. If there are
+        several results, each goes to its own file (see exporters.output_path)
+        """
+        writer = exporters.make_writer(self.export_format)
+        path = exporters.output_path(self.output_file, index)
+        count = writer.write(table, path, compress=self.compress)
+        if path and path != '-':
+            print('Wrote {0} rows to {1}'.format(count, path))
 
     def is_error(self, response):
+        if isinstance(response, nsgql_stream.StreamedTable):
+            return response.error
         if isinstance(response, dict) and 'error' in response:
             error = response.get('error', '')
             return error
@@ -106,11 +494,13 @@ class NsgQLCommandLine(Cmd):
         print('Base url: {0}'.format(self.base_url))
         print('To exit, enter "quit" or "q" at the prompt')
 
-    def post_data(self, queries):
+    def post_data(self, queries, quiet=False, use_cache=True):
         """
         Make NetSpyGlass JSON API call to execute query
 
         :param queries  -- a lisrt of NsgQL queries
+        :param quiet    -- if True, errors are returned but not printed
+        :param use_cache -- if False, the result cache is not used even if it has been configured
         """
         path = "/v2/query/net/{0}/data/".format(self.netid)
         # if self.access_token:
@@ -129,6 +519,17 @@ class NsgQLCommandLine(Cmd):
                     }
                 )
 
-        return nsgcli.api.call(self.base_url, 'POST', path, data=nsgql,
-                               token=self.access_token, stream=True,
-                               timeout=self.timeout_sec, error_format='json_array')
+        key = None
+        if self.result_cache is not None and use_cache:
+            key = query_cache.cache_key(self.base_url, self.netid, self.format, queries)
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                return cached, None
+
+        response, error = nsgcli.api.call(self.base_url, 'POST', path, data=nsgql,
+                                          token=self.access_token, stream=True,
+                                          timeout=self.timeout_sec, error_format='json_array', quiet=quiet)
+        if error is None and key is not None:
+            # response body is saved in the cache when it has been read completely
+            response = self.result_cache.wrap(key, response)
+        return response, error
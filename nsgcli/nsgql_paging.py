@@ -0,0 +1,170 @@
+"""
+Auto-pagination of large NsgQL SELECT queries
+
+A SELECT query without LIMIT is split into pages by adding LIMIT offset, page_size to it.
+Pages are fetched by a small pool of threads a few pages ahead of the consumer and their
+rows are combined into one result, so the server never has to build, and the client never
+has to hold, more than a few pages at a time. A failed page is retried without restarting
+the whole query if the error is transient (the request could not be sent or the server
+answered with 5xx); errors in the query itself fail the query right away. Once a page shorter
+than page_size has been received, no pages after it are requested.
+
+Pages are consistent only if the query has ORDER BY that defines unique order of rows, so
+queries without ORDER BY are not split into pages (see has_order_by()).
+
+:copyright: (c) 2026 by Happy Gears, Inc
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import concurrent.futures
+import re
+import threading
+import time
+
+from . import api
+
+PAGE_LIMIT_TEMPLATE = '{0} LIMIT {1}, {2}'
+
+DEFAULT_PREFETCH = 2
+DEFAULT_RETRIES = 3
+RETRY_DELAY_SEC = 1.0
+
+QUOTED_STRING = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'')
+SELECT = re.compile(r'^\s*SELECT\b', re.IGNORECASE)
+LIMIT = re.compile(r'\bLIMIT\b', re.IGNORECASE)
+ORDER_BY = re.compile(r'\bORDER\s+BY\b', re.IGNORECASE)
+
+
+class PageError(Exception):
+    pass
+
+
+def is_pageable(query):
+    """
+    only SELECT queries that do not have their own LIMIT can be split into pages
+    """
+    unquoted = QUOTED_STRING.sub('""', query)
+    return SELECT.match(unquoted) is not None and LIMIT.search(unquoted) is None
+
+
+def has_order_by(query):
+    return ORDER_BY.search(QUOTED_STRING.sub('""', query)) is not None
+
+
+def is_transient(error):
+    return isinstance(error, api.ApiError) and error.is_transient()
+
+
+def page_query(query, offset, page_size):
+    return PAGE_LIMIT_TEMPLATE.format(query.strip(), offset, page_size)
+
+
+class PagedTable(object):
+    """
+    Combined result of all pages of the query. Implements the same read-only interface as
+    nsgql_stream.StreamedTable so it can be passed to ResponseFormatter and the exporters.
+
+    :param fetch_page:   function (query) -> (table dictionary, error). Server errors reported
+                         in the table must be returned as error. Only errors that are api.ApiError
+                         with is_transient() == True are retried
+    """
+
+    def __init__(self, fetch_page, query, page_size, prefetch=DEFAULT_PREFETCH, retries=DEFAULT_RETRIES):
+        self.fetch_page = fetch_page
+        self.query = query
+        self.page_size = page_size
+        self.prefetch = max(1, prefetch)
+        self.retries = retries
+        self.columns = None
+        self.meta = {}
+        self.error = None
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.prefetch)
+        self._futures = {}
+        self._next_page = 0
+        self._first_page = None
+        self._done = False
+        # index of the first page shorter than page_size, once it has been received
+        self._last_page = None
+        self._lock = threading.Lock()
+        # the first page is fetched right away because it provides columns or the error
+        try:
+            self._first_page = self._next_result()
+        except PageError as e:
+            self.error = str(e)
+            self._done = True
+            self.close()
+            return
+        first = self._first_page
+        self.columns = first.get('columns')
+        self.meta = {k: v for k, v in first.items() if k not in ('columns', 'rows')}
+
+    def _is_past_end(self, page):
+        with self._lock:
+            return self._last_page is not None and page > self._last_page
+
+    def _fetch_with_retries(self, page):
+        query = page_query(self.query, page * self.page_size, self.page_size)
+        error = None
+        for attempt in range(0, self.retries + 1):
+            if attempt:
+                time.sleep(RETRY_DELAY_SEC * attempt)
+            if self._is_past_end(page):
+                return {'rows': []}
+            table, error = self.fetch_page(query)
+            if error is None:
+                if len(table.get('rows', [])) < self.page_size:
+                    with self._lock:
+                        if self._last_page is None or page < self._last_page:
+                            self._last_page = page
+                return table
+            if not is_transient(error):
+                raise PageError('page {0} failed: {1}'.format(page, error))
+        raise PageError('page {0} failed after {1} attempts: {2}'.format(page, self.retries + 1, error))
+
+    def _schedule(self):
+        while not self._done and len(self._futures) < self.prefetch:
+            page = self._next_page + len(self._futures)
+            if self._is_past_end(page):
+                break
+            self._futures[page] = self._executor.submit(self._fetch_with_retries, page)
+
+    def _next_result(self):
+        self._schedule()
+        future = self._futures.pop(self._next_page)
+        self._next_page += 1
+        return future.result()
+
+    def rows(self):
+        try:
+            page = self._first_page
+            self._first_page = None
+            while page is not None:
+                rows = page.get('rows', [])
+                if len(rows) < self.page_size:
+                    self._done = True
+                yield from rows
+                if self._done:
+                    break
+                page = self._next_result()
+                self.meta['processingTimeMs'] = self.meta.get('processingTimeMs', 0) + \
+                    page.get('processingTimeMs', 0)
+        finally:
+            self.close()
+
+    def close(self):
+        self._done = True
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+        self._executor.shutdown(wait=False)
+
+    def get(self, key, default=None):
+        if key == 'columns':
+            return self.columns if self.columns is not None else default
+        if key == 'rows':
+            return self.rows()
+        return self.meta.get(key, default)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
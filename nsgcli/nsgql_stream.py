@@ -0,0 +1,272 @@
+"""
+Incremental parser for NsgQL table responses
+
+The server returns the result of /v2/query/net/{id}/data/ as a json array with one object per
+query target:
+
+    [{"columns": [{"text": "device"}, ...], "rows": [["dev1", ...], ...], "processingTimeMs": 12, ...}, ...]
+
+This module walks this structure as it arrives from the socket and yields column metadata
+and then rows one at a time, so that memory use does not depend on the number of rows.
+
+:copyright: (c) 2026 by Happy Gears, Inc
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import collections
+import json
+
+CHUNK_SIZE = 64 * 1024
+
+WHITESPACE = ' \t\n\r'
+
+EVENT_START = 'start'
+EVENT_FIELD = 'field'
+EVENT_ROW = 'row'
+EVENT_END = 'end'
+
+
+class StreamParseError(ValueError):
+    pass
+
+
+class TableStreamParser(object):
+    """
+    Pull parser that converts a sequence of text chunks into events:
+
+        (EVENT_START, None)           -- beginning of the next query result object
+        (EVENT_FIELD, (key, value))   -- a key of the result object other than "rows"
+        (EVENT_ROW, row)              -- one element of the "rows" array
+        (EVENT_END, None)             -- end of the result object
+
+    If an element of the top level array is not an object, it is reported as
+    a result with a single field "value"
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self):
+        if self._eof:
+            return False
+        for chunk in self._chunks:
+            if isinstance(chunk, bytes):
+                chunk = chunk.decode('utf-8')
+            if not chunk:
+                continue
+            self._buf = self._buf[self._pos:] + chunk
+            self._pos = 0
+            return True
+        self._eof = True
+        return False
+
+    def _peek(self):
+        """
+        skip white space and return the next character without consuming it, or '' at the end of input
+        """
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, chars):
+        ch = self._peek()
+        if not ch or ch not in chars:
+            raise StreamParseError('expected one of "{0}" but got "{1}" at: {2}'.format(
+                chars, ch, self._buf[self._pos:self._pos + 40]))
+        self._pos += 1
+        return ch
+
+    def _value(self):
+        """
+        decode next json value. Every value we decode here is followed by at least one more
+        character (',', ']' or '}'), this is how we know a number has not been cut off at the end
+        of a chunk.
+        """
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError as error:
+                if not self._fill():
+                    raise StreamParseError(str(error))
+                continue
+            if end < len(self._buf) or not self._fill():
+                self._pos = end
+                return value
+
+    def events(self):
+        yield from self._top_level_events()
+        # read the rest of the input (normally just white space) so that the http response
+        # is consumed completely and its connection can be reused
+        while self._peek():
+            self._pos = len(self._buf)
+
+    def _top_level_events(self):
+        first = self._peek()
+        if not first:
+            return
+        if first == '{':
+            # single object rather than an array, e.g. an error
+            yield from self._object_events()
+            return
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            if self._peek() == '{':
+                yield from self._object_events()
+            else:
+                yield EVENT_START, None
+                yield EVENT_FIELD, ('value', self._value())
+                yield EVENT_END, None
+            if self._expect(',]') == ']':
+                return
+
+    def _object_events(self):
+        self._expect('{')
+        yield EVENT_START, None
+        if self._peek() == '}':
+            self._pos += 1
+            yield EVENT_END, None
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            if key == 'rows' and self._peek() == '[':
+                self._pos += 1
+                if self._peek() == ']':
+                    self._pos += 1
+                else:
+                    while True:
+                        yield EVENT_ROW, self._value()
+                        if self._expect(',]') == ']':
+                            break
+            else:
+                yield EVENT_FIELD, (key, self._value())
+            if self._expect(',}') == '}':
+                break
+        yield EVENT_END, None
+
+
+class StreamedTable(object):
+    """
+    One query result being read from the stream. Column metadata becomes available as soon as
+    it has been received, rows are returned by the generator rows(). Other fields of the result
+    (processingTimeMs, server, queryId, error etc.) are available through get(). Fields that the
+    server sends after "rows" are only available after the rows have been iterated; until then
+    get() returns the default for them rather than reading and buffering the rows.
+
+    This object mimics the read-only interface of the dictionary ResponseFormatter works with,
+    i.e. table.get('rows') and table.get('columns') work the same way.
+    """
+
+    def __init__(self, events):
+        self._events = events
+        self._pending_rows = collections.deque()
+        self._done = False
+        self.columns = None
+        self.meta = {}
+
+    def _advance(self):
+        if self._done:
+            return False
+        event, value = next(self._events, (EVENT_END, None))
+        if event == EVENT_FIELD:
+            key, field_value = value
+            if key == 'columns':
+                self.columns = field_value
+            else:
+                self.meta[key] = field_value
+        elif event == EVENT_ROW:
+            self._pending_rows.append(value)
+        elif event == EVENT_END:
+            self._done = True
+        return True
+
+    def _read_header(self):
+        """
+        read until we have column metadata, the first row or the end of the object
+        """
+        while self.columns is None and not self._pending_rows and self._advance():
+            pass
+
+    def rows(self):
+        while True:
+            if self._pending_rows:
+                yield self._pending_rows.popleft()
+            elif not self._advance():
+                return
+
+    def finish(self):
+        """
+        skip the rest of this result
+        """
+        self._pending_rows.clear()
+        while self._advance():
+            self._pending_rows.clear()
+
+    @property
+    def error(self):
+        self._read_header()
+        if self.columns is None and not self._pending_rows:
+            return self.meta.get('error')
+        return None
+
+    def get(self, key, default=None):
+        if key == 'columns':
+            self._read_header()
+            return self.columns if self.columns is not None else default
+        if key == 'rows':
+            return self.rows()
+        # stop at the first row so that rows are never buffered to reach a field
+        while key not in self.meta and not self._pending_rows and self._advance():
+            pass
+        return self.meta.get(key, default)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def to_dict(self):
+        """
+        read the rest of this result and return it as a dictionary
+        """
+        rows = list(self.rows())
+        result = dict(self.meta)
+        if self.columns is not None:
+            result['columns'] = self.columns
+        result['rows'] = rows
+        return result
+
+
+def parse_tables(chunks):
+    """
+    Generator that yields StreamedTable objects, one per query target. The caller must finish
+    reading one table before it asks for the next one; unread rows are skipped.
+    """
+    events = TableStreamParser(chunks).events()
+    while True:
+        event, _ = next(events, (None, None))
+        if event is None:
+            return
+        if event != EVENT_START:
+            raise StreamParseError('unexpected parser event {0}'.format(event))
+        table = StreamedTable(events)
+        yield table
+        table.finish()
+
+
+def iter_tables(response, chunk_size=CHUNK_SIZE):
+    """
+    read NsgQL table response incrementally from the streaming http response
+    """
+    return parse_tables(response.iter_content(chunk_size=chunk_size, decode_unicode=True))
@@ -0,0 +1,235 @@
+"""
+Periodic execution of NsgQL query with in-place update of the result table
+
+The query is executed every N seconds on a background thread. Each result is compared with the
+previous one row by row, with rows matched by the values of key columns; rows with the same key
+values are told apart by the order in which they come in the result. Only rows that changed
+are redrawn, using ANSI escape sequences to move the cursor, and changed values are highlighted.
+If rows were added or removed, the whole table is redrawn in place.
+
+If the previous request has not finished when the next tick comes, the tick is skipped so that
+there is never more than one request in flight.
+
+:copyright: (c) 2026 by Happy Gears, Inc
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import concurrent.futures
+import sys
+import time
+
+from . import response_formatter
+from . import table_renderer
+from .table_renderer import CLEAR_LINE, CLEAR_TO_END, CURSOR_DOWN, CURSOR_UP
+
+# lines printed before the first row (top border, header, separator) and after the last
+# row (bottom border, status line)
+HEADER_LINES = 3
+FOOTER_LINES = 2
+
+
+class WatchError(Exception):
+    pass
+
+
+def parse_watch_args(arg):
+    """
+    parse arguments of the command 'watch <seconds> [key=col1,col2] [count=N] query'
+
+    :return: tuple (interval, key columns or None, count or None, query)
+    """
+    words = arg.split()
+    if len(words) < 2:
+        raise WatchError('usage: watch <seconds> [key=col1,col2] [count=N] query')
+    try:
+        interval = float(words.pop(0))
+    except ValueError:
+        raise WatchError('interval must be a number of seconds')
+    if interval <= 0:
+        raise WatchError('interval must be greater than 0')
+    key_columns = None
+    count = None
+    while words and '=' in words[0] and words[0].split('=')[0] in ['key', 'count']:
+        name, value = words.pop(0).split('=', 1)
+        if name == 'key':
+            key_columns = [c for c in value.split(',') if c]
+        else:
+            try:
+                count = int(value)
+            except ValueError:
+                raise WatchError('count must be an integer')
+            if count < 1:
+                raise WatchError('count must be greater than 0')
+    if not words:
+        raise WatchError('query is missing')
+    return interval, key_columns, count, ' '.join(words)
+
+
+class QueryWatcher(object):
+    """
+    :param fetch:        function (query) -> (table dictionary, error) that does not use the result cache,
+                         e.g. NsgQLCommandLine.fetch_uncached_table
+    :param key_columns:  names of the columns that identify a row. Default is the first column
+    """
+
+    def __init__(self, fetch, query, interval, key_columns=None, time_format=response_formatter.TIME_FORMAT_MS,
+                 out=None):
+        self.fetch = fetch
+        self.query = query
+        self.interval = interval
+        self.key_columns = key_columns
+        self.formatter = response_formatter.ResponseFormatter(time_format=time_format)
+        self.out = out
+        self.renderer = None
+        self.columns = None
+        self.key_indexes = None
+        self.keys = []  # keys of the rows in the order they are shown on the screen
+        self.rows = {}  # key -> row as shown on the screen
+        self.highlighted = set()  # keys of the rows shown with highlighted values
+        self.lines_drawn = 0
+        self.polls = 0
+        self.skipped = 0
+        self.changed = 0
+        self.error = None
+        self.updated_at = None
+
+    def _write(self, text):
+        out = self.out if self.out is not None else sys.stdout
+        out.write(text)
+        out.flush()
+
+    def run(self, count=None):
+        """
+        poll the query until interrupted with Ctrl-C or until it has been executed `count` times
+        """
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        future = None
+        next_tick = time.monotonic()
+        try:
+            while count is None or self.polls < count or future is not None:
+                if future is None:
+                    future = executor.submit(self.fetch, self.query)
+                    self.polls += 1
+                else:
+                    self.skipped += 1
+                    self.draw_status()
+                next_tick += self.interval
+                done, _ = concurrent.futures.wait([future], timeout=max(0, next_tick - time.monotonic()))
+                if future in done:
+                    try:
+                        table, error = future.result()
+                    except Exception as e:
+                        table, error = None, str(e)
+                    self.update(table, error)
+                    future = None
+                if count is not None and self.polls >= count and future is None:
+                    break
+                time.sleep(max(0, next_tick - time.monotonic()))
+        except KeyboardInterrupt:
+            self._write('\n')
+        finally:
+            executor.shutdown(wait=False)
+
+    def update(self, table, error):
+        self.error = error
+        if error is None:
+            try:
+                self.apply(table)
+            except WatchError as e:
+                self.error = str(e)
+        self.draw_status()
+
+    def apply(self, table):
+        columns = [col['text'] for col in table.get('columns', [])]
+        transformers = [self.formatter.column_transformer(column) for column in columns]
+        rows = [self.formatter.transform_row(transformers, list(row)) for row in table.get('rows', [])]
+        self.updated_at = time.strftime('%H:%M:%S')
+        if columns != self.columns:
+            self.key_indexes = self.find_key_indexes(columns)
+            self.columns = columns
+            self.renderer = None
+        new_rows = {}
+        new_keys = []
+        occurrences = {}
+        for row in rows:
+            key_values = tuple(row[idx] if idx < len(row) else None for idx in self.key_indexes)
+            # the number of rows with the same key values seen before makes the key unique
+            occurrence = occurrences.get(key_values, 0)
+            occurrences[key_values] = occurrence + 1
+            key = key_values + (occurrence,)
+            new_keys.append(key)
+            new_rows[key] = row
+        if self.renderer is None or new_keys != self.keys:
+            self.changed = len(set(new_keys).symmetric_difference(self.keys)) + \
+                len([k for k in new_keys if k in self.rows and self.rows[k] != new_rows[k]])
+            self.redraw(new_keys, new_rows)
+            return
+        self.changed = 0
+        highlighted = set()
+        for position, key in enumerate(self.keys):
+            old_row = self.rows[key]
+            row = new_rows[key]
+            if row != old_row:
+                self.changed += 1
+                highlight = {idx for idx in range(len(row)) if idx >= len(old_row) or row[idx] != old_row[idx]}
+                self.draw_row(position, row, highlight)
+                highlighted.add(key)
+            elif key in self.highlighted:
+                # the row has not changed since the previous poll, clear the highlight
+                self.draw_row(position, row, set())
+        self.rows = new_rows
+        self.highlighted = highlighted
+
+    def find_key_indexes(self, columns):
+        if not self.key_columns:
+            return [0]
+        missing = [c for c in self.key_columns if c not in columns]
+        if missing:
+            raise WatchError('key columns {0} are not in the result'.format(missing))
+        return [columns.index(c) for c in self.key_columns]
+
+    def redraw(self, keys, rows):
+        """
+        clear the table printed before and print the whole table again
+        """
+        if self.lines_drawn:
+            self._write(CURSOR_UP.format(self.lines_drawn) + CLEAR_TO_END)
+        titles = [self.formatter.transform_column_title(column) for column in self.columns]
+        self.renderer = table_renderer.StreamingTableRenderer(titles, [rows[k] for k in keys], out=self)
+        self.renderer.print_header()
+        for key in keys:
+            self.renderer.print_row(rows[key])
+        self.renderer.print_footer()
+        self._write('\n')  # status line
+        self.keys = keys
+        self.rows = rows
+        self.highlighted = set()
+        self.lines_drawn = HEADER_LINES + len(keys) + FOOTER_LINES
+
+    def draw_row(self, position, row, highlight):
+        """
+        move cursor to the line of the row at given position, print the row and move cursor back
+        """
+        lines_up = self.lines_drawn - HEADER_LINES - position
+        self._write(CURSOR_UP.format(lines_up) + CLEAR_LINE + self.renderer.format_row(row, highlight) +
+                    '\r' + CURSOR_DOWN.format(lines_up))
+
+    def draw_status(self):
+        if not self.lines_drawn:
+            self._write('\n')
+            self.lines_drawn = 1
+        status = 'every {0:g}s: {1} | polls: {2}, skipped: {3}'.format(self.interval, self.query, self.polls,
+                                                                       self.skipped)
+        if self.updated_at:
+            status += ', updated {0}, changed rows: {1}'.format(self.updated_at, self.changed)
+        if self.error:
+            status += ' | ERROR: {0}'.format(self.error)
+        self._write(CURSOR_UP.format(1) + CLEAR_LINE + status + '\n')
+
+    def write(self, text):
+        # StreamingTableRenderer prints to this object
+        self._write(text)
+
+    def flush(self):
+        pass
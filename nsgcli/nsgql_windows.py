@@ -0,0 +1,116 @@
+"""
+Splitting time range of NsgQL time series queries into windows
+
+A query over a long time range is split into queries over consecutive windows of the range by
+adding the time condition to its WHERE clause. Windows are executed concurrently and the series
+they return are stitched back together, see timeseries.stitch()
+
+:copyright: (c) 2026 by Happy Gears, Inc
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import re
+import time
+
+import dateutil.parser
+
+# condition added to the query for every window; times are in milliseconds
+WINDOW_CONDITION_TEMPLATE = 'time >= {0} AND time < {1}'
+
+DEFAULT_WINDOW = '1d'
+DEFAULT_WINDOW_PARALLEL = 4
+
+DURATION_UNITS = {
+    's': 1000,
+    'm': 60 * 1000,
+    'h': 3600 * 1000,
+    'd': 24 * 3600 * 1000,
+    'w': 7 * 24 * 3600 * 1000,
+}
+
+DURATION = re.compile(r'^(\d+(?:\.\d+)?)([smhdw])$')
+RELATIVE_TIME = re.compile(r'^(?:now)?\s*-\s*(\d+(?:\.\d+)?[smhdw])$')
+QUOTED_STRING = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'')
+WHERE = re.compile(r'\bWHERE\b', re.IGNORECASE)
+# clauses that can follow WHERE
+CLAUSE_AFTER_WHERE = re.compile(r'\b(?:GROUP\s+BY|ORDER\s+BY|HAVING|LIMIT)\b', re.IGNORECASE)
+CLAUSE_AFTER_FROM = re.compile(r'\b(?:WHERE|GROUP\s+BY|ORDER\s+BY|HAVING|LIMIT)\b', re.IGNORECASE)
+
+
+class WindowError(Exception):
+    pass
+
+
+def parse_duration(text):
+    """
+    parse duration like '30s', '15m', '6h', '1d' or '2w' and return it in milliseconds
+    """
+    match = DURATION.match(text.strip())
+    if not match:
+        raise WindowError('invalid duration "{0}", expected a number followed by one of s, m, h, d, w'.format(text))
+    return int(float(match.group(1)) * DURATION_UNITS[match.group(2)])
+
+
+def parse_time(text, now_ms=None):
+    """
+    parse time given as 'now', relative time like 'now-30d' or '-30d', milliseconds since
+    the epoch or ISO 8601 time and return it in milliseconds since the epoch
+    """
+    if now_ms is None:
+        now_ms = int(time.time() * 1000)
+    text = text.strip()
+    if text == 'now':
+        return now_ms
+    match = RELATIVE_TIME.match(text)
+    if match:
+        return now_ms - parse_duration(match.group(1))
+    if text.isdigit():
+        return int(text)
+    try:
+        return int(dateutil.parser.isoparse(text).timestamp() * 1000)
+    except ValueError:
+        raise WindowError('invalid time "{0}"'.format(text))
+
+
+def split_range(start_ms, end_ms, window_ms):
+    """
+    :return: list of tuples (start, end) of consecutive windows that cover [start_ms, end_ms)
+    """
+    if end_ms <= start_ms:
+        raise WindowError('end of the time range must be after its beginning')
+    if window_ms <= 0:
+        raise WindowError('window must be longer than 0')
+    windows = []
+    start = start_ms
+    while start < end_ms:
+        end = min(start + window_ms, end_ms)
+        windows.append((start, end))
+        start = end
+    return windows
+
+
+def window_query(query, start_ms, end_ms):
+    """
+    add condition that selects time range [start_ms, end_ms) to the WHERE clause of the query
+    """
+    condition = WINDOW_CONDITION_TEMPLATE.format(start_ms, end_ms)
+    query = query.strip().rstrip(';')
+    # positions of keywords are looked up in the query with quoted strings blanked out
+    masked = QUOTED_STRING.sub(lambda m: '"' + ' ' * (len(m.group(0)) - 2) + '"', query)
+    where = WHERE.search(masked)
+    if where:
+        after = CLAUSE_AFTER_WHERE.search(masked, where.end())
+        end = after.start() if after else len(query)
+        existing = query[where.end():end].strip()
+        tail = query[end:].strip()
+        result = '{0} {1} AND ({2})'.format(query[:where.end()], condition, existing)
+    else:
+        from_clause = re.search(r'\bFROM\b', masked, re.IGNORECASE)
+        after = CLAUSE_AFTER_FROM.search(masked, from_clause.end() if from_clause else 0)
+        end = after.start() if after else len(query)
+        tail = query[end:].strip()
+        result = '{0} WHERE {1}'.format(query[:end].rstrip(), condition)
+    if tail:
+        result += ' ' + tail
+    return result
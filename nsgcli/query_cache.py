@@ -0,0 +1,228 @@
+"""
+Client side cache of NsgQL query results
+
+Responses are cached as raw response bodies keyed by the normalized query text, network id,
+result format and server base url. Entries expire after TTL; the in-memory cache is a size
+bounded LRU. Optionally, entries are also stored in a directory so that separate processes
+can share them.
+
+:copyright: (c) 2026 by Happy Gears, Inc
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import codecs
+import collections
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+from . import response_handlers
+
+DEFAULT_TTL_SEC = 60
+DEFAULT_MAX_ENTRIES = 128
+DEFAULT_MAX_BODY_BYTES = 64 * 1024 * 1024
+
+CACHE_HIT = 'hit'
+CACHE_MISS = 'miss'
+
+CACHE_FILE_SUFFIX = '.nsgql'
+
+
+def normalize_query(query):
+    """
+    collapse white space outside of quoted strings so that queries that differ only in formatting share
+    the cache entry
+    """
+    parts = re.split(r'("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')', query.strip().rstrip(';').strip())
+    for idx in range(0, len(parts), 2):
+        parts[idx] = re.sub(r'\s+', ' ', parts[idx])
+    return ''.join(parts)
+
+
+def cache_key(base_url, netid, result_format, queries):
+    key = json.dumps([base_url, str(netid), result_format, [normalize_query(q) for q in queries if q]])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+class CachedResponse(response_handlers.BufferedResponse):
+    """
+    Response served from the cache
+    """
+
+    def __init__(self, body, age_sec):
+        super(CachedResponse, self).__init__(body, cache_status=CACHE_HIT)
+        self.age_sec = age_sec
+
+
+class CachingResponse(object):
+    """
+    Wraps streaming http response and saves its body in the cache once the body has been read
+    completely. Bodies larger than max_body_bytes are not cached.
+    """
+
+    cache_status = CACHE_MISS
+
+    def __init__(self, response, cache, key):
+        self._response = response
+        self._cache = cache
+        self._key = key
+
+    def __getattr__(self, item):
+        return getattr(self._response, item)
+
+    @property
+    def content(self):
+        body = self._response.content
+        self._cache.put(self._key, body)
+        return body
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        decoder = codecs.getincrementaldecoder(self._response.encoding or 'utf-8')(errors='replace')
+        chunks = []
+        size = 0
+        for chunk in self._response.iter_content(chunk_size=chunk_size):
+            if chunks is not None:
+                size += len(chunk)
+                if size <= self._cache.max_body_bytes:
+                    chunks.append(chunk)
+                else:
+                    chunks = None
+            if decode_unicode:
+                chunk = decoder.decode(chunk)
+                if not chunk:
+                    continue
+            yield chunk
+        if decode_unicode:
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                yield tail
+        if chunks is not None:
+            self._cache.put(self._key, b''.join(chunks))
+
+
+class QueryCache(object):
+
+    def __init__(self, ttl_sec=DEFAULT_TTL_SEC, max_entries=DEFAULT_MAX_ENTRIES, directory=None,
+                 max_body_bytes=DEFAULT_MAX_BODY_BYTES):
+        """
+        :param ttl_sec:         entries expire after this many seconds
+        :param max_entries:     max number of entries in memory and on disk; least recently used
+                                entries are evicted first
+        :param directory:       if not None, entries are also stored as files in this directory
+        :param max_body_bytes:  responses larger than this are not cached
+        """
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_body_bytes = max_body_bytes
+        self._entries = collections.OrderedDict()  # key -> (created_at, body)
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key):
+        """
+        returns CachedResponse or None if there is no fresh entry for the key
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl_sec:
+                    self._entries.move_to_end(key)
+                    return CachedResponse(entry[1], now - entry[0])
+                del self._entries[key]
+        entry = self._read_file(key, now)
+        if entry is None:
+            return None
+        self._remember(key, entry[0], entry[1])
+        return CachedResponse(entry[1], now - entry[0])
+
+    def put(self, key, body):
+        if len(body) > self.max_body_bytes:
+            return
+        created_at = time.time()
+        self._remember(key, created_at, body)
+        self._write_file(key, body)
+
+    def wrap(self, key, response):
+        return CachingResponse(response, self, key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        for path in self._cache_files():
+            self._remove(path)
+
+    def _remember(self, key, created_at, body):
+        with self._lock:
+            self._entries[key] = (created_at, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _file_path(self, key):
+        return os.path.join(self.directory, key + CACHE_FILE_SUFFIX)
+
+    def _cache_files(self):
+        if not self.directory:
+            return []
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                if name.endswith(CACHE_FILE_SUFFIX)]
+
+    def _read_file(self, key, now):
+        if not self.directory:
+            return None
+        path = self._file_path(key)
+        try:
+            created_at = os.path.getmtime(path)
+            if now - created_at > self.ttl_sec:
+                self._remove(path)
+                return None
+            with open(path, 'rb') as f:
+                body = f.read()
+            # access time is used for LRU eviction of files
+            os.utime(path, (now, created_at))
+            return created_at, body
+        except OSError:
+            return None
+
+    def _write_file(self, key, body):
+        if not self.directory:
+            return
+        try:
+            # write to temporary file and rename it so that other processes never see partial entries
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, self._file_path(key))
+            self._evict_files()
+        except OSError as e:
+            print('Can not write query cache file in {0}: {1}'.format(self.directory, e))
+
+    def _evict_files(self):
+        files = []
+        for path in self._cache_files():
+            try:
+                files.append((os.stat(path).st_atime, path))
+            except OSError:
+                pass
+        if len(files) > self.max_entries:
+            files.sort()
+            for _, path in files[:len(files) - self.max_entries]:
+                self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -7,12 +7,15 @@ This module is part of the nsgcli package
 
 import datetime
 import numbers
+import sys
 
 import dateutil.parser
 import dateutil.tz
 import pytz
 from tabulate import tabulate
 
+from . import table_renderer
+
 TIME_COLUMNS = ['time', 'createdAt', 'updatedAt', 'accessedAt', 'expiresAt', 'startsAt', 'localTimeMs', 'activeSince',
                 'timeOfLastNotification', 'createdAt']
 TIME_ISO8601_COLUMNS = ['discoveryStartTime', 'discoveryFinishTime', 'processingFinishTime']
@@ -25,10 +28,20 @@ PERCENTAGE_VALUE_FIELDS = ['cpuUsage', 'systemMemFreePercent', 'fsUtil']
 
 BOOLEAN_VALUE_FIELDS = ['discoveryPingStatus', 'discoverySnmpStatus']
 
+UPTIME_FIELDS = ['systemUptime', 'processUptime']
+
 TIME_FORMAT_MS = 'ms'
 TIME_FORMAT_ISO_UTC = 'iso_utc'
 TIME_FORMAT_ISO_LOCAL = 'iso_local'
 
+# sets for fast lookup when transformers are selected
+_UPTIME_FIELDS = frozenset(UPTIME_FIELDS)
+_TIME_COLUMNS = frozenset(TIME_COLUMNS)
+_TIME_ISO8601_COLUMNS = frozenset(TIME_ISO8601_COLUMNS)
+_MEMORY_VALUE_FIELDS = frozenset(MEMORY_VALUE_FIELDS)
+_PERCENTAGE_VALUE_FIELDS = frozenset(PERCENTAGE_VALUE_FIELDS)
+_BOOLEAN_VALUE_FIELDS = frozenset(BOOLEAN_VALUE_FIELDS)
+
 epoch = datetime.datetime(1970, 1, 1, tzinfo=pytz.utc)
 default_tz = datetime.datetime(1970, 1, 1, tzinfo=dateutil.tz.tzlocal())
 
@@ -47,33 +60,96 @@ def percentage_fmt(num):
     return '%.2f %%' % num
 
 
+def format_duration(seconds):
+    if seconds is None:
+        return '-'
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return '{0}h {1:02d}m'.format(seconds // 3600, seconds % 3600 // 60)
+    if seconds >= 60:
+        return '{0}m {1:02d}s'.format(seconds // 60, seconds % 60)
+    return '{0}s'.format(seconds)
+
+
 class ResponseFormatter(object):
-    def __init__(self, column_title_mapping=None, time_format=TIME_FORMAT_MS):
+    def __init__(self, column_title_mapping=None, time_format=TIME_FORMAT_MS, stream_sample_size=None,
+                 overflow=table_renderer.OVERFLOW_TRUNCATE, out=None):
+        """
+        :param stream_sample_size:  if not None, tables with more rows than this are printed as
+                                    the rows arrive. Column widths are computed from the first
+                                    stream_sample_size rows. Smaller tables are printed with tabulate.
+        :param overflow:            what to do with values that do not fit into column width computed
+                                    from the sample, see table_renderer
+        :param out:                 file object to print to (default: sys.stdout)
+        """
         super(ResponseFormatter, self).__init__()
         self.column_title_mapping = column_title_mapping
         self.time_format = time_format
+        self.stream_sample_size = stream_sample_size
+        self.overflow = overflow
+        self.out = out
+        self._transformers = {}
+
+    def _print(self, *args):
+        print(*args, file=self.out if self.out is not None else sys.stdout)
 
-    def print_result_as_table(self, resp):
+    def print_result_as_table(self, resp, cache_status=None):
+        """
+        print NsgQL table result followed by the footer line with row count and server stats.
+        Returns the number of rows printed.
+
+        :param cache_status:  if not None, added to the footer (used when results come from the client side cache)
+        """
         if not 'columns' in resp:
             return '[]'
         columns = []  # e.g.:   [{u'text': u'device'}]
         for col in resp.get('columns'):
             columns.append(col['text'])
 
-        rows = resp.get('rows', [])
-        if rows:
-            for row in rows:
-                for idx in range(0, len(columns)):
-                    row[idx] = self.transform_value(columns[idx], row[idx])
-        for idx in range(0, len(columns)):
-            columns[idx] = self.transform_column_title(columns[idx])
-        print(tabulate(rows, columns, tablefmt='fancy_outline'))
+        # rows can be a list or a generator that returns rows as they are received from the server
+        rows = []
+        transformers = [self.column_transformer(column) for column in columns]
+        titles = [self.transform_column_title(column) for column in columns]
+        rows_iter = iter(resp.get('rows', []))
+        for row in rows_iter:
+            rows.append(self.transform_row(transformers, row))
+            if self.stream_sample_size and len(rows) >= self.stream_sample_size:
+                count = self.print_streaming_table(titles, transformers, rows, rows_iter)
+                break
+        else:
+            self._print(tabulate(rows, titles, tablefmt='fancy_outline'))
+            count = len(rows)
         processing_time_sec = resp.get('processingTimeMs', 0) / 1000.0
         server = resp.get('server', '')
         if server:
-            print('Count: {0}, served by: {1}, processing time: {2} sec; query id: {3}'.format(
-                len(rows), server, processing_time_sec, resp.get('queryId', 0)))
-            print('')
+            footer = 'Count: {0}, served by: {1}, processing time: {2} sec; query id: {3}'.format(
+                count, server, processing_time_sec, resp.get('queryId', 0))
+            if cache_status:
+                footer += '; cache: {0}'.format(cache_status)
+            self._print(footer)
+            self._print('')
+        return count
+
+    @staticmethod
+    def transform_row(transformers, row):
+        row[:len(transformers)] = [transform(value) for transform, value in zip(transformers, row)]
+        return row
+
+    def print_streaming_table(self, titles, transformers, sample, rows_iter):
+        """
+        print table using column widths computed from the sample, then print remaining rows
+        as they are read from rows_iter. Returns the number of rows printed
+        """
+        renderer = table_renderer.StreamingTableRenderer(titles, sample, overflow=self.overflow, out=self.out)
+        renderer.print_header()
+        for row in sample:
+            renderer.print_row(row)
+        count = len(sample)
+        for row in rows_iter:
+            renderer.print_row(self.transform_row(transformers, row))
+            count += 1
+        renderer.print_footer()
+        return count
 
     def transform_column_title(self, column):
         if column in TIME_COLUMNS or column in TIME_ISO8601_COLUMNS:
@@ -93,48 +169,111 @@ class ResponseFormatter(object):
             return column
 
     def transform_value(self, field_name, value):
-        if value == '*':
-            return value
-        if value is None or value == 'NULL':
-            return 'NULL'
+        return self.column_transformer(field_name)(value)
 
-        if field_name in ['systemUptime', 'processUptime']:
-            td = datetime.timedelta(0, float(value))
-            return str(td)
+    def column_transformer(self, field_name):
+        """
+        returns function that transforms values of the column with given name. The function
+        is selected once per column rather than once per value.
+        """
+        transformer = self._transformers.get(field_name)
+        if transformer is None:
+            transformer = with_null_check(self.make_transformer(field_name))
+            self._transformers[field_name] = transformer
+        return transformer
 
-        if field_name in TIME_COLUMNS:
+    def make_transformer(self, field_name):
+        if field_name in _UPTIME_FIELDS:
+            return uptime_fmt
+
+        if field_name in _TIME_COLUMNS:
             if self.time_format == TIME_FORMAT_ISO_UTC:
-                dt = datetime.datetime.utcfromtimestamp(float(value) / 1000.0)
-                return dt.isoformat(' ')
+                return utc_time_ms_fmt
             elif self.time_format == TIME_FORMAT_ISO_LOCAL:
-                time_as_dt = datetime.datetime.fromtimestamp(float(value) / 1000.0)
-                return time_as_dt.isoformat(' ')
+                return local_time_ms_fmt
             else:
-                return value
+                return identity
 
-        if field_name in TIME_ISO8601_COLUMNS:
-            # 2022-01-12T14:30:00.746375Z
-            dt = dateutil.parser.parse(value)
-            seconds = (dt - epoch).total_seconds()
+        if field_name in _TIME_ISO8601_COLUMNS:
             if self.time_format == TIME_FORMAT_ISO_UTC:
-                dt = datetime.datetime.utcfromtimestamp(seconds)
-                return dt.isoformat(' ')
+                return utc_time_iso8601_fmt
             elif self.time_format == TIME_FORMAT_ISO_LOCAL:
-                time_as_dt = datetime.datetime.fromtimestamp(seconds)
-                return time_as_dt.isoformat(' ')
+                return local_time_iso8601_fmt
             else:
-                return value
+                return identity
 
-        if field_name in MEMORY_VALUE_FIELDS and value:  # and isinstance(value, numbers.Number):
-            return sizeof_fmt(float(value))
+        if field_name in _MEMORY_VALUE_FIELDS:
+            return memory_value_fmt
 
-        if field_name in PERCENTAGE_VALUE_FIELDS and value and isinstance(value, numbers.Number):
-            return percentage_fmt(value)
+        if field_name in _PERCENTAGE_VALUE_FIELDS:
+            return percentage_value_fmt
 
-        if field_name in BOOLEAN_VALUE_FIELDS and value is not None:
-            return str(value)
+        if field_name in _BOOLEAN_VALUE_FIELDS:
+            return str
 
-        if isinstance(value, str):
-            return value.rstrip()
-        else:
+        return plain_value_fmt
+
+
+def with_null_check(transformer):
+    def transform(value):
+        if value == '*':
             return value
+        if value is None or value == 'NULL':
+            return 'NULL'
+        return transformer(value)
+
+    return transform
+
+
+def identity(value):
+    return value
+
+
+def plain_value_fmt(value):
+    if isinstance(value, str):
+        return value.rstrip()
+    else:
+        return value
+
+
+def uptime_fmt(value):
+    td = datetime.timedelta(0, float(value))
+    return str(td)
+
+
+def utc_time_ms_fmt(value):
+    dt = datetime.datetime.utcfromtimestamp(float(value) / 1000.0)
+    return dt.isoformat(' ')
+
+
+def local_time_ms_fmt(value):
+    time_as_dt = datetime.datetime.fromtimestamp(float(value) / 1000.0)
+    return time_as_dt.isoformat(' ')
+
+
+def iso8601_to_seconds(value):
+    # 2022-01-12T14:30:00.746375Z
+    dt = dateutil.parser.parse(value)
+    return (dt - epoch).total_seconds()
+
+
+def utc_time_iso8601_fmt(value):
+    dt = datetime.datetime.utcfromtimestamp(iso8601_to_seconds(value))
+    return dt.isoformat(' ')
+
+
+def local_time_iso8601_fmt(value):
+    time_as_dt = datetime.datetime.fromtimestamp(iso8601_to_seconds(value))
+    return time_as_dt.isoformat(' ')
+
+
+def memory_value_fmt(value):
+    if value:  # and isinstance(value, numbers.Number):
+        return sizeof_fmt(float(value))
+    return plain_value_fmt(value)
+
+
+def percentage_value_fmt(value):
+    if value and isinstance(value, numbers.Number):
+        return percentage_fmt(value)
+    return plain_value_fmt(value)
@@ -8,6 +8,35 @@ This module implements subset of NetSpyGlass CLI commands
 
 """
 
+
+class BufferedResponse(object):
+    """
+    Response whose body has already been read into memory. Implements the subset of
+    requests.Response used by the response handlers and command classes.
+    """
+
+    status_code = 200
+    encoding = 'utf-8'
+    cache_status = None
+
+    def __init__(self, content, cache_status=None):
+        self.content = content
+        self.cache_status = cache_status
+        self.headers = {'Content-Type': 'application/json'}
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        body = self.content.decode(self.encoding) if decode_unicode else self.content
+        for idx in range(0, len(body), chunk_size):
+            yield body[idx:idx + chunk_size]
+
+    def iter_lines(self, decode_unicode=False):
+        body = self.content.decode(self.encoding) if decode_unicode else self.content
+        return iter(body.splitlines())
+
+    def json(self):
+        return json.loads(self.content)
+
+
 class BaseResponseHandler:
     @staticmethod
     def get_data(response):
@@ -32,7 +61,14 @@ class JsonArrayResponseHandler:
         occupies one line. Skip array start and end ( [ and ] ) and deserialize each
         line separately
         """
-        response_list = []
+        return list(JsonArrayResponseHandler.iter_data(response))
+
+    @staticmethod
+    def iter_data(response):
+        """
+        same as get_data() but returns a generator that yields each object as soon as
+        its line has been received
+        """
         for line in response.iter_lines(decode_unicode=True):
             if not line or line.strip() in ['[', ']']:
                 continue
@@ -40,8 +76,7 @@ class JsonArrayResponseHandler:
                 line = line[1:]
 
             try:
-                response_list.append(json.loads(line))
+                yield json.loads(line)
             except Exception as error:
                 print(
                     'Unable to decode response data to json. Input data: {}, Error: {}'.format(line, error))
-        return response_list
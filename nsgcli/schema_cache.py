@@ -0,0 +1,228 @@
+"""
+Local cache of NsgQL schema (tables, columns and tags) used for completion in nsgql REPL
+
+The cache is populated from the results of 'SHOW tables' and 'DESCRIBE <table>' queries and is
+stored in a json file so that it survives restarts. Lookups never wait for the server: they
+return what the cache has and schedule a background refresh if the data is missing or older
+than TTL. The cache should be invalidated after NsgQL schema has changed on the server, with
+the nsgql REPL command 'schema clear' which calls invalidate().
+
+:copyright: (c) 2026 by Happy Gears, Inc
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import concurrent.futures
+import hashlib
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+
+DEFAULT_TTL_SEC = 3600
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.nsgcli', 'schema')
+
+SHOW_TABLES_QUERY = 'SHOW tables'
+DESCRIBE_QUERY_TEMPLATE = 'DESCRIBE {0}'
+
+# names of the columns of DESCRIBE result that describe the kind of the column
+COLUMN_KIND_FIELDS = ['type', 'kind']
+TAG_KIND = 'tag'
+
+
+def cache_file(base_url, netid, directory=DEFAULT_CACHE_DIR):
+    key = hashlib.sha256('{0} {1}'.format(base_url, netid).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(directory, key + '.json')
+
+
+def first_column_values(table):
+    return [row[0] for row in table.get('rows', []) if row and row[0] is not None]
+
+
+def parse_describe(table):
+    """
+    :return: tuple (column names, tag names) from the result of DESCRIBE query. Column names are
+             in the first column; a column is a tag if its kind (see COLUMN_KIND_FIELDS) is 'tag'
+    """
+    names = [col['text'] for col in table.get('columns', [])]
+    kind_index = next((names.index(f) for f in COLUMN_KIND_FIELDS if f in names), None)
+    columns = []
+    tags = []
+    for row in table.get('rows', []):
+        if not row or row[0] is None:
+            continue
+        kind = row[kind_index] if kind_index is not None and kind_index < len(row) else None
+        if isinstance(kind, str) and kind.lower() == TAG_KIND:
+            tags.append(row[0])
+        else:
+            columns.append(row[0])
+    return columns, tags
+
+
+class SchemaCache(object):
+    """
+    :param fetch:   function (query) -> (table dictionary, error) that does not use the result cache,
+                    e.g. NsgQLCommandLine.fetch_uncached_table.
+                    It is only called from the background thread.
+    :param path:    json file to store the cache in, or None to keep it in memory only
+    """
+
+    def __init__(self, fetch, path=None, ttl_sec=DEFAULT_TTL_SEC):
+        self.fetch = fetch
+        self.path = path
+        self.ttl_sec = ttl_sec
+        self._lock = threading.Lock()
+        self._tables = {}  # table name -> {'columns': [...], 'tags': [...], 'updated_at': time}, or None
+        self._tables_updated_at = 0
+        self._pending = set()
+        # refreshes run one at a time on a daemon thread so that they never delay exit
+        self._jobs = queue.Queue()
+        self._worker = None
+        self.last_error = None
+        self.load()
+
+    def tables(self):
+        """
+        returns cached table names; schedules refresh if the list is missing or stale
+        """
+        with self._lock:
+            names = sorted(self._tables)
+            stale = self._is_stale(self._tables_updated_at)
+        if stale:
+            self._schedule(SHOW_TABLES_QUERY, self._refresh_tables)
+        return names
+
+    def columns(self, table):
+        """
+        returns tuple (column names, tag names) of the table from the cache; schedules refresh if
+        they are missing or stale
+        """
+        with self._lock:
+            entry = self._tables.get(table)
+            known_table = table in self._tables or not self._tables
+        if entry is None or self._is_stale(entry.get('updated_at', 0)):
+            if known_table:
+                self._schedule(DESCRIBE_QUERY_TEMPLATE.format(table), lambda: self._refresh_table(table))
+        if entry is None:
+            return [], []
+        return list(entry.get('columns', [])), list(entry.get('tags', []))
+
+    def all_columns(self):
+        """
+        returns tuple (column names, tag names) of all tables the cache has descriptions for
+        """
+        with self._lock:
+            entries = [e for e in self._tables.values() if e]
+        columns = sorted({c for e in entries for c in e.get('columns', [])})
+        tags = sorted({t for e in entries for t in e.get('tags', [])})
+        return columns, tags
+
+    def refresh(self, wait=False):
+        """
+        refresh list of tables and descriptions of all cached tables in the background
+        """
+        future = self._schedule(SHOW_TABLES_QUERY, lambda: self._refresh_tables(describe=True), force=True)
+        if wait and future is not None:
+            future.result()
+
+    def invalidate(self):
+        """
+        drop all cached data, e.g. after NsgQL schema has been rebuilt on the server
+        """
+        with self._lock:
+            self._tables = {}
+            self._tables_updated_at = 0
+        if self.path:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def status(self):
+        with self._lock:
+            described = len([e for e in self._tables.values() if e])
+            return {'tables': len(self._tables), 'described': described, 'updated_at': self._tables_updated_at,
+                    'pending': len(self._pending), 'error': self.last_error}
+
+    def _is_stale(self, updated_at):
+        return time.time() - updated_at > self.ttl_sec
+
+    def _schedule(self, key, job, force=False):
+        with self._lock:
+            if key in self._pending and not force:
+                return None
+            self._pending.add(key)
+
+        future = concurrent.futures.Future()
+        self._jobs.put((key, job, future))
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run_jobs, name='schema-cache', daemon=True)
+                self._worker.start()
+        return future
+
+    def _run_jobs(self):
+        while True:
+            key, job, future = self._jobs.get()
+            try:
+                job()
+            except Exception as e:
+                self.last_error = str(e)
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+                future.set_result(None)
+
+    def _refresh_tables(self, describe=False):
+        table, error = self.fetch(SHOW_TABLES_QUERY)
+        if error is not None:
+            self.last_error = error
+            return
+        names = first_column_values(table)
+        with self._lock:
+            self._tables = {name: self._tables.get(name) for name in names}
+            self._tables_updated_at = time.time()
+        self.save()
+        if describe:
+            for name in names:
+                self._refresh_table(name)
+
+    def _refresh_table(self, name):
+        table, error = self.fetch(DESCRIBE_QUERY_TEMPLATE.format(name))
+        if error is not None:
+            self.last_error = error
+            return
+        columns, tags = parse_describe(table)
+        with self._lock:
+            self._tables[name] = {'columns': columns, 'tags': tags, 'updated_at': time.time()}
+        self.save()
+
+    def load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            self._tables = data.get('tables', {})
+            self._tables_updated_at = data.get('updated_at', 0)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {'tables': dict(self._tables), 'updated_at': self._tables_updated_at}
+        directory = os.path.dirname(self.path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            # write to temporary file and rename it so that other processes never see partial file
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.last_error = 'can not write schema cache {0}: {1}'.format(self.path, e)
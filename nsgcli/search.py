@@ -6,17 +6,52 @@ This module implements subset of NetSpyGlass CLI commands
 
 """
 
+import time
+
 from . import api
+from . import inventory
 from . import response_formatter
 from . import sub_command
+from .response_formatter import format_duration
+
+DEVICE_QUERY = 'SELECT DISTINCT id,name,address,Vendor,SerialNumber,boxDescr FROM devices ' \
+               'WHERE (name REGEXP "^{0}.*$" OR address = "{0}" OR SerialNumber = "{0}" ' \
+               'OR boxDescr REGEXP ".*{0}.*") ' \
+               'AND Role NOT IN ("Cluster", "SimulatedNode")'
+
+LOCAL_FLAG = '--local'
+SERVER_FLAG = '--server'
+
+# a match with any of these characters is a regular expression and is searched for on the server.
+# '.' is not one of them because it appears in addresses
+REGEX_CHARS = frozenset('*+?()[]{}|^$\\')
+
+HELP = """
+Search device by its id, name, address, or serial number
+
+search device [--local|--server] match     search local device inventory if it is fresh and the server
+                                           otherwise; --local and --server force the choice. Local search
+                                           finds devices by exact, prefix and substring match of id, name,
+                                           address, serial number and box description, and by similar
+                                           names if nothing else matches. A match with regular expression
+                                           characters (e.g. 'sw.*core') always goes to the server unless
+                                           --local is given; local search takes it literally
+search refresh                             update local device inventory; it is not updated automatically
+"""
+
+
+def is_regex(match):
+    return any(c in REGEX_CHARS for c in match)
 
 
 class SearchCommand(sub_command.SubCommand, object):
     # prompt = "show # "
 
-    def __init__(self, base_url, token, net_id, region=None):
+    def __init__(self, base_url, token, net_id, region=None, inventory_dir=inventory.DEFAULT_INVENTORY_DIR):
         super(SearchCommand, self).__init__(base_url, token, net_id)
         self.table_formatter = response_formatter.ResponseFormatter()
+        self.inventory_dir = inventory_dir
+        self._inventory = None
         self.current_region = region
         if region is None:
             self.prompt = 'search # '
@@ -27,12 +62,20 @@ class SearchCommand(sub_command.SubCommand, object):
         return self.get_args(text)
 
     def help(self):
-        print('Search device by its id, name, address, or serial number')
+        print(HELP)
+
+    @property
+    def inventory(self):
+        if self._inventory is None:
+            path = inventory.inventory_file(self.base_url, self.netid, self.inventory_dir) \
+                if self.inventory_dir else None
+            self._inventory = inventory.DeviceInventory(path)
+        return self._inventory
 
     def nsgql_call(self, query):
         """
-        makes API call v2/nsg/cluster/net/{0}/status and returns the response. Note that
-        the server does not 'json-stream' response for this API call
+        makes API call v2/query/net/{0}/data/ to execute NsgQL query and returns tuple
+        (list of results, error)
         """
         path = "/v2/query/net/{0}/data/".format(self.netid)
         nsgql = {
@@ -47,23 +90,74 @@ class SearchCommand(sub_command.SubCommand, object):
                 }
             )
         return api.call(self.base_url, 'POST', path, data=nsgql, token=self.token,
-                        stream=True)
+                        stream=True, response_format='json')
 
     def do_device(self, arg):
         """
-        search device match
+        search device [--local|--server] match
 
         where match is device id, name, address, serial number or box description
         """
-        query = 'SELECT DISTINCT id,name,address,Vendor,SerialNumber,boxDescr FROM devices ' \
-                'WHERE (name REGEXP "^{0}.*$" OR address = "{0}" OR SerialNumber = "{0}" OR boxDescr REGEXP ".*{0}.*") ' \
-                'AND Role NOT IN ("Cluster", "SimulatedNode")'
-        response, error = self.nsgql_call(query.format(arg))
+        words = arg.split()
+        local = LOCAL_FLAG in words
+        server = SERVER_FLAG in words
+        match = ' '.join(w for w in words if w not in (LOCAL_FLAG, SERVER_FLAG))
+        if local and server:
+            print('ERROR: {0} and {1} can not be used together'.format(LOCAL_FLAG, SERVER_FLAG))
+            return
+        if local or (not server and not is_regex(match) and not self.inventory.is_stale()):
+            self.search_local(match)
+            return
+        if not server and not is_regex(match):
+            # pulling all devices is too expensive to do behind a search, the inventory is only
+            # updated by 'search refresh'
+            print('Local device inventory is stale, querying server; '
+                  'run "search refresh" to update it')
+        response, error = self.nsgql_call(DEVICE_QUERY.format(match))
         if error is None:
-            response = response[0]
-            self.table_formatter.print_result_as_table(response)
+            self.table_formatter.print_result_as_table(response[0])
 
-        request = 'v2/ui/net/{0}/status'.format(self.netid)
-        response, error = api.call(self.base_url, 'POST', request, token=self.token, response_format='json')
-        if error is None:
-            return response
+    def do_refresh(self, arg):
+        """
+        search refresh
+
+        update local device inventory
+        """
+        started = time.monotonic()
+        counts, error = self.refresh_inventory()
+        if error is not None:
+            print('ERROR: {0}'.format(error))
+            return
+        print('Devices: {0}; added: {1}, changed: {2}, removed: {3}; {4:.1f} sec'.format(
+            len(self.inventory), counts[0], counts[1], counts[2], time.monotonic() - started))
+
+    def refresh_inventory(self):
+        """
+        pull id, name, address and other fields of all devices with one NsgQL query and update the
+        local inventory with them
+
+        :return: tuple (tuple (number of added, changed and removed devices), error)
+        """
+        response, error = self.nsgql_call(inventory.INVENTORY_QUERY)
+        if error is not None:
+            return None, error
+        table = response[0] if isinstance(response, list) and response else response
+        if not isinstance(table, dict) or table.get('error'):
+            return None, self.get_error(table)
+        counts = self.inventory.update(table)
+        self.inventory.save()
+        return counts, None
+
+    def search_local(self, match):
+        if not len(self.inventory):
+            print('Local device inventory is empty, run "search refresh" first')
+            return
+        started = time.monotonic()
+        found = self.inventory.search(match)
+        elapsed_ms = (time.monotonic() - started) * 1000
+        table = {'columns': [{'text': c} for c in self.inventory.columns + ['match']],
+                 'rows': [list(row) + [kind] for row, kind in found]}
+        self.table_formatter.print_result_as_table(table)
+        print('Count: {0}, local inventory of {1} devices updated {2} ago; search time: {3:.1f} ms'.format(
+            len(found), len(self.inventory), format_duration(time.time() - self.inventory.updated_at),
+            elapsed_ms))
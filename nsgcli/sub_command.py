@@ -7,6 +7,10 @@ This module implements subset of NetSpyGlass CLI commands
 """
 
 import cmd
+import collections
+import hashlib
+import json
+import re
 
 from . import api
 
@@ -15,24 +19,71 @@ SKIP_NAMES_FOR_COMPLETION = ['EOF', 'q']
 EXEC_TEMPLATE_WITH_REGION = 'v2/nsg/cluster/net/{0}/exec/{1}?address={2}&region={3}&args={4}'
 EXEC_TEMPLATE_WITHOUT_REGION = 'v2/nsg/cluster/net/{0}/exec/{1}?address={2}&args={3}'
 
+# how duplicate agent replies are recognized
+DEDUPLICATE_BY_UUID = 'uuid'  # the same reply received more than once
+DEDUPLICATE_BY_CONTENT = 'content'  # identical output from different agents
+DEDUPLICATE_MODES = [DEDUPLICATE_BY_UUID, DEDUPLICATE_BY_CONTENT]
+DEDUP_OPTION = 'dedup='
 
-class HashableAgentCommandResponse(set):
+# max number of reply keys remembered for deduplication; the oldest keys are forgotten first
+DEFAULT_SEEN_REPLIES = 100000
 
-    def __init__(self, acr):
-        self.acr = acr
+DEFAULT_AGENT_TIMEOUT_SEC = 180
 
-    def __eq__(self, other):
-        return self.acr['uuid'] == other.acr['uuid']
 
-    def __hash__(self):
-        # print(self.acr.items())
-        return hash(self.acr['uuid'])
+def reply_uuid(acr, status):
+    uuid = acr.get('uuid')
+    return None if uuid is None else (uuid, status)
 
-    def __getitem__(self, item):
-        return self.acr.__getitem__(item)
 
-    def __str__(self):
-        return str(acr)
+def reply_content_hash(acr, status):
+    """
+    hash of the status and output of the reply, without the name of the agent that sent it
+    """
+    content = json.dumps([status, acr.get('response')], sort_keys=True, default=str)
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+class ReplyDeduplicator(object):
+    """
+    Remembers keys of agent replies seen so far so that duplicates can be dropped as replies
+    arrive. Memory is bounded: when more than max_entries keys have been seen, the oldest ones
+    are forgotten.
+    """
+
+    KEY_FUNCTIONS = {
+        DEDUPLICATE_BY_UUID: reply_uuid,
+        DEDUPLICATE_BY_CONTENT: reply_content_hash,
+    }
+
+    def __init__(self, deduplicate_by=DEDUPLICATE_BY_UUID, max_entries=DEFAULT_SEEN_REPLIES):
+        self.key = self.KEY_FUNCTIONS[deduplicate_by]
+        self.max_entries = max_entries
+        self._seen = collections.OrderedDict()
+
+    def is_duplicate(self, acr, status):
+        key = self.key(acr, status)
+        if key is None:
+            return False
+        if key in self._seen:
+            return True
+        self._seen[key] = True
+        if len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+        return False
+
+
+def read_names(lines):
+    """
+    read names (devices, agents), one or more per line separated by whitespace or commas. Lines
+    that start with '#' are ignored, duplicates are dropped.
+    """
+    names = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            names.extend(n for n in re.split(r'[\s,]+', line) if n)
+    return list(dict.fromkeys(names))
 
 
 def sizeof_fmt(num, suffix='B'):
@@ -48,6 +99,15 @@ def sizeof_fmt(num, suffix='B'):
 class SubCommand(cmd.Cmd, object):
     # prompt = "(sub_command) "
 
+    # how common_command() recognizes duplicate agent replies, see DEDUPLICATE_BY_UUID
+    # and DEDUPLICATE_BY_CONTENT
+    deduplicate_by = DEDUPLICATE_BY_UUID
+    # if True, the command line can start with option dedup=uuid|content that sets deduplicate_by
+    accepts_dedup_option = False
+
+    # timeout of agent command calls, seconds
+    agent_timeout_sec = DEFAULT_AGENT_TIMEOUT_SEC
+
     def __init__(self, base_url, token, net_id, region=None):
         super(SubCommand, self).__init__()
         self.base_url = base_url
@@ -62,6 +122,36 @@ class SubCommand(cmd.Cmd, object):
     def emptyline(self):
         pass
 
+    def onecmd(self, line):
+        if not self.accepts_dedup_option:
+            return super(SubCommand, self).onecmd(line)
+        # the option applies to this command only
+        deduplicate_by = self.deduplicate_by
+        try:
+            line = self.parse_dedup_option(line)
+        except ValueError as e:
+            print('ERROR: {0}'.format(e))
+            return False
+        try:
+            return super(SubCommand, self).onecmd(line)
+        finally:
+            self.deduplicate_by = deduplicate_by
+
+    def parse_dedup_option(self, line):
+        """
+        take option dedup=uuid|content off the beginning of the command line and set
+        self.deduplicate_by; return the rest of the line
+        """
+        words = line.lstrip().split(' ', 1)
+        if not words[0].startswith(DEDUP_OPTION):
+            return line
+        mode = words[0][len(DEDUP_OPTION):]
+        if mode not in DEDUPLICATE_MODES:
+            raise ValueError('invalid value of option dedup: "{0}", expected one of {1}'.format(
+                mode, ', '.join(DEDUPLICATE_MODES)))
+        self.deduplicate_by = mode
+        return words[1] if len(words) > 1 else ''
+
     def do_quit(self, args):
         return True
 
@@ -102,7 +192,7 @@ class SubCommand(cmd.Cmd, object):
 
     def is_error(self, response):
         if isinstance(response, list):
-            return self.is_error(response[0])
+            return bool(response) and self.is_error(response[0])
         if isinstance(response, dict):
             return response.get('error', None) is not None or response.get('status', 'ok').lower() != 'ok'
         else:
@@ -130,42 +220,53 @@ class SubCommand(cmd.Cmd, object):
         else:
             return str(response)
 
-    def common_command(self, req, method='GET', hide_errors=True, deduplicate_replies=True):
+    def agent_call(self, req, method='GET', headers=None, quiet=False):
         """
-        send command to agents and pick up replies. If hide_errors=True, only successful
+        send agent command request and return tuple (generator of agent replies, error)
+        """
+        return api.call(self.base_url, method, req, token=self.token, headers=headers, stream=True,
+                        timeout=self.agent_timeout_sec, response_format='json_array_stream',
+                        error_format='json_array', quiet=quiet)
+
+    def common_command(self, req, method='GET', hide_errors=True, deduplicate_replies=True, deduplicate_by=None):
+        """
+        send command to agents and print replies as they arrive. If hide_errors=True, only successful
         replies are printed, otherwise all replies are printed.
 
         If deduplicate_replies=True, duplicate replies are suppressed (e.g. when multiple agents
-        reply)
+        reply). deduplicate_by selects how duplicates are recognized: DEDUPLICATE_BY_UUID (default,
+        see self.deduplicate_by) or DEDUPLICATE_BY_CONTENT. The first reply is always printed.
         """
 
         headers = {'Accept-Encoding': ''}  # to turn off gzip encoding to make response streaming work
-        response, error = api.call(self.base_url, method, req, token=self.token,
-                                   headers=headers, stream=True, response_format='json_array',
-                                   error_format='json_array')
+        response, error = self.agent_call(req, method=method, headers=headers)
         if error is None:
-            replies = []
+            deduplicator = None
+            if deduplicate_replies:
+                deduplicator = ReplyDeduplicator(deduplicate_by or self.deduplicate_by)
             for acr in response:
                 status = self.parse_status(acr)
-                if not hide_errors or status == 'ok':
-                    replies.append((status, HashableAgentCommandResponse(acr)))
-            if deduplicate_replies:
-                for status, acr in set(replies):
-                    self.print_agent_response(acr, status)
-            else:
-                for status, acr in replies:
-                    self.print_agent_response(acr, status)
+                if hide_errors and status != 'ok':
+                    continue
+                if deduplicator is not None and deduplicator.is_duplicate(acr, status):
+                    continue
+                self.print_agent_response(acr, status)
 
-    def print_agent_response(self, acr, status):
+    def format_agent_response(self, acr, status):
+        """
+        :return: list of output lines for the agent reply, each one prefixed with the name of the agent
+        """
         try:
             if not status or status == 'ok':
-                for line in acr['response']:
-                    print('{0} | {1}'.format(acr['agent'], line))
+                return ['{0} | {1}'.format(acr['agent'], line) for line in acr['response']]
             else:
-                print('{0} | {1}'.format(acr['agent'], status))
+                return ['{0} | {1}'.format(acr['agent'], status)]
         except Exception as e:
-            print(e)
-            print(acr)
+            return [str(e), str(acr)]
+
+    def print_agent_response(self, acr, status):
+        for line in self.format_agent_response(acr, status):
+            print(line)
 
     def parse_status(self, acr):
         try:
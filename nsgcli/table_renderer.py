@@ -0,0 +1,122 @@
+"""
+Streaming table renderer
+
+tabulate() has to see all rows before it can print the first one. This module prints
+tables in the same 'fancy_outline' style row by row: column widths are computed from a
+sample of the first rows and rows are printed as they arrive.
+
+:copyright: (c) 2026 by Happy Gears, Inc
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import numbers
+import sys
+
+# what to do when a value received after the sample does not fit in its column
+OVERFLOW_TRUNCATE = 'truncate'  # cut the value and mark it with ELLIPSIS
+OVERFLOW_WIDEN = 'widen'  # widen the column and print a separator line with new column widths
+
+ELLIPSIS = '…'
+
+# ANSI escape sequences used to highlight cells (reverse video)
+HIGHLIGHT_START = '\x1b[7m'
+HIGHLIGHT_END = '\x1b[0m'
+
+# ANSI escape sequences used to redraw tables in place
+CURSOR_UP = '\x1b[{0}A'
+CURSOR_DOWN = '\x1b[{0}B'
+CLEAR_LINE = '\r\x1b[2K'
+CLEAR_TO_END = '\r\x1b[J'
+
+# extra space tabulate adds to column headers
+HEADER_PADDING = 2
+
+DEFAULT_MAX_COLUMN_WIDTH = 120
+
+
+def cell_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        return format(value, 'g')
+    return str(value)
+
+
+def is_number(value):
+    return isinstance(value, numbers.Number) and not isinstance(value, bool)
+
+
+class StreamingTableRenderer(object):
+
+    def __init__(self, headers, sample_rows, overflow=OVERFLOW_TRUNCATE, max_column_width=DEFAULT_MAX_COLUMN_WIDTH,
+                 out=None):
+        """
+        :param headers:      column titles
+        :param sample_rows:  rows used to compute column widths and alignment. These rows are not printed.
+        :param overflow:     OVERFLOW_TRUNCATE or OVERFLOW_WIDEN
+        :param max_column_width: columns are never wider than this
+        :param out:          file object to print to (default: sys.stdout)
+        """
+        self.headers = [str(h) for h in headers]
+        self.overflow = overflow
+        self.max_column_width = max_column_width
+        self.out = out
+        self.widths = [len(h) + HEADER_PADDING for h in self.headers]
+        numeric = [True] * len(self.headers)
+        seen_value = [False] * len(self.headers)
+        for row in sample_rows:
+            for idx, value in enumerate(row[:len(self.headers)]):
+                self.widths[idx] = max(self.widths[idx], len(cell_text(value)))
+                if value is not None:
+                    seen_value[idx] = True
+                    numeric[idx] = numeric[idx] and is_number(value)
+        self.widths = [min(w, max(max_column_width, len(h))) for w, h in zip(self.widths, self.headers)]
+        self.right_aligned = [n and s for n, s in zip(numeric, seen_value)]
+
+    def _print(self, line):
+        print(line, file=self.out if self.out is not None else sys.stdout)
+
+    def _line(self, left, fill, middle, right):
+        return left + middle.join(fill * (w + 2) for w in self.widths) + right
+
+    def print_header(self):
+        self._print(self._line('╒', '═', '╤', '╕'))
+        self._print(self.format_cells(self.headers, self.right_aligned))
+        self._print(self._line('╞', '═', '╪', '╡'))
+
+    def print_footer(self):
+        self._print(self._line('╘', '═', '╧', '╛'))
+
+    def _texts(self, row):
+        texts = [cell_text(value) for value in row[:len(self.widths)]]
+        return texts + [''] * (len(self.widths) - len(texts))
+
+    def print_row(self, row):
+        texts = self._texts(row)
+        if self.overflow == OVERFLOW_WIDEN:
+            widened = False
+            for idx, text in enumerate(texts):
+                if self.widths[idx] < len(text) <= self.max_column_width:
+                    self.widths[idx] = len(text)
+                    widened = True
+            if widened:
+                self._print(self._line('╞', '═', '╪', '╡'))
+        self._print(self.format_cells(texts, self.right_aligned))
+
+    def format_row(self, row, highlight=None):
+        """
+        :param highlight:  indexes of the columns to print with HIGHLIGHT_START/HIGHLIGHT_END around them
+        """
+        return self.format_cells(self._texts(row), self.right_aligned, highlight)
+
+    def format_cells(self, texts, right_aligned, highlight=None):
+        cells = []
+        for idx, (text, width, right) in enumerate(zip(texts, self.widths, right_aligned)):
+            if len(text) > width:
+                text = text[:width - 1] + ELLIPSIS
+            text = text.rjust(width) if right else text.ljust(width)
+            if highlight and idx in highlight:
+                text = HIGHLIGHT_START + text + HIGHLIGHT_END
+            cells.append(text)
+        return '│ ' + ' │ '.join(cells) + ' │'
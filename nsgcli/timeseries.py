@@ -0,0 +1,288 @@
+"""
+Client side processing of NsgQL time series results
+
+With format 'time_series' the server returns a list of series, each with the name and the list
+of [value, timestamp_ms] pairs:
+
+    [{"target": "dev1:eth0", "datapoints": [[12.5, 1641997800000], [13.1, 1641997860000], ...]}, ...]
+
+This module decodes series into numpy arrays, downsamples them to a given number of points
+with LTTB (largest triangle three buckets) or min/max buckets, and renders them as sparklines
+or small bar charts in the terminal.
+
+:copyright: (c) 2026 by Happy Gears, Inc
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import datetime
+
+import numpy as np
+
+DOWNSAMPLE_LTTB = 'lttb'
+DOWNSAMPLE_MINMAX = 'minmax'
+DOWNSAMPLE_METHODS = [DOWNSAMPLE_LTTB, DOWNSAMPLE_MINMAX]
+
+CHART_SPARKLINE = 'spark'
+CHART_BARS = 'bars'
+CHART_TYPES = [CHART_SPARKLINE, CHART_BARS]
+
+DEFAULT_POINTS = 500
+DEFAULT_CHART_WIDTH = 80
+DEFAULT_CHART_HEIGHT = 8
+
+BLOCKS = ' ▁▂▃▄▅▆▇█'
+SPARK_BLOCKS = BLOCKS[1:]
+NO_DATA = ' '
+
+
+class TimeSeriesError(Exception):
+    pass
+
+
+class Series(object):
+    """
+    One time series: timestamps (int64 milliseconds) and values (float64, NaN for null) in time order
+    """
+
+    def __init__(self, name, times, values):
+        self.name = name
+        self.times = times
+        self.values = values
+
+    def __len__(self):
+        return len(self.times)
+
+    @classmethod
+    def from_datapoints(cls, name, datapoints):
+        if not datapoints:
+            return cls(name, np.array([], dtype=np.int64), np.array([], dtype=np.float64))
+        points = np.array(datapoints, dtype=np.float64).reshape(-1, 2)
+        times = points[:, 1].astype(np.int64)
+        values = points[:, 0]
+        if len(times) > 1 and np.any(times[1:] < times[:-1]):
+            order = np.argsort(times, kind='stable')
+            times, values = times[order], values[order]
+        return cls(name, times, values)
+
+    def to_dict(self):
+        values = [None if v != v else v for v in self.values.tolist()]
+        return {'target': self.name, 'datapoints': [list(p) for p in zip(values, self.times.tolist())]}
+
+    def take(self, indexes):
+        return Series(self.name, self.times[indexes], self.values[indexes])
+
+
+def decode_series(data):
+    """
+    decode deserialized time_series response
+
+    :return: tuple (list of Series, list of errors)
+    """
+    series = []
+    errors = []
+    items = data if isinstance(data, list) else [data]
+    for item in items:
+        if isinstance(item, list):
+            sub_series, sub_errors = decode_series(item)
+            series.extend(sub_series)
+            errors.extend(sub_errors)
+        elif isinstance(item, dict) and 'error' in item:
+            errors.append(item['error'])
+        elif isinstance(item, dict):
+            series.append(Series.from_datapoints(item.get('target', ''), item.get('datapoints', [])))
+    return series, errors
+
+
+def stitch(series_lists):
+    """
+    combine series returned for consecutive time windows into one series per name. Series keep
+    the order in which they first appear; samples with the same timestamp that appear in two
+    windows (at the edges of the windows) are kept only once.
+
+    :param series_lists:  lists of Series, one list per window, in time order
+    """
+    parts = {}
+    for series_list in series_lists:
+        for series in series_list:
+            parts.setdefault(series.name, []).append(series)
+    result = []
+    for name, name_parts in parts.items():
+        times = np.concatenate([p.times for p in name_parts])
+        values = np.concatenate([p.values for p in name_parts])
+        order = np.argsort(times, kind='stable')
+        times, values = times[order], values[order]
+        unique = np.r_[True, times[1:] != times[:-1]] if len(times) else np.array([], dtype=bool)
+        result.append(Series(name, times[unique], values[unique]))
+    return result
+
+
+def lttb(series, points):
+    """
+    downsample with "largest triangle three buckets" algorithm that keeps the shape of the
+    series. Points with null values are dropped.
+    """
+    valid = np.flatnonzero(~np.isnan(series.values))
+    if len(valid) <= points or points < 3:
+        return series.take(valid)
+    x = series.times[valid].astype(np.float64)
+    y = series.values[valid]
+    n = len(x)
+    # bucket boundaries for the points between the first and the last one
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    selected = np.empty(points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    prev = 0
+    for bucket in range(points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # average of the next bucket, or the last point for the last bucket
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        areas = np.abs((x[prev] - avg_x) * (y[start:end] - y[prev]) - (x[prev] - x[start:end]) * (avg_y - y[prev]))
+        prev = start + int(np.argmax(areas))
+        selected[bucket + 1] = prev
+    return series.take(valid[selected])
+
+
+def minmax(series, points):
+    """
+    downsample by splitting the series into points/2 buckets and keeping the minimum and the
+    maximum of every bucket, so that spikes are never lost. Points with null values are dropped.
+    """
+    valid = np.flatnonzero(~np.isnan(series.values))
+    if len(valid) <= points or points < 2:
+        return series.take(valid)
+    y = series.values[valid]
+    starts = np.linspace(0, len(y), points // 2, endpoint=False).astype(np.int64)
+    starts = np.unique(starts)
+    selected = []
+    for start, end in zip(starts, np.r_[starts[1:], len(y)]):
+        bucket = y[start:end]
+        lo = start + int(np.argmin(bucket))
+        hi = start + int(np.argmax(bucket))
+        selected.extend(sorted({lo, hi}))
+    return series.take(valid[np.array(selected, dtype=np.int64)])
+
+
+DOWNSAMPLE_FUNCTIONS = {
+    DOWNSAMPLE_LTTB: lttb,
+    DOWNSAMPLE_MINMAX: minmax,
+}
+
+
+def downsample(series, method, points):
+    func = DOWNSAMPLE_FUNCTIONS.get(method)
+    if func is None:
+        raise TimeSeriesError('unknown downsampling method "{0}", expected one of {1}'.format(
+            method, DOWNSAMPLE_METHODS))
+    return func(series, points)
+
+
+def resample_columns(series, width):
+    """
+    split the time range of the series into `width` equal intervals and return the average value
+    in each of them (NaN if there are no values in the interval)
+    """
+    result = np.full(width, np.nan)
+    valid = ~np.isnan(series.values)
+    if not np.any(valid):
+        return result
+    times = series.times[valid]
+    values = series.values[valid]
+    t0, t1 = times[0], times[-1]
+    if t1 == t0:
+        columns = np.zeros(len(times), dtype=np.int64)
+    else:
+        columns = np.minimum(((times - t0) * width // (t1 - t0 + 1)).astype(np.int64), width - 1)
+    sums = np.bincount(columns, weights=values, minlength=width)
+    counts = np.bincount(columns, minlength=width)
+    has_values = counts > 0
+    result[has_values] = sums[has_values] / counts[has_values]
+    return result
+
+
+def scale(values, levels, lo, hi):
+    """
+    map values to integers 0..levels-1; NaN is mapped to -1
+    """
+    result = np.full(len(values), -1, dtype=np.int64)
+    valid = ~np.isnan(values)
+    if hi > lo:
+        result[valid] = np.round((values[valid] - lo) / (hi - lo) * (levels - 1)).astype(np.int64)
+    else:
+        result[valid] = levels // 2
+    return result
+
+
+def sparkline(series, width=DEFAULT_CHART_WIDTH):
+    columns = resample_columns(series, width)
+    if np.all(np.isnan(columns)):
+        return NO_DATA * width
+    lo, hi = np.nanmin(columns), np.nanmax(columns)
+    levels = scale(columns, len(SPARK_BLOCKS), lo, hi)
+    return ''.join(SPARK_BLOCKS[level] if level >= 0 else NO_DATA for level in levels)
+
+
+def bar_chart(series, width=DEFAULT_CHART_WIDTH, height=DEFAULT_CHART_HEIGHT):
+    """
+    :return: list of lines of the bar chart, top line first. Every character cell has 8 levels.
+    """
+    columns = resample_columns(series, width)
+    if np.all(np.isnan(columns)):
+        return []
+    lo, hi = np.nanmin(columns), np.nanmax(columns)
+    # height of every bar in 1/8 of a character cell, bars are at least one level high
+    levels = scale(columns, height * 8, lo, hi) + 1
+    labels = [format_value(hi), format_value(lo)]
+    label_width = max(len(label) for label in labels)
+    lines = []
+    for line in range(height, 0, -1):
+        base = (line - 1) * 8
+        cells = np.clip(levels - base, 0, 8)
+        text = ''.join(BLOCKS[cell] for cell in cells)
+        if line == height:
+            label = labels[0]
+        elif line == 1:
+            label = labels[1]
+        else:
+            label = ''
+        lines.append('{0} │{1}'.format(label.rjust(label_width), text))
+    return lines
+
+
+def format_value(value):
+    return '{0:.4g}'.format(value)
+
+
+def format_time(time_ms):
+    return datetime.datetime.fromtimestamp(time_ms / 1000.0).isoformat(' ', 'seconds')
+
+
+def series_summary(series, original_count=None):
+    valid = series.values[~np.isnan(series.values)]
+    parts = ['{0}: {1} points'.format(series.name, len(series))]
+    if original_count is not None and original_count != len(series):
+        parts[0] += ' (of {0})'.format(original_count)
+    if len(series):
+        parts.append('{0} .. {1}'.format(format_time(series.times[0]), format_time(series.times[-1])))
+    if len(valid):
+        parts.append('min {0}, avg {1}, max {2}, last {3}'.format(
+            format_value(valid.min()), format_value(valid.mean()), format_value(valid.max()),
+            format_value(valid[-1])))
+    return '; '.join(parts)
+
+
+def render(series, chart, width=DEFAULT_CHART_WIDTH, height=DEFAULT_CHART_HEIGHT, original_count=None):
+    """
+    :return: list of lines: summary line of the series followed by the chart
+    """
+    lines = [series_summary(series, original_count)]
+    if chart == CHART_SPARKLINE:
+        lines.append('  ' + sparkline(series, width))
+    elif chart == CHART_BARS:
+        lines.extend(bar_chart(series, width, height))
+    else:
+        raise TimeSeriesError('unknown chart type "{0}", expected one of {1}'.format(chart, CHART_TYPES))
+    return lines
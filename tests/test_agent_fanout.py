@@ -0,0 +1,183 @@
+import concurrent.futures
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import testutils
+from nsgcli import agent_fanout
+
+cluster_status_resp = json.loads(testutils.read_file('cluster_status_resp.json'))
+
+AGENTS = ['web-1', 'web-2', 'web-10', 'db-1']
+
+
+def agent_reply(agent, lines, exit_status=0):
+    return {'agent': agent, 'response': lines, 'exitStatus': exit_status, 'uuid': agent}
+
+
+class StreamingResponse(object):
+    """
+    streaming response that sends the replies as a json array; if `blocking`, it keeps the
+    connection open after the last reply until the response is closed
+    """
+
+    def __init__(self, replies, blocking=False):
+        self.replies = replies
+        self.blocking = blocking
+        self.closed = threading.Event()
+        self.finished = threading.Event()
+
+    def iter_lines(self, decode_unicode=False):
+        try:
+            yield '['
+            for reply in self.replies:
+                yield json.dumps(reply)
+            if self.blocking:
+                self.closed.wait(10)
+            if self.closed.is_set():
+                raise ValueError('I/O operation on closed file')
+            yield ']'
+        finally:
+            self.finished.set()
+
+    def close(self):
+        self.closed.set()
+
+
+def fake_call(replies, delays=None):
+    """
+    replacement of api.call that returns replies of the agent whose name is in the request path
+    """
+    def call(base_url, method, uri_path, **kwargs):
+        agent = uri_path.split('/agent/')[1].split('?')[0]
+        time.sleep((delays or {}).get(agent, 0))
+        reply = replies.get(agent)
+        if isinstance(reply, str):
+            return None, reply
+        if isinstance(reply, StreamingResponse):
+            return reply, None
+        return StreamingResponse(reply), None
+    return call
+
+
+class AgentSelectorTestCase(unittest.TestCase):
+
+    def test_is_multi_agent(self):
+        self.assertFalse(agent_fanout.is_multi_agent('web-1'))
+        self.assertFalse(agent_fanout.is_multi_agent('all'))
+        for selector in ['web-1,web-2', 'web-*', '/^web/', '@agents.txt']:
+            self.assertTrue(agent_fanout.is_multi_agent(selector), selector)
+
+    def test_select_agents(self):
+        def known():
+            return AGENTS
+        self.assertEqual(agent_fanout.select_agents('web-2,db-1,web-2', known), ['web-2', 'db-1'])
+        self.assertEqual(agent_fanout.select_agents('web-?', known), ['web-1', 'web-2'])
+        self.assertEqual(agent_fanout.select_agents('/^web-[0-9]+$/', known), ['web-1', 'web-2', 'web-10'])
+        self.assertEqual(agent_fanout.select_agents('db-*,web-1', known), ['db-1', 'web-1'])
+        with self.assertRaises(agent_fanout.AgentSelectorError):
+            agent_fanout.select_agents('mon-*', known)
+
+    def test_explicit_names_do_not_need_agent_list(self):
+        def known():
+            raise AssertionError('list of agents should not be requested')
+        self.assertEqual(agent_fanout.select_agents('a,b', known), ['a', 'b'])
+
+    def test_select_agents_from_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            file_name = os.path.join(tmp, 'agents.txt')
+            with open(file_name, 'w') as f:
+                f.write('# lab agents\nweb-1 db-1\n\nweb-1*\n')
+            self.assertEqual(agent_fanout.select_agents('@' + file_name, lambda: AGENTS),
+                             ['web-1', 'db-1', 'web-10'])
+            with self.assertRaises(agent_fanout.AgentSelectorError):
+                agent_fanout.select_agents('@' + os.path.join(tmp, 'missing.txt'), lambda: AGENTS)
+
+    def test_agent_names(self):
+        self.assertEqual(agent_fanout.agent_names(cluster_status_resp), ['abondar_laptop'])
+        self.assertEqual(agent_fanout.agent_names(cluster_status_resp, region='world'), [])
+
+    def test_parse_fanout_options(self):
+        words = ['concurrency=4', 'timeout=2.5', 'tail', '-10', 'agent.log']
+        self.assertEqual(agent_fanout.parse_fanout_options(words), {'concurrency': 4, 'timeout': 2.5})
+        self.assertEqual(words, ['tail', '-10', 'agent.log'])
+        with self.assertRaises(agent_fanout.AgentSelectorError):
+            agent_fanout.parse_fanout_options(['timeout=0', 'restart'])
+
+
+class AgentFanOutTestCase(unittest.TestCase):
+
+    def run_fanout(self, agents, replies, delays=None, **kwargs):
+        out = io.StringIO()
+        fanout = agent_fanout.AgentFanOut('https://base_url', 'token', 1, agents, out=out, **kwargs)
+        with mock.patch.object(agent_fanout.api, 'call', side_effect=fake_call(replies, delays)):
+            fanout.run('measurements')
+        return fanout, out.getvalue().splitlines()
+
+    def test_output_is_prefixed_with_agent_name(self):
+        replies = {'web-1': [agent_reply('web-1', ['a', 'b'])], 'web-2': [agent_reply('web-2', ['c'])]}
+        fanout, lines = self.run_fanout(['web-1', 'web-2'], replies, delays={'web-1': 0.2})
+        self.assertEqual(lines, ['web-2 | c', 'web-1 | a', 'web-1 | b'])
+        self.assertEqual(fanout.counts()[agent_fanout.STATUS_OK], 2)
+        self.assertFalse(fanout.failed())
+
+    def test_failed_and_timed_out_agents(self):
+        replies = {
+            'web-1': [agent_reply('web-1', ['ok'])],
+            'web-2': [agent_reply('web-2', [], exit_status=-1)],
+            'web-3': 'connection refused',
+            'web-4': [],
+            'web-5': [agent_reply('web-5', ['too late'])],
+        }
+        fanout, lines = self.run_fanout(sorted(replies), replies, delays={'web-5': 1}, timeout_sec=0.3)
+        self.assertNotIn('web-5 | too late', lines)
+        statuses = {r.agent: (r.status(fanout.slow_sec), r.error()) for r in fanout.results}
+        self.assertEqual(statuses, {
+            'web-1': ('ok', ''),
+            'web-2': ('failed', 'could not find and execute the command'),
+            'web-3': ('failed', 'connection refused'),
+            'web-4': ('failed', 'no reply'),
+            'web-5': ('timeout', ''),
+        })
+        self.assertTrue(fanout.failed())
+
+    def test_streaming_agent_is_closed_on_timeout(self):
+        slow = StreamingResponse([agent_reply('web-2', ['first'])], blocking=True)
+        replies = {'web-1': [agent_reply('web-1', ['a'])], 'web-2': slow}
+        started = time.monotonic()
+        fanout, lines = self.run_fanout(['web-1', 'web-2'], replies, timeout_sec=0.3)
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertIn('web-2 | first', lines)
+        self.assertTrue(slow.closed.is_set())
+        # the worker stops reading the closed response instead of waiting for the agent
+        self.assertTrue(slow.finished.wait(2))
+        statuses = {r.agent: (r.status(fanout.slow_sec), r.error()) for r in fanout.results}
+        self.assertEqual(statuses, {'web-1': ('ok', ''), 'web-2': ('timeout', '')})
+
+    def test_interrupt_cancels_agents_not_started(self):
+        replies = {'web-1': [agent_reply('web-1', ['a'])], 'web-2': [agent_reply('web-2', ['b'])]}
+        shutdown = concurrent.futures.ThreadPoolExecutor.shutdown
+
+        def shutdown_without_cancel_futures(executor, wait=True):
+            # signature of ThreadPoolExecutor.shutdown before python 3.9
+            shutdown(executor, wait=wait)
+
+        with mock.patch.object(concurrent.futures.ThreadPoolExecutor, 'shutdown', shutdown_without_cancel_futures), \
+                mock.patch.object(agent_fanout.concurrent.futures, 'wait', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                self.run_fanout(['web-1', 'web-2'], replies, delays={'web-1': 0.2}, concurrency=1)
+
+    def test_slow_agents_in_summary(self):
+        replies = {'web-1': [agent_reply('web-1', ['a'])], 'web-2': [agent_reply('web-2', ['b'])]}
+        fanout, _ = self.run_fanout(['web-1', 'web-2'], replies, delays={'web-2': 0.2}, slow_sec=0.1)
+        fanout.out = io.StringIO()
+        fanout.print_summary()
+        summary = fanout.out.getvalue()
+        self.assertIn('Agents: 2, ok: 1, slow: 1, failed: 0, timed out: 0', summary)
+        self.assertIn('web-2', summary)
+        self.assertNotIn('web-1', summary)
@@ -0,0 +1,155 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+import testutils
+from nsgcli import agent_commands
+from nsgcli import agent_tail
+
+
+class FakeLog(object):
+    """
+    log files on agents; fetch() returns the last lines like 'tail -NN' does
+    """
+
+    def __init__(self, files):
+        self.files = files
+        self.requests = []
+
+    def fetch(self, agent, lines):
+        self.requests.append((agent, lines))
+        return {agent: self.files[agent][-lines:]}, None
+
+    def append(self, agent, *lines):
+        self.files[agent].extend(lines)
+
+
+class TailArgsTestCase(unittest.TestCase):
+
+    def test_parse_tail_args(self):
+        self.assertTrue(agent_tail.is_follow('-f agent.log'))
+        self.assertFalse(agent_tail.is_follow('-100 agent.log'))
+        self.assertEqual(agent_tail.parse_tail_args('-f agent.log'), (10, 1.0, 'agent.log'))
+        self.assertEqual(agent_tail.parse_tail_args('-f -20 interval=5 agent.log'), (20, 5.0, 'agent.log'))
+        with self.assertRaises(agent_tail.TailError):
+            agent_tail.parse_tail_args('-f')
+        with self.assertRaises(agent_tail.TailError):
+            agent_tail.parse_tail_args('-f interval=0 agent.log')
+
+    def test_find_overlap(self):
+        self.assertEqual(agent_tail.find_overlap([1, 2, 3], [2, 3, 4], anchor_lines=2), (2, False))
+        self.assertEqual(agent_tail.find_overlap([1, 2, 3], [1, 2, 3]), (3, False))
+        self.assertEqual(agent_tail.find_overlap([1, 2, 3], [4, 5]), (0, False))
+        self.assertEqual(agent_tail.find_overlap([], [1]), (0, False))
+        # the anchor is found twice, the last match is used
+        self.assertEqual(agent_tail.find_overlap([7, 8, 9, 9], [9, 9, 5, 9, 9, 6], anchor_lines=2), (5, True))
+
+
+class LogFollowerTestCase(unittest.TestCase):
+
+    def make_follower(self, log, agents, **kwargs):
+        out = io.StringIO()
+        follower = agent_tail.LogFollower(log.fetch, agents, interval=0.01, out=out, **kwargs)
+        return follower, out
+
+    def test_prints_only_new_lines(self):
+        log = FakeLog({'a1': ['line {0}'.format(i) for i in range(20)]})
+        follower, out = self.make_follower(log, ['a1'], lines=2)
+        follower.poll()
+        log.append('a1', 'line 20', 'line 21')
+        follower.poll()
+        follower.poll()
+        self.assertEqual(out.getvalue().splitlines(),
+                         ['a1 | line 18', 'a1 | line 19', 'a1 | line 20', 'a1 | line 21'])
+
+    def test_gap_grows_window(self):
+        log = FakeLog({'a1': ['old']})
+        follower, out = self.make_follower(log, ['a1'], lines=0)
+        follower.poll()
+        log.append('a1', *['new {0}'.format(i) for i in range(agent_tail.MIN_WINDOW + 10)])
+        follower.poll()
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], 'a1 | ' + agent_tail.GAP_MESSAGE)
+        self.assertEqual(len(lines), agent_tail.MIN_WINDOW + 1)
+        self.assertEqual(follower.windows['a1'], agent_tail.MIN_WINDOW * 2)
+        self.assertEqual(log.requests[-1], ('a1', agent_tail.MIN_WINDOW))
+
+    def test_repeated_lines_print_marker(self):
+        window = ['line {0}'.format(i) for i in range(agent_tail.MIN_WINDOW)]
+        log = FakeLog({'a1': window + ['heartbeat'] * agent_tail.ANCHOR_LINES})
+        follower, out = self.make_follower(log, ['a1'], lines=0)
+        follower.poll()
+        log.append('a1', 'heartbeat', 'done')
+        follower.poll()
+        self.assertEqual(out.getvalue().splitlines(), ['a1 | ' + agent_tail.AMBIGUOUS_MESSAGE, 'a1 | done'])
+
+    def test_idle_file_with_repeated_lines(self):
+        window = ['line {0}'.format(i) for i in range(agent_tail.MIN_WINDOW)]
+        log = FakeLog({'a1': window + ['heartbeat'] * agent_tail.ANCHOR_LINES * 2})
+        follower, out = self.make_follower(log, ['a1'], lines=0)
+        for _ in range(3):
+            follower.poll()
+        self.assertEqual(out.getvalue(), '')
+        self.assertEqual(follower.files['a1'].gaps, 0)
+
+    def test_small_file_with_repeated_lines(self):
+        log = FakeLog({'a1': ['heartbeat']})
+        follower, out = self.make_follower(log, ['a1'], lines=1)
+        follower.poll()
+        log.append('a1', 'heartbeat')
+        follower.poll()
+        self.assertEqual(out.getvalue().splitlines(), ['a1 | heartbeat', 'a1 | heartbeat'])
+
+    def test_several_agents(self):
+        log = FakeLog({'a1': ['x1'], 'a2': ['y1']})
+        follower, out = self.make_follower(log, ['a1', 'a2'])
+        follower.run(count=1)
+        log.append('a2', 'y2')
+        follower.run(count=2)
+        self.assertEqual(sorted(out.getvalue().splitlines()), ['a1 | x1', 'a2 | y1', 'a2 | y2'])
+
+    def test_errors_are_printed_once(self):
+        def fetch(agent, lines):
+            return None, 'connection refused'
+        out = io.StringIO()
+        follower = agent_tail.LogFollower(fetch, ['a1'], interval=0.01, out=out)
+        follower.run(count=3)
+        self.assertEqual(out.getvalue().splitlines(), ['a1 | ERROR: connection refused'])
+
+
+class AgentTailFollowTestCase(unittest.TestCase):
+
+    def test_fetch_tail_groups_lines_by_agent(self):
+        replies = [
+            {'agent': 'a1', 'response': ['x1', 'x2'], 'exitStatus': 0, 'uuid': '1'},
+            {'agent': 'a2', 'response': ['y1'], 'exitStatus': 0, 'uuid': '2'},
+        ]
+        cmd = agent_commands.AgentCommands('all', 'https://base_url', 'token', 1)
+        with mock.patch.object(agent_commands.sub_command.api, 'call', return_value=(iter(replies), None)) as call:
+            self.assertEqual(cmd.fetch_tail('all', '/var/log/agent.log', 50),
+                             ({'a1': ['x1', 'x2'], 'a2': ['y1']}, None))
+        self.assertIn('tail/agent/all?args=-50 /var/log/agent.log', call.call_args[0][2])
+
+    def run_agent_fanout(self, args):
+        cli = testutils.get_nsgcli()
+        out = io.StringIO()
+        with mock.patch.object(agent_tail, 'LogFollower') as follower, \
+                mock.patch.object(agent_commands.sub_command.api, 'call', return_value=(iter([]), None)) as call, \
+                redirect_stdout(out):
+            cli.agent_fanout('a1,a2', args)
+            if follower.called:
+                fetch = follower.call_args[0][0]
+                fetch('a1', 10)
+        return follower, call, out.getvalue()
+
+    def test_fanout_options_apply_to_follow(self):
+        follower, call, _ = self.run_agent_fanout(['concurrency=3', 'timeout=7', 'tail', '-f', 'agent.log'])
+        self.assertEqual(follower.call_args[0][1], ['a1', 'a2'])
+        self.assertEqual(follower.call_args[1]['concurrency'], 3)
+        self.assertEqual(call.call_args[1]['timeout'], 7)
+
+    def test_slow_option_is_rejected_with_follow(self):
+        follower, _, out = self.run_agent_fanout(['slow=5', 'log', '-f', 'agent.log'])
+        self.assertFalse(follower.called)
+        self.assertIn('ERROR: option slow can not be used with -f', out)
@@ -0,0 +1,83 @@
+import unittest
+
+import numpy as np
+
+import testutils
+from nsgcli import analytics
+
+TABLE = {
+    'columns': [{'text': 'device'}, {'text': 'component'}, {'text': 'value'}],
+    'rows': [
+        ['dev1', 'cpu0', 10],
+        ['dev2', 'cpu0', 50],
+        ['dev1', 'cpu1', 30],
+        ['dev2', 'cpu1', None],
+        ['dev1', 'cpu2', 20],
+        ['dev3', 'cpu0', 5],
+    ],
+    'server': 'nsg-api-1',
+}
+
+
+def run(*stages):
+    table = dict(TABLE, rows=[list(row) for row in TABLE['rows']])
+    result = analytics.apply_stages(table, list(stages))
+    return [c['text'] for c in result['columns']], list(result['rows'])
+
+
+class AnalyticsTestCase(unittest.TestCase):
+
+    def test_split_pipeline(self):
+        self.assertEqual(analytics.split_pipeline('SELECT a FROM b | groupby a agg count() |top 5'),
+                         ('SELECT a FROM b', ['groupby a agg count()', 'top 5']))
+        self.assertEqual(analytics.split_pipeline('SELECT a FROM b WHERE c = "x | top 5"'),
+                         ('SELECT a FROM b WHERE c = "x | top 5"', []))
+        self.assertEqual(analytics.split_pipeline('SELECT a | b FROM c'), ('SELECT a | b FROM c', []))
+
+    def test_groupby(self):
+        columns, rows = run('groupby device agg count(), count(value), sum(value), mean(value), p50(value), '
+                            'max(value)')
+        self.assertEqual(columns, ['device', 'count()', 'count(value)', 'sum(value)', 'mean(value)', 'p50(value)',
+                                   'max(value)'])
+        self.assertEqual(rows, [['dev1', 3, 3, 60, 20, 20, 30],
+                                ['dev2', 2, 1, 50, 50, 50, 50],
+                                ['dev3', 1, 1, 5, 5, 5, 5]])
+
+    def test_groupby_percentile_matches_numpy(self):
+        values = np.random.RandomState(1).rand(1000)
+        groups = np.arange(1000) % 7
+        table = {'columns': [{'text': 'g'}, {'text': 'v'}],
+                 'rows': [[int(g), float(v)] for g, v in zip(groups, values)]}
+        result = analytics.apply_stages(table, ['groupby g agg p95(v)'])
+        for g, p95 in result['rows']:
+            self.assertAlmostEqual(p95, np.percentile(values[groups == g], 95))
+
+    def test_groupby_several_keys_and_top(self):
+        columns, rows = run('groupby component,device agg max(value)', 'top 2')
+        self.assertEqual(rows, [['cpu0', 'dev2', 50], ['cpu1', 'dev1', 30]])
+        columns, rows = run('top 2 by value asc')
+        self.assertEqual(rows, [['dev3', 'cpu0', 5], ['dev1', 'cpu0', 10]])
+
+    def test_hist_and_percentiles(self):
+        columns, rows = run('hist value bins=2')
+        self.assertEqual(columns, ['from', 'to', 'count'])
+        self.assertEqual(rows, [[5, 27.5, 3], [27.5, 50, 2]])
+        columns, rows = run('percentiles value 50,90')
+        self.assertEqual(columns, ['count', 'min', 'mean', 'p50', 'p90', 'max'])
+        self.assertEqual(rows, [[5, 5, 23, 20, 42, 50]])
+
+    def test_errors(self):
+        for stage in ['groupby device', 'groupby device agg foo(value)', 'groupby nope agg count()',
+                      'top x', 'top 0', 'top -1', 'hist device', 'hist value bins=x', 'hist value bins=0',
+                      'percentiles', 'percentiles value 150', 'percentiles value -1', 'percentiles value nan',
+                      'groupby device agg p150(value)']:
+            with self.assertRaises(analytics.AnalyticsError):
+                run(stage)
+
+    def test_nsgql_pipeline(self):
+        content = testutils.read_file('nsgql_table_resp.json', as_text=False)
+        actual = testutils.run_cmd_with_mock('SELECT device, address, cpuUsage FROM devices | top 1 by cpuUsage',
+                                             'post', 200, content, cmd=testutils.get_nsgql())
+        self.assertIn('dev1', actual)
+        self.assertNotIn('dev2', actual)
+        self.assertIn('Count: 1, served by: nsg-api-1', actual)
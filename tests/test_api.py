@@ -0,0 +1,107 @@
+import http.server
+import os
+import socketserver
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from urllib.parse import quote
+
+from nsgcli import api
+
+
+class SessionPoolTestCase(unittest.TestCase):
+
+    def tearDown(self):
+        api.configure_sessions()
+
+    def test_session_reused_per_base_url(self):
+        s1 = api.get_session('https://nsg-api:9100/v2/ping/net/1/se')
+        s2 = api.get_session('https://nsg-api:9100/v2/query/net/1/data/')
+        self.assertIs(s1, s2)
+
+    def test_different_base_urls_use_different_sessions(self):
+        s1 = api.get_session('https://nsg-api:9100/v2/ping/net/1/se')
+        s2 = api.get_session('https://nsg-api-2:9100/v2/ping/net/1/se')
+        s3 = api.get_session('http+unix://%2Fopt%2Fnsg%2Fapi.sock/v2/ping/net/1/se')
+        self.assertIsNot(s1, s2)
+        self.assertIsNot(s1, s3)
+
+    def test_unix_socket_connection_reused_across_urls(self):
+        connections = []
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                connections.append(self.request)
+                super(Handler, self).setup()
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header('Content-Length', '2')
+                self.end_headers()
+                self.wfile.write(b'{}')
+
+            def log_message(self, *args):
+                pass
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'api.sock')
+            server = socketserver.ThreadingUnixStreamServer(path, Handler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            try:
+                base_url = 'http+unix://' + quote(path, safe='')
+                for uri in ['/v2/ping/net/1/se', '/v2/status', '/v2/ping/net/1/se']:
+                    url = base_url + uri
+                    response = api.get_session(url).get(url)
+                    self.assertEqual(response.status_code, 200)
+                    response.close()
+                self.assertEqual(len(connections), 1)
+            finally:
+                api.close_sessions()
+                server.shutdown()
+                server.server_close()
+
+    def test_configure_sessions(self):
+        s1 = api.get_session('https://nsg-api:9100/')
+        api.configure_sessions(pool_size=4, keep_alive=False)
+        s2 = api.get_session('https://nsg-api:9100/')
+        self.assertIsNot(s1, s2)
+        self.assertEqual(s2.headers['Connection'], 'close')
+        self.assertEqual(s2.get_adapter('https://nsg-api:9100/')._pool_maxsize, 4)
+
+
+class CallManyTestCase(unittest.TestCase):
+
+    def test_results_in_input_order(self):
+        def fake_call(base_url, method, uri_path, **kwargs):
+            if uri_path == 'slow':
+                time.sleep(0.05)
+            if uri_path == 'bad':
+                return None, 'error in ' + uri_path
+            return uri_path, None
+
+        specs = [{'method': 'GET', 'uri_path': p} for p in ['slow', 'fast', 'bad']]
+        with mock.patch.object(api, 'call', side_effect=fake_call):
+            results = api.call_many('https://base_url', specs, concurrency=3)
+            completed = [idx for idx, _, _ in api.iter_many('https://base_url', specs, concurrency=3)]
+        self.assertEqual(results, [('slow', None), ('fast', None), (None, 'error in bad')])
+        self.assertEqual(completed[-1], 0)
+
+    def test_exception_is_reported_per_request(self):
+        with mock.patch.object(api, 'call', side_effect=ValueError('boom')):
+            results = api.call_many('https://base_url', [{'method': 'GET', 'uri_path': 'x'}])
+        self.assertIsNone(results[0][0])
+        self.assertIn('boom', results[0][1])
+
+
+class CheckErrorTestCase(unittest.TestCase):
+
+    def test_not_modified_is_error_unless_conditional(self):
+        response = mock.Mock(status_code=api.NOT_MODIFIED, content=b'', headers={'Content-Type': 'text/plain'})
+        self.assertIsNone(api.check_error(response, None, quiet=True, conditional=True))
+        error = api.check_error(response, None, quiet=True)
+        self.assertEqual(error.status_code, api.NOT_MODIFIED)
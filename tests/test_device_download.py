@@ -0,0 +1,129 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import testutils
+from nsgcli import device_commands
+from nsgcli import device_download
+
+device_download_resp = testutils.read_file('device_download_response.json', as_text=False)
+
+
+class FakeServer(object):
+    """
+    serves device bodies; devices with ETag answer 304 to If-None-Match with the same ETag
+    """
+
+    def __init__(self, bodies, etags=None):
+        self.bodies = bodies
+        self.etags = etags or {}
+        self.requests = []
+        self.responses = []
+
+    def call(self, device, headers):
+        self.requests.append((device, dict(headers or {})))
+        body = self.bodies.get(device)
+        if body is None:
+            return None, 'ERROR: device not found'
+        etag = self.etags.get(device)
+        if etag is not None and (headers or {}).get('If-None-Match') == etag:
+            response = testutils.mock_response(304, b'', None)
+        else:
+            response = testutils.mock_response(200, body, None, fixed_chunk_size=7)
+            if etag is not None:
+                response.headers['ETag'] = etag
+        self.responses.append(response)
+        return response, None
+
+
+class DeviceDownloadTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output_dir = os.path.join(self.tmp.name, 'devices')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_downloader(self, server, devices):
+        downloader = device_download.DeviceDownloader(server.call, self.output_dir, concurrency=2,
+                                                      progress=io.StringIO())
+        return {device: (result, message) for device, result, message in downloader.run(devices)}
+
+    def test_parse_download_args(self):
+        options = device_download.parse_download_args('-o /tmp/out -c 16 -q "name ~ \'sw*\'" -f devices.txt 1 2')
+        self.assertEqual(options, {'devices': ['1', '2'], 'file': 'devices.txt', 'query': "name ~ 'sw*'",
+                                   'output_dir': '/tmp/out', 'concurrency': 16})
+        with self.assertRaises(device_download.DownloadError):
+            device_download.parse_download_args('-o')
+        with self.assertRaises(device_download.DownloadError):
+            device_download.parse_download_args('-c none 1')
+
+    def test_device_file_name(self):
+        self.assertEqual(device_download.device_file_name('sw1.lab-1'), 'sw1.lab-1.json')
+        self.assertRegex(device_download.device_file_name('sw1/a b'), r'^sw1_a_b~[0-9a-f]{12}\.json$')
+        self.assertNotEqual(device_download.device_file_name('manifest'), device_download.MANIFEST_FILE)
+        names = ['core sw1', 'core/sw1', 'core_sw1']
+        self.assertEqual(len(set(device_download.device_file_name(n) for n in names)), len(names))
+
+    def test_download_devices_with_colliding_names(self):
+        server = FakeServer({'core sw1': b'{"ID": 1}', 'core/sw1': b'{"ID": 2}', 'core_sw1': b'{"ID": 3}'})
+        results = self.run_downloader(server, ['core sw1', 'core/sw1', 'core_sw1'])
+        self.assertEqual(set(results.values()), {('downloaded', '')})
+        for device, body in server.bodies.items():
+            with open(os.path.join(self.output_dir, device_download.device_file_name(device)), 'rb') as f:
+                self.assertEqual(f.read(), body)
+
+    def test_download_and_skip_unchanged(self):
+        server = FakeServer({'1': device_download_resp, '2': b'{"ID": 2}', '3': b'{"ID": 3}'}, etags={'1': '"v1"'})
+        results = self.run_downloader(server, ['1', '2', '3', '4'])
+        self.assertEqual(results, {'1': ('downloaded', ''), '2': ('downloaded', ''), '3': ('downloaded', ''),
+                                   '4': ('failed', 'ERROR: device not found')})
+        with open(os.path.join(self.output_dir, '1.json'), 'rb') as f:
+            self.assertEqual(f.read(), device_download_resp)
+        with open(os.path.join(self.output_dir, device_download.MANIFEST_FILE)) as f:
+            manifest = json.load(f)['devices']
+        self.assertEqual(manifest['1']['etag'], '"v1"')
+        self.assertEqual(manifest['2']['size'], len(b'{"ID": 2}'))
+        self.assertNotIn('4', manifest)
+
+        server.bodies['3'] = b'{"ID": 3, "name": "new"}'
+        server.requests = []
+        results = self.run_downloader(server, ['1', '2', '3'])
+        self.assertEqual(results, {'1': ('unchanged', ''), '2': ('unchanged', ''), '3': ('downloaded', '')})
+        self.assertIn(('1', {'If-None-Match': '"v1"'}), server.requests)
+        with open(os.path.join(self.output_dir, '3.json'), 'rb') as f:
+            self.assertEqual(f.read(), b'{"ID": 3, "name": "new"}')
+        self.assertEqual([n for n in os.listdir(self.output_dir) if n.endswith('.tmp')], [])
+        self.assertTrue(all(r.close.called for r in server.responses))
+
+    def test_response_is_closed_when_download_fails(self):
+        response = testutils.mock_response(200, b'{"ID": 1}', None)
+        response.iter_content = mock.Mock(side_effect=OSError('connection reset'))
+        downloader = device_download.DeviceDownloader(lambda device, headers: (response, None), self.output_dir,
+                                                      progress=io.StringIO())
+        self.assertEqual(downloader.run(['1']), [('1', 'failed', 'connection reset')])
+        self.assertTrue(response.close.called)
+        self.assertEqual([n for n in os.listdir(self.output_dir) if n.endswith('.tmp')], [])
+
+    def test_download_command_with_query(self):
+        def call(base_url, method, uri_path, **kwargs):
+            if method == 'POST':
+                self.assertEqual(kwargs['data']['targets'][0]['nsgql'], "SELECT id FROM devices WHERE name ~ 'sw*'")
+                return [{'columns': [{'text': 'id'}], 'rows': [[5], [6]]}], None
+            return testutils.mock_response(200, b'{}', None), None
+
+        cmd = device_commands.DeviceCommands('https://base_url', 'token', 1, None)
+        with mock.patch.object(device_commands.api, 'call', side_effect=call), mock.patch('sys.stderr', io.StringIO()):
+            with testutils.capture_stdout() as capture:
+                cmd.onecmd('download -o {0} -q "name ~ \'sw*\'" 5'.format(self.output_dir))
+        self.assertIn('│ downloaded │         2 │', capture.stdout.getvalue())
+        self.assertEqual(sorted(os.listdir(self.output_dir)), ['5.json', '6.json', 'manifest.json'])
+
+    def test_download_many_devices_requires_output_dir(self):
+        cmd = device_commands.DeviceCommands('https://base_url', 'token', 1, None)
+        actual = testutils.run_cmd(cmd, 'download 1 2')
+        self.assertEqual(actual, 'ERROR: option -o DIR is required to download more than one device')
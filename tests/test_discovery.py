@@ -1,6 +1,14 @@
+import io
+import os
+import tempfile
 import unittest
+from unittest import mock
+
+from requests import Session
 
 import testutils
+from nsgcli import api
+from nsgcli import discovery_commands
 
 discovery_queue_resp = testutils.read_file('discovery_queue_resp.json')
 discovery_queue_paused_resp = testutils.read_file('discovery_queue_paused_resp.json')
@@ -48,3 +56,45 @@ class DiscoveryTestCase(unittest.TestCase):
         actual = testutils.run_cmd_with_mock(cmdline, 'post', 500, discovery_device_not_found)
         expected = 'An error occurred. Error: io.grpc.StatusRuntimeException: NOT_FOUND: find(): device not found, name=dev1 sysName=dev1 address=dev1, API status code: 500'
         self.assertEqual(expected, actual)
+
+    def test_parse_submit_args(self):
+        self.assertEqual(discovery_commands.parse_submit_args('1 2'), (None, 8, ['1', '2']))
+        self.assertEqual(discovery_commands.parse_submit_args('-f devices.txt -c 32'), ('devices.txt', 32, []))
+        with self.assertRaises(discovery_commands.DiscoveryError):
+            discovery_commands.parse_submit_args('-c 0 -f -')
+        with self.assertRaises(discovery_commands.DiscoveryError):
+            discovery_commands.parse_submit_args('-f')
+
+    def test_classify_submit_result(self):
+        cmd = discovery_commands.DiscoveryCommands('https://base_url', 'token', 1, None)
+        self.assertEqual(cmd.classify_submit_result({'success': 'ok'}, None), (discovery_commands.SUBMIT_ACCEPTED, ''))
+        self.assertEqual(cmd.classify_submit_result([{'error': 'device not found', 'status': 'ERROR'}], None),
+                         (discovery_commands.SUBMIT_REJECTED, 'device not found'))
+        self.assertEqual(cmd.classify_submit_result(None, None)[0], discovery_commands.SUBMIT_FAILED)
+        self.assertEqual(cmd.classify_submit_result(None, api.ApiError('timed out'))[0],
+                         discovery_commands.SUBMIT_FAILED)
+        self.assertEqual(cmd.classify_submit_result(None, api.ApiError('bad request', 400))[0],
+                         discovery_commands.SUBMIT_REJECTED)
+
+    def test_discovery_submit_from_file(self):
+        def post(url, **kwargs):
+            device = url.split('/')[-1]
+            if device == 'dev3':
+                raise ConnectionError('connection reset')
+            if device == 'dev2':
+                return testutils.mock_response(500, discovery_device_not_found, None)
+            return testutils.mock_response(200, status_ok_resp, None)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            file_name = os.path.join(tmp, 'devices.txt')
+            with open(file_name, 'w') as f:
+                f.write('dev1\ndev2\ndev3\ndev4\n')
+            stderr = io.StringIO()
+            with mock.patch.object(Session, 'post', side_effect=post), mock.patch('sys.stderr', stderr):
+                actual = testutils.run_cmd(testutils.get_nsgcli(), 'discovery submit -f {0} -c 2'.format(file_name))
+        self.assertIn('submitted 4/4: 2 accepted, 1 rejected, 1 failed', stderr.getvalue())
+        lines = actual.splitlines()
+        self.assertIn('│ accepted │         2 │', lines)
+        self.assertTrue(any('dev2' in line and 'rejected' in line and 'device not found' in line for line in lines))
+        self.assertTrue(any('dev3' in line and 'failed' in line and 'connection reset' in line for line in lines))
+        self.assertFalse(any('dev4' in line for line in lines))
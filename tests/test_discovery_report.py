@@ -0,0 +1,116 @@
+import threading
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import testutils
+from nsgcli import discovery_commands
+from nsgcli import discovery_report
+
+
+def make_report(idx, lag, ping='OK', snmp='OK'):
+    return {
+        'deviceId': idx,
+        'address': '10.0.0.{0}'.format(idx),
+        'reportName': 'dev{0}'.format(idx),
+        'lagSec': lag,
+        'discoveryStartTime': '2022-07-03T20:00:00.000Z',
+        'discoveryFinishTime': '2022-07-03T20:00:{0:02d}.000Z'.format(idx % 60),
+        'processingFinishTime': '2022-07-03T20:01:00.000Z',
+        'discoveryPingStatus': ping,
+        'discoverySnmpStatus': snmp,
+    }
+
+
+class PagedReports(object):
+
+    def __init__(self, count, with_total=True):
+        self.reports = [make_report(i, i) for i in range(count)]
+        self.with_total = with_total
+        self.offsets = []
+        self.lock = threading.Lock()
+
+    def fetch_page(self, offset, limit):
+        with self.lock:
+            self.offsets.append(offset)
+        total = len(self.reports) if self.with_total else None
+        return self.reports[offset:offset + limit], total, None
+
+
+class DiscoveryReportTestCase(unittest.TestCase):
+
+    def test_parse_report_args(self):
+        options = discovery_report.parse_report_args('dc1 top=5 history')
+        self.assertEqual(options, {'filter': 'dc1', 'top': 5, 'page': discovery_report.DEFAULT_PAGE_SIZE,
+                                   'concurrency': 8, 'history': True})
+        with self.assertRaises(discovery_report.ReportError):
+            discovery_report.parse_report_args('page=0')
+
+    def test_page_reports_with_total(self):
+        pages = PagedReports(25)
+        reports = discovery_report.page_reports(pages.fetch_page, page_size=10, concurrency=4)
+        self.assertEqual([r['deviceId'] for r in reports], list(range(25)))
+        self.assertEqual(sorted(pages.offsets), [0, 10, 20])
+
+    def test_page_reports_without_total(self):
+        pages = PagedReports(35, with_total=False)
+        reports = discovery_report.page_reports(pages.fetch_page, page_size=10, concurrency=2)
+        self.assertEqual([r['deviceId'] for r in reports], list(range(35)))
+        self.assertEqual(sorted(pages.offsets), [0, 10, 20, 30, 40])
+
+    def test_page_error(self):
+        def fetch_page(offset, limit):
+            if offset:
+                return None, None, 'server error'
+            return [make_report(i, i) for i in range(limit)], 100, None
+        with self.assertRaises(discovery_report.ReportError):
+            discovery_report.page_reports(fetch_page, page_size=10)
+
+    def test_parse_times(self):
+        times = discovery_report.parse_times(['2022-07-03T20:00:05.210Z', None, '2022-07-03T22:00:06+02:00'])
+        self.assertEqual(times[0], 1656878405.21)
+        self.assertTrue(np.isnan(times[1]))
+        self.assertEqual(times[2], 1656878406.0)
+
+    def test_statistics(self):
+        reports = [make_report(i, float(i * 10), ping='OK' if i % 4 else 'FAILED', snmp='OK') for i in range(1, 41)]
+        reports.append(make_report(41, None, ping=None, snmp='TIMEOUT'))
+        report = discovery_report.DiscoveryReport(reports)
+        lag = report.percentiles()[0]
+        self.assertEqual(lag[:4], ['lagSec', 40, 10.0, 205.0])
+        self.assertEqual(lag[4], 205.0)
+        discovery = report.percentiles()[1]
+        self.assertEqual(discovery[1], 41)
+        self.assertEqual(discovery[-1], 41.0)
+        histogram = dict(report.histogram())
+        self.assertEqual(histogram['< 10s'], 0)
+        self.assertEqual(histogram['< 30s'], 2)
+        self.assertEqual(histogram['< 600s'], 11)
+        self.assertEqual(sum(histogram.values()), 40)
+        self.assertEqual([reports[i]['deviceId'] for i in report.slowest(3)], [40, 39, 38])
+        self.assertEqual(report.failure_rates(), [['ping', 40, 10, 25.0], ['snmp', 41, 1, 2.44]])
+
+    def test_discovery_report_command(self):
+        reports = [make_report(i, float(i)) for i in range(1, 4)]
+        cmd = discovery_commands.DiscoveryCommands('https://base_url', 'token', 1, None)
+        with mock.patch.object(discovery_commands.api, 'call',
+                               return_value=({'reports': reports, 'total': 3}, None)) as call:
+            with testutils.capture_stdout() as capture:
+                cmd.onecmd('report dc1 top=2')
+        request = call.call_args[0][2]
+        self.assertIn('offset=0&limit=500&q=dc1&most_recent=true', request)
+        self.assertIn('fields=' + ','.join(discovery_commands.DISCOVERY_STATUS_FIELDS), request)
+        output = capture.stdout.getvalue()
+        self.assertIn('Reports: 3', output)
+        self.assertIn('Slowest 2 devices:', output)
+        self.assertIn('dev3', output)
+        self.assertNotIn('dev1 ', output)
+
+    def test_get_reports(self):
+        cmd = discovery_commands.DiscoveryCommands('https://base_url', 'token', 1, None)
+        with mock.patch.object(discovery_commands.api, 'call', return_value=(None, None)) as call:
+            reports, total, error = cmd.get_reports('dc1 & core', 500, 500)
+        self.assertIn('&q=dc1%20%26%20core&', call.call_args[0][2])
+        self.assertIsNone(reports)
+        self.assertEqual(error, 'could not decode discovery reports at offset 500')
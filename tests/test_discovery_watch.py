@@ -0,0 +1,76 @@
+import io
+import json
+import unittest
+
+import testutils
+from nsgcli import discovery_watch
+from nsgcli import table_renderer
+
+discovery_queue_resp = json.loads(testutils.read_file('discovery_queue_resp.json'))
+
+
+def queue_response(queued, in_progress, pending=()):
+    return {
+        'enabled': True,
+        'paused': False,
+        'queue': [{'deviceID': d, 'name': 'dev{0}'.format(d), 'address': '10.0.0.{0}'.format(d), 'duration': 0}
+                  for d in queued],
+        'communicating': [{'deviceID': d, 'name': 'dev{0}'.format(d), 'address': '10.0.0.{0}'.format(d),
+                           'duration': duration} for d, duration in in_progress],
+        'pendingProcessing': [{'id': d, 'duration': duration} for d, duration in pending],
+        'currentGeneration': {'generation': 7, 'devicesToDiscover': 100},
+    }
+
+
+class DiscoveryWatchTestCase(unittest.TestCase):
+
+    def test_parse_watch_args(self):
+        self.assertIsNone(discovery_watch.parse_watch_args(''))
+        self.assertEqual(discovery_watch.parse_watch_args('--watch'), (5.0, 12))
+        self.assertEqual(discovery_watch.parse_watch_args('--watch 2 window=30'), (2.0, 30))
+        with self.assertRaises(discovery_watch.QueueWatchError):
+            discovery_watch.parse_watch_args('--watch fast')
+
+    def test_snapshot_of_fixture(self):
+        snapshot = discovery_watch.QueueSnapshot(discovery_queue_resp, 0)
+        self.assertEqual(snapshot.waiting, 0)
+        self.assertEqual(len(snapshot.pending), 10)
+        self.assertEqual(snapshot.generation['generation'], 85)
+
+    def test_rate_duration_and_eta(self):
+        stats = discovery_watch.QueueStats(window=3)
+        stats.add(discovery_watch.QueueSnapshot(queue_response(range(1, 11), [(11, 1.0), (12, 2.0)]), 0))
+        # 11 finished and is waiting for processing, 12 finished and has already been processed, 1 and 2
+        # went through the queue between polls
+        stats.add(discovery_watch.QueueSnapshot(queue_response(range(3, 11), [(1, 0.5)], [(11, 3.0)]), 60))
+        self.assertEqual(stats.rate_per_min(), 3.0)
+        self.assertEqual(stats.avg_duration(), 2.5)
+        self.assertEqual(stats.eta_sec(), 180.0)
+        stats.add(discovery_watch.QueueSnapshot(queue_response(range(4, 11), [(1, 60.5)]), 120))
+        stats.add(discovery_watch.QueueSnapshot(queue_response(range(5, 11), [(1, 120.5)]), 180))
+        # the oldest snapshot has left the window: one device per minute
+        self.assertEqual(stats.rate_per_min(), 1.0)
+        self.assertIsNone(stats.avg_duration())
+        self.assertEqual(stats.eta_sec(), 7 * 60.0)
+
+    def test_watcher_redraws_in_place(self):
+        responses = iter([queue_response([1, 2], [(3, 5.0)]), queue_response([2], [(1, 1.0)], [(3, 6.0)])])
+        out = io.StringIO()
+        watcher = discovery_watch.QueueWatcher(lambda: (next(responses), None), interval=0.01, out=out)
+        watcher.run(count=2)
+        text = out.getvalue()
+        first, second = text.split(table_renderer.CURSOR_UP.format(4) + table_renderer.CLEAR_TO_END)
+        self.assertIn('queued: 2, in progress: 1', first)
+        self.assertIn('completed: -', first)
+        self.assertIn('queued: 1, in progress: 1', second)
+        self.assertIn('average duration: 6.0s', second)
+
+    def test_watcher_shows_undecodable_response_as_error(self):
+        responses = iter([queue_response([1, 2], []), None])
+        out = io.StringIO()
+        watcher = discovery_watch.QueueWatcher(lambda: (next(responses), None), interval=0.01, out=out)
+        watcher.run(count=2)
+        second = out.getvalue().split(table_renderer.CLEAR_TO_END)[-1]
+        self.assertIn('ERROR: invalid response of the discovery queue: None', second)
+        self.assertIn('queued: 2, in progress: 0', second)
+        self.assertEqual(len(watcher.stats.snapshots), 1)
@@ -0,0 +1,114 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+import testutils
+from nsgcli import exporters
+from nsgcli import nsgql_stream
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+nsgql_table_resp = testutils.read_file('nsgql_table_resp.json')
+
+
+def first_table():
+    return next(nsgql_stream.parse_tables(testutils.iter_content(nsgql_table_resp, chunk_size=16)))
+
+
+class ExportersTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp_dir.name, name)
+
+    def test_csv(self):
+        count = exporters.make_writer('csv').write(first_table(), self.path('out.csv'))
+        self.assertEqual(count, 3)
+        with open(self.path('out.csv')) as f:
+            self.assertEqual(f.read(), 'device,address,cpuUsage\n'
+                                       'dev1,10.0.0.1,12.5\n'
+                                       'dev2,10.0.0.2,7\n'
+                                       'dev3,10.0.0.3,\n')
+
+    def test_tsv_gzip(self):
+        exporters.make_writer('tsv').write(first_table(), self.path('out.tsv.gz'), compress=True)
+        with gzip.open(self.path('out.tsv.gz'), 'rt') as f:
+            self.assertEqual(f.readline(), 'device\taddress\tcpuUsage\n')
+
+    def test_ndjson(self):
+        exporters.make_writer('ndjson').write(first_table(), self.path('out.ndjson'))
+        with open(self.path('out.ndjson')) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(lines[0], {'device': 'dev1', 'address': '10.0.0.1', 'cpuUsage': 12.5})
+        self.assertEqual(len(lines), 3)
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_parquet_row_groups(self):
+        import pyarrow.parquet
+        count = exporters.ArrowWriter(batch_size=2).write(first_table(), self.path('out.parquet'))
+        self.assertEqual(count, 3)
+        parquet_file = pyarrow.parquet.ParquetFile(self.path('out.parquet'))
+        self.assertEqual(parquet_file.metadata.num_row_groups, 2)
+        self.assertEqual(parquet_file.read().column('device').to_pylist(), ['dev1', 'dev2', 'dev3'])
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_parquet_type_change_across_batches(self):
+        import pyarrow.parquet
+        table = {'columns': [{'text': 'v'}, {'text': 's'}], 'rows': [[1, 1], [2, None], [3.5, 'x']]}
+        exporters.ArrowWriter(batch_size=2).write(table, self.path('out.parquet'))
+        result = pyarrow.parquet.read_table(self.path('out.parquet'))
+        self.assertEqual(result.column('v').to_pylist(), [1.0, 2.0, 3.5])
+        self.assertEqual(result.column('s').to_pylist(), ['1', None, 'x'])
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_parquet_type_change_after_sample(self):
+        writer = exporters.ArrowWriter(batch_size=2, sample_size=2)
+        for value in [3.5, 'x']:
+            table = {'columns': [{'text': 'v'}], 'rows': [[1], [2], [value]]}
+            with self.assertRaises(exporters.ExportError):
+                writer.write(table, self.path('out.parquet'))
+        table = {'columns': [{'text': 'v'}], 'rows': [[1], [2], [3.0]]}
+        self.assertEqual(writer.write(table, self.path('out.parquet')), 3)
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_parquet_mixed_types(self):
+        import pyarrow.parquet
+        table = {'columns': [{'text': 'v'}], 'rows': [['x'], [[1, 2]]]}
+        exporters.ArrowWriter().write(table, self.path('out.parquet'))
+        result = pyarrow.parquet.read_table(self.path('out.parquet'))
+        self.assertEqual(result.schema.field('v').type, pyarrow.string())
+        self.assertEqual(result.column('v').to_pylist()[0], 'x')
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_arrow_gzip_not_supported(self):
+        with self.assertRaises(exporters.ExportError):
+            exporters.ArrowWriter(exporters.EXPORT_ARROW).write(first_table(), self.path('out.arrow'), compress=True)
+
+    def test_output_path(self):
+        self.assertEqual(exporters.output_path('out.csv', 0), 'out.csv')
+        self.assertEqual(exporters.output_path('out.csv', 2), 'out.2.csv')
+        self.assertEqual(exporters.output_path('out.csv.gz', 1), 'out.1.csv.gz')
+        self.assertIsNone(exporters.output_path(None, 1))
+
+    def test_nsgql_export(self):
+        nsgql = testutils.get_nsgql()
+        nsgql.export_format = 'csv'
+        nsgql.output_file = self.path('out.csv')
+        try:
+            actual = testutils.run_cmd_with_mock('SELECT device FROM devices; SELECT * FROM foo', 'post', 200,
+                                                 nsgql_table_resp, cmd=nsgql)
+        finally:
+            nsgql.export_format = None
+            nsgql.output_file = None
+        self.assertIn('Wrote 3 rows to {0}'.format(self.path('out.csv')), actual)
+        self.assertIn('Server error: Table foo does not exist', actual)
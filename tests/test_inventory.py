@@ -0,0 +1,158 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+from nsgcli import inventory
+from nsgcli import search
+
+
+def inventory_table(rows):
+    return {'columns': [{'text': c} for c in inventory.INVENTORY_COLUMNS], 'rows': [list(r) for r in rows]}
+
+
+DEVICES = [
+    [1, 'core-sw1', '10.0.0.1', 'Cisco', 'FOC1234', 'Cisco Nexus 9000'],
+    [2, 'core-sw2', '10.0.0.2', 'Cisco', 'FOC5678', 'Cisco Nexus 9000'],
+    [3, 'edge-rtr1', '10.0.1.1', 'Juniper', 'JN99', 'Juniper MX480'],
+    [4, 'access-sw10', '10.0.2.10', 'Arista', 'SSJ42', 'Arista 7050'],
+]
+
+
+class DeviceInventoryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory = inventory.DeviceInventory()
+        self.inventory.update(inventory_table(DEVICES))
+
+    def matches(self, text):
+        return [(row[0], kind) for row, kind in self.inventory.search(text)]
+
+    def test_update_diff(self):
+        changed = [list(r) for r in DEVICES[1:]]
+        changed[0][1] = 'core-sw2-new'
+        changed.append([5, 'lab-sw1', '10.9.9.1', 'Cisco', 'LAB1', 'Cisco Catalyst'])
+        self.assertEqual(self.inventory.update(inventory_table(changed)), (1, 1, 1))
+        self.assertEqual(len(self.inventory), 4)
+        self.assertNotIn(1, [device_id for device_id, _ in self.matches('core-sw1')])
+        self.assertEqual(self.matches('core-sw2-new'), [(2, inventory.MATCH_EXACT)])
+        self.assertEqual(self.matches('lab'), [(5, inventory.MATCH_PREFIX)])
+        self.assertEqual(self.inventory.update(inventory_table(changed)), (0, 0, 0))
+
+    def test_update_column_order(self):
+        table = {'columns': [{'text': 'name'}, {'text': 'id'}], 'rows': [['x1', 7]]}
+        inv = inventory.DeviceInventory()
+        inv.update(table)
+        self.assertEqual(inv.rows, {7: [7, 'x1', None, None, None, None]})
+
+    def test_exact_and_prefix(self):
+        self.assertEqual(self.matches('10.0.0.1'), [(1, inventory.MATCH_EXACT)])
+        self.assertEqual(self.matches('3')[0], (3, inventory.MATCH_EXACT))
+        self.assertEqual(self.matches('CORE'), [(1, inventory.MATCH_PREFIX), (2, inventory.MATCH_PREFIX)])
+
+    def test_substring(self):
+        self.assertEqual(self.matches('nexus'), [(1, inventory.MATCH_SUBSTRING), (2, inventory.MATCH_SUBSTRING)])
+        self.assertEqual(self.matches('rtr'), [(3, inventory.MATCH_SUBSTRING)])
+        # exact and prefix matches come first
+        self.assertEqual(self.matches('10.0.0'), [(1, inventory.MATCH_PREFIX), (2, inventory.MATCH_PREFIX)])
+
+    def test_fuzzy(self):
+        self.assertEqual(self.matches('edge-router1'), [(3, inventory.MATCH_FUZZY)])
+        self.assertEqual(self.matches('zzzzzz'), [])
+
+    def test_limit(self):
+        self.assertEqual(len(self.inventory.search('10.0', limit=2)), 2)
+
+    def test_is_stale(self):
+        self.assertFalse(self.inventory.is_stale())
+        self.inventory.updated_at = time.time() - inventory.DEFAULT_TTL_SEC - 1
+        self.assertTrue(self.inventory.is_stale())
+        self.assertTrue(inventory.DeviceInventory().is_stale())
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = inventory.inventory_file('http://nsg', 1, tmp)
+            inv = inventory.DeviceInventory(path)
+            inv.update(inventory_table(DEVICES))
+            inv.save()
+            self.assertEqual(os.listdir(tmp), [os.path.basename(path)])
+            loaded = inventory.DeviceInventory(path)
+            self.assertEqual(loaded.rows, inv.rows)
+            self.assertEqual(loaded.updated_at, inv.updated_at)
+            self.assertEqual([row[0] for row, _ in loaded.search('core')], [1, 2])
+
+    def test_load_corrupted_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'inventory.gz')
+            with open(path, 'wb') as f:
+                f.write(b'not gzip')
+            self.assertEqual(len(inventory.DeviceInventory(path)), 0)
+
+
+class SearchCommandTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cmd = search.SearchCommand('http://nsg', 'token', 1, inventory_dir=self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_command(self, responses, arg):
+        calls = []
+
+        def fake_call(base_url, method, path, data=None, **kwargs):
+            calls.append((method, path, data['targets'][0]['nsgql']))
+            return responses.pop(0), None
+
+        out = io.StringIO()
+        with mock.patch('nsgcli.api.call', side_effect=fake_call), redirect_stdout(out):
+            self.cmd.onecmd(arg)
+        return calls, out.getvalue()
+
+    def test_stale_inventory_falls_back_to_server(self):
+        server_result = [{'columns': [{'text': 'id'}, {'text': 'name'}], 'rows': [[1, 'core-sw1']]}]
+        calls, out = self.run_command([server_result], 'device core')
+        # the inventory is not refreshed behind the search
+        self.assertEqual([c[0:2] for c in calls], [('POST', '/v2/query/net/1/data/')])
+        self.assertIn('name REGEXP "^core.*$"', calls[0][2])
+        self.assertIn('inventory is stale, querying server; run "search refresh"', out)
+        self.assertIn('core-sw1', out)
+        self.assertEqual(len(self.cmd.inventory), 0)
+
+        self.run_command([[inventory_table(DEVICES)]], 'refresh')
+        # the inventory is fresh now and saved on disk, the next search does not go to the server
+        self.cmd = search.SearchCommand('http://nsg', 'token', 1, inventory_dir=self.tmp.name)
+        calls, out = self.run_command([], 'device core')
+        self.assertEqual(calls, [])
+        self.assertIn('core-sw2', out)
+        self.assertIn('Count: 2, local inventory of 4 devices', out)
+
+    def test_forced_server_search(self):
+        self.cmd.inventory.update(inventory_table(DEVICES))
+        server_result = [{'columns': [{'text': 'id'}], 'rows': [[1]]}]
+        calls, _ = self.run_command([server_result], 'device --server core')
+        self.assertEqual(len(calls), 1)
+        self.assertIn('REGEXP', calls[0][2])
+
+    def test_regex_search_goes_to_server(self):
+        self.cmd.inventory.update(inventory_table(DEVICES))
+        server_result = [{'columns': [{'text': 'id'}], 'rows': [[1]]}]
+        calls, out = self.run_command([server_result], 'device core.*sw1')
+        self.assertEqual(len(calls), 1)
+        self.assertNotIn('stale', out)
+        self.assertIn('name REGEXP "^core.*sw1.*$"', calls[0][2])
+        self.assertFalse(search.is_regex('10.0.0.1'))
+
+    def test_local_search_of_empty_inventory(self):
+        calls, out = self.run_command([], 'device --local core')
+        self.assertEqual(calls, [])
+        self.assertIn('search refresh', out)
+
+    def test_refresh(self):
+        calls, out = self.run_command([[inventory_table(DEVICES)]], 'refresh')
+        self.assertEqual(len(calls), 1)
+        self.assertIn('Devices: 4; added: 4, changed: 0, removed: 0', out)
@@ -0,0 +1,72 @@
+import json
+import time
+import unittest
+from unittest import mock
+
+import testutils
+from nsgcli import nsgql_stream
+from nsgcli import response_handlers
+from nsgcli.nsgql_main import NsgQLCommandLine
+
+nsgql_table_resp = testutils.read_file('nsgql_table_resp.json')
+
+
+class NsgQLTestCase(unittest.TestCase):
+
+    def test_select_table(self):
+        cmdline = 'SELECT device,address,cpuUsage FROM devices; SELECT * FROM foo'
+        actual = testutils.run_cmd_with_mock(cmdline, 'post', 200, nsgql_table_resp,
+                                             cmd=testutils.get_nsgql(), fixed_chunk_size=7)
+        self.assertIn('│ dev1     │ 10.0.0.1  │ 12.50 %    │', actual)
+        self.assertIn('│ dev3     │ 10.0.0.3  │ NULL       │', actual)
+        self.assertIn('Count: 3, served by: nsg-api-1, processing time: 0.025 sec; query id: 42', actual)
+        self.assertIn('Server error: Table foo does not exist', actual)
+
+
+class TableStreamParserTestCase(unittest.TestCase):
+
+    def test_rows_are_parsed_incrementally(self):
+        chunks = testutils.iter_content(nsgql_table_resp, chunk_size=5)
+        tables = nsgql_stream.parse_tables(chunks)
+        table = next(tables)
+        self.assertEqual([c['text'] for c in table.get('columns')], ['device', 'address', 'cpuUsage'])
+        rows = table.rows()
+        self.assertEqual(next(rows), ['dev1', '10.0.0.1', 12.5])
+        self.assertIsNone(table.meta.get('processingTimeMs'))
+        self.assertEqual(list(rows), [['dev2', '10.0.0.2', 7], ['dev3', '10.0.0.3', None]])
+        self.assertEqual(table.get('queryId'), 42)
+        error_table = next(tables)
+        self.assertEqual(error_table.error, 'Table foo does not exist')
+        self.assertEqual(list(tables), [])
+
+    def test_fields_after_rows(self):
+        table = next(nsgql_stream.parse_tables(testutils.iter_content(nsgql_table_resp, chunk_size=5)))
+        # fields sent after rows are not available until the rows have been read, and reading
+        # them does not buffer the rows
+        self.assertIsNone(table.get('server'))
+        self.assertNotIn('server', table)
+        self.assertEqual(table.get('type', 'none'), 'none')
+        self.assertLessEqual(len(table._pending_rows), 1)
+        self.assertEqual(len(list(table.rows())), 3)
+        self.assertEqual(table.get('server'), 'nsg-api-1')
+
+
+class ConcurrentStatementsTestCase(unittest.TestCase):
+
+    def test_results_printed_in_statement_order(self):
+        def post_data(queries, quiet=False):
+            name = queries[0].split()[-1]
+            if name == 'slow':
+                time.sleep(0.05)
+            if name == 'bad':
+                return None, 'ERROR: table bad does not exist'
+            body = json.dumps([{'columns': [{'text': 'table'}], 'rows': [[name]], 'server': 's', 'queryId': 1}])
+            return response_handlers.BufferedResponse(body.encode('utf-8')), None
+
+        nsgql = NsgQLCommandLine(base_url='https://base_url', token='token', netid=1, statement_concurrency=3)
+        with mock.patch.object(nsgql, 'post_data', side_effect=post_data):
+            actual = testutils.run_cmd(nsgql, 'SELECT * FROM slow; SELECT * FROM bad; SELECT * FROM fast')
+        lines = actual.splitlines()
+        self.assertEqual(lines[3], '│ slow    │')
+        self.assertIn('ERROR: table bad does not exist', lines)
+        self.assertLess(lines.index('ERROR: table bad does not exist'), lines.index('│ fast    │'))
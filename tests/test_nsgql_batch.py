@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import testutils
+from nsgcli import nsgql_batch
+from nsgcli.nsgql_main import NsgQLCommandLine
+from nsgcli.response_handlers import BufferedResponse
+
+BATCH_FILE = """
+# nightly report
+devices: SELECT id, name FROM devices
+         ORDER BY name
+missing: SELECT x FROM foo
+"""
+
+
+class BatchTestCase(unittest.TestCase):
+
+    def test_parse_batch(self):
+        queries = nsgql_batch.parse_batch(BATCH_FILE.splitlines())
+        self.assertEqual(queries, [('devices', 'SELECT id, name FROM devices ORDER BY name'),
+                                   ('missing', 'SELECT x FROM foo')])
+
+    def test_parse_batch_errors(self):
+        for lines in [['  SELECT 1'], ['no query name'], ['a b: SELECT 1'], ['a: SELECT 1', 'a: SELECT 2']]:
+            with self.assertRaises(nsgql_batch.BatchError):
+                nsgql_batch.parse_batch(lines)
+
+    def test_run_batch(self):
+        fixture = testutils.read_file('nsgql_table_resp.json', as_text=False)
+
+        def post_data(queries, quiet=False):
+            if 'foo' in queries[0]:
+                return BufferedResponse(b'[{"error": "Table foo does not exist"}]'), None
+            return BufferedResponse(fixture), None
+
+        nsgql = NsgQLCommandLine(base_url='https://base_url', token='token', netid=1, export_format='csv')
+        with tempfile.TemporaryDirectory() as output_dir, \
+                mock.patch.object(nsgql, 'post_data', side_effect=post_data), testutils.capture_stdout() as capture:
+            runner = nsgql_batch.BatchRunner(nsgql, output_dir=output_dir, workers=2)
+            results = runner.run(nsgql_batch.parse_batch(BATCH_FILE.splitlines()))
+            with open(os.path.join(output_dir, 'devices.csv')) as f:
+                lines = f.read().splitlines()
+            self.assertFalse(os.path.exists(os.path.join(output_dir, 'missing.csv')))
+        self.assertEqual([r.name for r in results], ['devices', 'missing'])
+        self.assertEqual(results[0].rows, 3)
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(results[1].error, 'Server error: Table foo does not exist')
+        output = capture.stdout.getvalue()
+        self.assertIn('devices: 3 rows in', output)
+        self.assertIn('Queries: 2, failed: 1, workers: 2', output)
@@ -0,0 +1,43 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from requests import Session
+
+import testutils
+from nsgcli import nsgql_bench
+from nsgcli.nsgql_main import NsgQLCommandLine
+
+
+class BenchTestCase(unittest.TestCase):
+
+    def test_parse_bench_args(self):
+        self.assertEqual(nsgql_bench.parse_bench_args('10 concurrency=4 save=out.json SELECT a FROM b'),
+                         (10, 4, 'out.json', 'SELECT a FROM b'))
+        self.assertEqual(nsgql_bench.parse_bench_args('3 SELECT a FROM b'), (3, 1, None, 'SELECT a FROM b'))
+        for arg in ['', '10', 'x SELECT a FROM b', '0 SELECT a FROM b', '5 concurrency=2',
+                    '5 concurrency=0 SELECT a FROM b', '5 concurrency=-1 SELECT a FROM b']:
+            with self.assertRaises(nsgql_bench.BenchError):
+                nsgql_bench.parse_bench_args(arg)
+
+    def test_bench(self):
+        content = testutils.read_file('nsgql_table_resp.json', as_text=False)
+        nsgql = NsgQLCommandLine(base_url='https://base_url', token='token', netid=1)
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+                mock.patch.object(nsgql_bench, 'measure_connect', return_value=0.002), \
+                mock.patch.object(Session, 'post', side_effect=lambda *a, **kw: testutils.mock_response(
+                    200, content, None, fixed_chunk_size=100)):
+            save_file = os.path.join(tmp_dir, 'bench.json')
+            actual = testutils.run_cmd(nsgql, 'bench 5 concurrency=2 save={0} SELECT device FROM devices'.format(
+                save_file))
+            with open(save_file) as f:
+                saved = json.load(f)
+        for phase in nsgql_bench.PHASES:
+            self.assertIn('│ {0}'.format(phase), actual)
+        self.assertIn('Runs: 5, concurrency: 2, errors: 0', actual)
+        self.assertEqual(len(saved['samples']), 5)
+        self.assertEqual(saved['summary']['server']['p50'], 25.0)
+        self.assertEqual(saved['summary']['connect']['max'], 2.0)
+        self.assertEqual(saved['query'], 'SELECT device FROM devices')
@@ -0,0 +1,93 @@
+import unittest
+from unittest import mock
+
+import testutils
+from nsgcli import api
+from nsgcli import nsgql_paging
+from nsgcli.nsgql_main import NsgQLCommandLine
+
+ROWS = [['dev{0}'.format(i)] for i in range(7)]
+
+
+class PagingTestCase(unittest.TestCase):
+
+    def test_is_pageable(self):
+        self.assertTrue(nsgql_paging.is_pageable('SELECT id FROM devices WHERE name = "limit"'))
+        self.assertFalse(nsgql_paging.is_pageable('select id from devices limit 10'))
+        self.assertFalse(nsgql_paging.is_pageable('SHOW tables'))
+
+    def test_rows_combined_from_pages(self):
+        queries = []
+        failures = {'offset': 3}
+
+        def fetch_page(query):
+            queries.append(query)
+            offset, size = [int(x) for x in query.split('LIMIT')[1].split(',')]
+            if offset == 3 and failures['offset']:
+                failures['offset'] = 0
+                return None, api.ApiError('timeout')
+            return {'columns': [{'text': 'name'}], 'rows': ROWS[offset:offset + size], 'processingTimeMs': 5}, None
+
+        with mock.patch.object(nsgql_paging, 'RETRY_DELAY_SEC', 0):
+            table = nsgql_paging.PagedTable(fetch_page, 'SELECT name FROM devices', page_size=3, prefetch=2)
+            self.assertEqual(table.get('columns'), [{'text': 'name'}])
+            self.assertEqual(list(table.get('rows')), ROWS)
+        self.assertEqual(table.get('processingTimeMs'), 15)
+        self.assertIn('SELECT name FROM devices LIMIT 6, 3', queries)
+        self.assertEqual(queries.count('SELECT name FROM devices LIMIT 3, 3'), 2)
+
+    def test_has_order_by(self):
+        self.assertTrue(nsgql_paging.has_order_by('SELECT id FROM devices ORDER  BY id'))
+        self.assertFalse(nsgql_paging.has_order_by('SELECT id FROM devices WHERE name = "order by"'))
+
+    def test_first_page_error(self):
+        queries = []
+
+        def fetch_page(query):
+            queries.append(query)
+            return None, 'bad query'
+
+        table = nsgql_paging.PagedTable(fetch_page, 'SELECT x FROM y', page_size=3, retries=1)
+        # errors in the query are not retried
+        self.assertEqual(table.error, 'page 0 failed: bad query')
+        self.assertEqual(len(queries), 1)
+
+    def test_transient_errors_are_retried(self):
+        for error in [api.ApiError('connection reset'), api.ApiError('ERROR: internal error', 503)]:
+            with mock.patch.object(nsgql_paging, 'RETRY_DELAY_SEC', 0):
+                table = nsgql_paging.PagedTable(lambda q: (None, error), 'SELECT x FROM y', page_size=3, retries=1)
+            self.assertEqual(table.error, 'page 0 failed after 2 attempts: {0}'.format(error))
+        table = nsgql_paging.PagedTable(lambda q: (None, api.ApiError('ERROR: no such table', 400)),
+                                        'SELECT x FROM y', page_size=3, retries=1)
+        self.assertEqual(table.error, 'page 0 failed: ERROR: no such table')
+
+    def test_no_requests_past_short_page(self):
+        queries = []
+
+        def fetch_page(query):
+            queries.append(query)
+            offset, size = [int(x) for x in query.split('LIMIT')[1].split(',')]
+            return {'columns': [{'text': 'name'}], 'rows': ROWS[offset:offset + size]}, None
+
+        table = nsgql_paging.PagedTable(fetch_page, 'SELECT name FROM devices', page_size=5, prefetch=1)
+        self.assertEqual(list(table.get('rows')), ROWS)
+        self.assertEqual(queries, ['SELECT name FROM devices LIMIT 0, 5', 'SELECT name FROM devices LIMIT 5, 5'])
+
+    def test_nsgql_select_without_order_by_is_not_paged(self):
+        nsgql = NsgQLCommandLine(base_url='https://base_url', token='token', netid=1, page_size=2)
+        with mock.patch.object(nsgql, 'fetch_table') as fetch_table:
+            actual = testutils.run_cmd_with_mock('SELECT device FROM devices', 'post', 200,
+                                                 testutils.read_file('nsgql_table_resp.json', as_text=False),
+                                                 cmd=nsgql)
+        self.assertEqual(fetch_table.call_count, 0)
+        self.assertIn('WARNING: query has no ORDER BY', actual)
+        self.assertIn('│ dev1     │', actual)
+
+    def test_nsgql_paged_select(self):
+        nsgql = NsgQLCommandLine(base_url='https://base_url', token='token', netid=1, page_size=2)
+        with mock.patch.object(nsgql, 'fetch_table', side_effect=lambda q: (
+                {'columns': [{'text': 'name'}], 'rows': [['a'], ['b']] if q.endswith('0, 2') else [['c']],
+                 'server': 's1', 'queryId': 1}, None)):
+            actual = testutils.run_cmd(nsgql, 'SELECT name FROM devices ORDER BY name')
+        self.assertIn('│ c      │', actual)
+        self.assertIn('Count: 3, served by: s1', actual)
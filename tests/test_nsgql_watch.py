@@ -0,0 +1,78 @@
+import io
+import unittest
+
+from nsgcli import nsgql_watch
+from nsgcli import table_renderer
+
+COLUMNS = [{'text': 'device'}, {'text': 'address'}, {'text': 'value'}]
+
+
+def table(*rows):
+    return {'columns': COLUMNS, 'rows': [list(row) for row in rows]}
+
+
+class WatchTestCase(unittest.TestCase):
+
+    def test_parse_watch_args(self):
+        self.assertEqual(nsgql_watch.parse_watch_args('5 key=device,address count=3 SELECT device FROM cpuUtil'),
+                         (5.0, ['device', 'address'], 3, 'SELECT device FROM cpuUtil'))
+        self.assertEqual(nsgql_watch.parse_watch_args('0.5 SELECT a FROM b'), (0.5, None, None, 'SELECT a FROM b'))
+        for arg in ['', '5', 'x SELECT a FROM b', '0 SELECT a FROM b',
+                    '5 count=0 SELECT a FROM b', '5 count=-1 SELECT a FROM b', '5 count=x SELECT a FROM b']:
+            with self.assertRaises(nsgql_watch.WatchError):
+                nsgql_watch.parse_watch_args(arg)
+
+    def run_watcher(self, results, key_columns=None):
+        results = list(results)
+        out = io.StringIO()
+        watcher = nsgql_watch.QueryWatcher(lambda q: results.pop(0), 'SELECT *', 0.001, key_columns=key_columns,
+                                           out=out)
+        watcher.run(count=len(results))
+        return watcher, out.getvalue()
+
+    def test_redraw_only_changed_rows(self):
+        first = table(['dev1', '10.0.0.1', 12.5], ['dev2', '10.0.0.2', 7])
+        second = table(['dev1', '10.0.0.1', 12.5], ['dev2', '10.0.0.2', 9])
+        watcher, output = self.run_watcher([(first, None), (second, None)])
+        self.assertEqual(watcher.polls, 2)
+        self.assertEqual(watcher.changed, 1)
+        # the first result is printed as a table, the second one updates only the row of dev2
+        self.assertEqual(output.count('dev1'), 1)
+        self.assertEqual(output.count('dev2'), 2)
+        self.assertIn(table_renderer.HIGHLIGHT_START + '      9' + table_renderer.HIGHLIGHT_END, output)
+        # two lines up from the bottom border and the status line
+        self.assertIn(table_renderer.CURSOR_UP.format(3) + table_renderer.CLEAR_LINE + '│ dev2', output)
+
+    def test_redraw_table_when_rows_added(self):
+        first = table(['dev1', '10.0.0.1', 12.5])
+        second = table(['dev1', '10.0.0.1', 12.5], ['dev2', '10.0.0.2', 7])
+        watcher, output = self.run_watcher([(first, None), (second, None)], key_columns=['device'])
+        self.assertEqual(output.count('dev1'), 2)
+        self.assertIn(table_renderer.CURSOR_UP.format(6) + table_renderer.CLEAR_TO_END, output)
+        self.assertEqual(watcher.lines_drawn, 7)
+
+    def test_rows_with_same_key_values(self):
+        first = table(['dev1', 'cpu0', 12.5], ['dev1', 'cpu1', 7], ['dev2', 'cpu0', 3])
+        second = table(['dev1', 'cpu0', 12.5], ['dev1', 'cpu1', 8], ['dev2', 'cpu0', 3])
+        watcher, output = self.run_watcher([(first, None), (second, None)])
+        self.assertEqual(len(watcher.keys), 3)
+        self.assertIn('cpu1', output)
+        self.assertEqual(watcher.changed, 1)
+        # only the second row of dev1 is redrawn
+        self.assertEqual(output.count('cpu1'), 2)
+        self.assertEqual(output.count('cpu0'), 2)
+
+    def test_error_keeps_table(self):
+        first = table(['dev1', '10.0.0.1', 12.5])
+        watcher, output = self.run_watcher([(first, None), (None, 'timeout')], key_columns=['foo'])
+        self.assertIn('ERROR: key columns [\'foo\'] are not in the result', output)
+        self.assertIn('ERROR: timeout', output)
+
+    def test_highlight_cleared_when_row_does_not_change(self):
+        first = table(['dev1', '10.0.0.1', 12.5])
+        second = table(['dev1', '10.0.0.1', 13])
+        watcher, output = self.run_watcher([(first, None), (second, None), (second, None), (second, None)])
+        self.assertEqual(output.count(table_renderer.HIGHLIGHT_START), 1)
+        # the row is drawn once more without the highlight and is not touched after that
+        self.assertEqual(output.count('dev1'), 3)
+        self.assertEqual(watcher.highlighted, set())
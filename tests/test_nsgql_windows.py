@@ -0,0 +1,69 @@
+import json
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import testutils
+from nsgcli import nsgql_windows
+from nsgcli import timeseries
+from nsgcli.nsgql_main import NsgQLCommandLine
+from nsgcli.response_handlers import BufferedResponse
+
+HOUR = 3600 * 1000
+
+
+class WindowsTestCase(unittest.TestCase):
+
+    def test_parse_time(self):
+        now = 1700000000000
+        self.assertEqual(nsgql_windows.parse_time('now', now), now)
+        self.assertEqual(nsgql_windows.parse_time('now-1h', now), now - HOUR)
+        self.assertEqual(nsgql_windows.parse_time('-2d', now), now - 48 * HOUR)
+        self.assertEqual(nsgql_windows.parse_time('1641997800000', now), 1641997800000)
+        self.assertEqual(nsgql_windows.parse_time('2022-01-12T14:30:00Z', now), 1641997800000)
+        with self.assertRaises(nsgql_windows.WindowError):
+            nsgql_windows.parse_time('yesterday', now)
+
+    def test_split_range(self):
+        self.assertEqual(nsgql_windows.split_range(0, 25, 10), [(0, 10), (10, 20), (20, 25)])
+        with self.assertRaises(nsgql_windows.WindowError):
+            nsgql_windows.split_range(10, 10, 5)
+        self.assertEqual(nsgql_windows.parse_duration('6h'), 6 * HOUR)
+
+    def test_window_query(self):
+        self.assertEqual(nsgql_windows.window_query('SELECT ifInRate FROM ifInRate', 1, 2),
+                         'SELECT ifInRate FROM ifInRate WHERE time >= 1 AND time < 2')
+        self.assertEqual(nsgql_windows.window_query(
+            'SELECT ifInRate FROM ifInRate WHERE device = "a where b" OR device = "c" ORDER BY device;', 1, 2),
+            'SELECT ifInRate FROM ifInRate WHERE time >= 1 AND time < 2 AND '
+            '(device = "a where b" OR device = "c") ORDER BY device')
+        self.assertEqual(nsgql_windows.window_query('SELECT a FROM b GROUP BY c', 1, 2),
+                         'SELECT a FROM b WHERE time >= 1 AND time < 2 GROUP BY c')
+
+    def test_stitch(self):
+        first = [timeseries.Series('a', np.array([0, 10]), np.array([1.0, 2.0])),
+                 timeseries.Series('b', np.array([5]), np.array([7.0]))]
+        second = [timeseries.Series('b', np.array([10, 15]), np.array([8.0, 9.0])),
+                  timeseries.Series('a', np.array([10, 20]), np.array([2.0, 3.0]))]
+        result = timeseries.stitch([first, second])
+        self.assertEqual([s.name for s in result], ['a', 'b'])
+        self.assertEqual(result[0].times.tolist(), [0, 10, 20])
+        self.assertEqual(result[0].values.tolist(), [1.0, 2.0, 3.0])
+        self.assertEqual(result[1].times.tolist(), [5, 10, 15])
+
+    def test_nsgql_windowed(self):
+        def fetch_statement(query):
+            start = int(query.split('time >= ')[1].split(' ')[0])
+            end = int(query.split('time < ')[1].split(' ')[0])
+            # every window also returns the sample at its end, like a server with inclusive time range
+            datapoints = [[t / HOUR, t] for t in range(start, end + 1, HOUR)]
+            return BufferedResponse(json.dumps([{'target': 'dev1:eth0', 'datapoints': datapoints}]).encode()), None
+
+        nsgql = NsgQLCommandLine(base_url='https://base_url', token='token', netid=1, output_format='time_series',
+                                 time_from='0', time_to=str(10 * HOUR), window='3h')
+        with mock.patch.object(nsgql, 'fetch_statement', side_effect=fetch_statement) as fetch:
+            actual = testutils.run_cmd(nsgql, 'SELECT ifInRate FROM ifInRate')
+        self.assertEqual(fetch.call_count, 4)
+        result = json.loads(actual)
+        self.assertEqual([p[1] for p in result[0]['datapoints']], [h * HOUR for h in range(0, 11)])
@@ -0,0 +1,67 @@
+import tempfile
+import unittest
+from unittest import mock
+
+from requests import Session
+
+import testutils
+from nsgcli import query_cache
+from nsgcli.nsgql_main import NsgQLCommandLine
+
+nsgql_table_resp = testutils.read_file('nsgql_table_resp.json', as_text=False)
+
+
+class QueryCacheTestCase(unittest.TestCase):
+
+    def test_normalize_query(self):
+        self.assertEqual(query_cache.normalize_query('  SELECT  id,\n name FROM devices WHERE name = "a  b";'),
+                         'SELECT id, name FROM devices WHERE name = "a  b"')
+
+    def test_lru_eviction(self):
+        cache = query_cache.QueryCache(ttl_sec=60, max_entries=2)
+        cache.put('a', b'1')
+        cache.put('b', b'2')
+        cache.get('a')
+        cache.put('c', b'3')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a').content, b'1')
+        self.assertEqual(cache.get('c').content, b'3')
+
+    def test_ttl(self):
+        cache = query_cache.QueryCache(ttl_sec=10)
+        with mock.patch('time.time', return_value=1000.0):
+            cache.put('a', b'1')
+        with mock.patch('time.time', return_value=1005.0):
+            self.assertEqual(cache.get('a').age_sec, 5.0)
+        with mock.patch('time.time', return_value=1011.0):
+            self.assertIsNone(cache.get('a'))
+
+    def test_shared_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            query_cache.QueryCache(directory=directory).put('a', b'1')
+            self.assertEqual(query_cache.QueryCache(directory=directory).get('a').content, b'1')
+
+
+class NsgQLResultCacheTestCase(unittest.TestCase):
+
+    def test_cache_hit_and_miss(self):
+        nsgql = NsgQLCommandLine(base_url='https://base_url', token='token', netid=1,
+                                 result_cache=query_cache.QueryCache(ttl_sec=60))
+        actual = testutils.run_cmd_with_mock('SELECT device FROM devices', 'post', 200, nsgql_table_resp,
+                                             cmd=nsgql)
+        self.assertIn('query id: 42; cache: miss', actual)
+        actual = testutils.run_cmd_with_mock('SELECT  device FROM devices', 'post', 500, b'', cmd=nsgql)
+        self.assertIn('query id: 42; cache: hit (age 0 sec)', actual)
+        self.assertIn('│ dev1     │', actual)
+
+    def test_uncached_fetch_bypasses_cache(self):
+        nsgql = NsgQLCommandLine(base_url='https://base_url', token='token', netid=1,
+                                 result_cache=query_cache.QueryCache(ttl_sec=60))
+        testutils.run_cmd_with_mock('SELECT device FROM devices', 'post', 200, nsgql_table_resp, cmd=nsgql)
+        with mock.patch.object(Session, 'post') as mock_post:
+            mock_post.return_value = testutils.mock_response(200, nsgql_table_resp, None)
+            nsgql.fetch_table('SELECT device FROM devices')
+            self.assertEqual(mock_post.call_count, 0)
+            table, error = nsgql.fetch_uncached_table('SELECT device FROM devices')
+            self.assertIsNone(error)
+            self.assertEqual(mock_post.call_count, 1)
@@ -0,0 +1,30 @@
+import unittest
+
+from nsgcli import response_formatter
+
+
+class ResponseFormatterTestCase(unittest.TestCase):
+
+    def test_transformer_is_selected_once_per_column(self):
+        formatter = response_formatter.ResponseFormatter()
+        self.assertIs(formatter.column_transformer('cpuUsage'), formatter.column_transformer('cpuUsage'))
+
+    def test_format_duration(self):
+        self.assertEqual(response_formatter.format_duration(None), '-')
+        self.assertEqual(response_formatter.format_duration(42), '42s')
+        self.assertEqual(response_formatter.format_duration(205), '3m 25s')
+        self.assertEqual(response_formatter.format_duration(3725), '1h 02m')
+
+    def test_transform_value(self):
+        formatter = response_formatter.ResponseFormatter(time_format=response_formatter.TIME_FORMAT_ISO_UTC)
+        self.assertEqual(formatter.transform_value('cpuUsage', 12.5), '12.50 %')
+        self.assertEqual(formatter.transform_value('cpuUsage', 'NULL'), 'NULL')
+        self.assertEqual(formatter.transform_value('fsFreeSpace', 2048), '2.000 KiB')
+        self.assertEqual(formatter.transform_value('fsFreeSpace', 0), 0)
+        self.assertEqual(formatter.transform_value('processUptime', 3600), '1:00:00')
+        self.assertEqual(formatter.transform_value('time', 1650000000000), '2022-04-15 05:20:00')
+        self.assertEqual(formatter.transform_value('discoveryStartTime', '2022-01-12T14:30:00.746375Z'),
+                         '2022-01-12 14:30:00.746375')
+        self.assertEqual(formatter.transform_value('discoveryPingStatus', False), 'False')
+        self.assertEqual(formatter.transform_value('device', 'dev1   '), 'dev1')
+        self.assertEqual(formatter.transform_value('device', '*'), '*')
@@ -0,0 +1,30 @@
+import types
+import unittest
+from unittest import mock
+
+from nsgcli import response_handlers
+
+
+class JsonArrayResponseHandlerTestCase(unittest.TestCase):
+
+    def test_iter_data_yields_items_as_lines_arrive(self):
+        received = []
+
+        def lines(decode_unicode=False):
+            for line in ['[{"uuid": "1"}', '{"uuid": "2"}', ']']:
+                received.append(line)
+                yield line
+
+        response = mock.Mock()
+        response.iter_lines = lines
+        items = response_handlers.JsonArrayResponseHandler.iter_data(response)
+        self.assertIsInstance(items, types.GeneratorType)
+        self.assertEqual(next(items), {'uuid': '1'})
+        self.assertEqual(len(received), 1)
+        self.assertEqual(list(items), [{'uuid': '2'}])
+
+    def test_get_data(self):
+        response = mock.Mock()
+        response.iter_lines = mock.Mock(return_value=['[{"uuid": "1"}', '{"uuid": "2"}', ']'])
+        self.assertEqual(response_handlers.JsonArrayResponseHandler.get_data(response),
+                         [{'uuid': '1'}, {'uuid': '2'}])
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import threading
+import unittest
+
+import testutils
+from nsgcli import schema_cache
+from nsgcli.nsgql_main import NsgQLCommandLine
+
+TABLES = {'columns': [{'text': 'name'}], 'rows': [['devices'], ['ifInRate']]}
+DESCRIBE = {
+    'devices': {'columns': [{'text': 'name'}, {'text': 'type'}],
+                'rows': [['id', 'long'], ['name', 'string'], ['Vendor', 'tag']]},
+    'ifInRate': {'columns': [{'text': 'name'}], 'rows': [['device'], ['component'], ['metric']]},
+}
+
+
+class FakeServer(object):
+
+    def __init__(self):
+        self.queries = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def fetch(self, query):
+        self.release.wait(5)
+        self.queries.append(query)
+        if query == schema_cache.SHOW_TABLES_QUERY:
+            return TABLES, None
+        return DESCRIBE[query.split()[1]], None
+
+
+class SchemaCacheTestCase(unittest.TestCase):
+
+    def test_parse_describe(self):
+        self.assertEqual(schema_cache.parse_describe(DESCRIBE['devices']), (['id', 'name'], ['Vendor']))
+
+    def test_lookups_do_not_block(self):
+        server = FakeServer()
+        server.release.clear()
+        cache = schema_cache.SchemaCache(server.fetch)
+        # the server does not respond yet, lookups return immediately with what the cache has
+        self.assertEqual(cache.tables(), [])
+        self.assertEqual(cache.columns('devices'), ([], []))
+        server.release.set()
+        cache.refresh(wait=True)
+        self.assertEqual(cache.tables(), ['devices', 'ifInRate'])
+        self.assertEqual(cache.columns('devices'), (['id', 'name'], ['Vendor']))
+        self.assertEqual(cache.all_columns(), (['component', 'device', 'id', 'metric', 'name'], ['Vendor']))
+        # fresh data is not requested again
+        count = len(server.queries)
+        cache.tables()
+        cache.columns('devices')
+        cache.refresh(wait=True)
+        self.assertEqual(len([q for q in server.queries[count:] if q == schema_cache.SHOW_TABLES_QUERY]), 1)
+
+    def test_persistence_and_invalidate(self):
+        server = FakeServer()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = schema_cache.cache_file('https://base_url', 1, directory=tmp_dir)
+            cache = schema_cache.SchemaCache(server.fetch, path=path)
+            cache.refresh(wait=True)
+            self.assertTrue(os.path.exists(path))
+            loaded = schema_cache.SchemaCache(server.fetch, path=path)
+            self.assertEqual(loaded.columns('ifInRate'), (['device', 'component', 'metric'], []))
+            loaded.invalidate()
+            self.assertFalse(os.path.exists(path))
+            self.assertEqual(loaded.status()['tables'], 0)
+
+    def test_completion(self):
+        server = FakeServer()
+        cache = schema_cache.SchemaCache(server.fetch)
+        cache.refresh(wait=True)
+        nsgql = NsgQLCommandLine(base_url='https://base_url', token='token', netid=1, schema_cache=cache)
+        line = 'SELECT device FROM if'
+        self.assertEqual(nsgql.complete_SELECT('if', line, len(line) - 2, len(line)), ['ifInRate'])
+        line = 'select id, V FROM devices'
+        self.assertEqual(nsgql.complete_select('V', line, 11, 12), ['Vendor'])
+        line = 'describe de'
+        self.assertEqual(nsgql.complete_describe('de', line, 9, 11), ['devices'])
+        line = 'SELECT co'
+        self.assertEqual(nsgql.complete_SELECT('co', line, 7, 9), ['component'])
+        self.assertIn('Tables: 2, described: 2', testutils.run_cmd(nsgql, 'schema'))
@@ -0,0 +1,78 @@
+import unittest
+from unittest import mock
+
+import testutils
+from nsgcli import agent_commands
+from nsgcli import sub_command
+
+
+def reply(agent, lines, uuid='u1', exit_status=0):
+    return {'agent': agent, 'response': lines, 'exitStatus': exit_status, 'error': '', 'uuid': uuid}
+
+
+class CommonCommandTestCase(unittest.TestCase):
+
+    def run_common_command(self, replies, **kwargs):
+        cmd = sub_command.SubCommand('https://base_url', 'token', 1)
+        with mock.patch.object(sub_command.api, 'call', return_value=(iter(replies), None)):
+            with testutils.capture_stdout() as capture:
+                cmd.common_command('/request', **kwargs)
+        return capture.stdout.getvalue().splitlines()
+
+    def test_replies_in_arrival_order(self):
+        replies = [reply('b', ['1'], uuid='u2'), reply('a', ['2'], uuid='u1'), reply('c', ['3'], uuid='u3')]
+        self.assertEqual(self.run_common_command(replies), ['b | 1', 'a | 2', 'c | 3'])
+
+    def test_deduplicate_by_uuid(self):
+        replies = [reply('a', ['1']), reply('b', ['2']), reply('c', ['x'], exit_status=-1)]
+        self.assertEqual(self.run_common_command(replies, hide_errors=False),
+                         ['a | 1', 'c | x'])
+        self.assertEqual(self.run_common_command(replies, deduplicate_replies=False), ['a | 1', 'b | 2'])
+
+    def test_deduplicate_by_content(self):
+        replies = [reply('a', ['same'], uuid='u1'), reply('b', ['same'], uuid='u2'), reply('c', ['other'], uuid='u3')]
+        self.assertEqual(self.run_common_command(replies, deduplicate_by=sub_command.DEDUPLICATE_BY_CONTENT),
+                         ['a | same', 'c | other'])
+
+    def test_bounded_deduplicator(self):
+        deduplicator = sub_command.ReplyDeduplicator(max_entries=2)
+        self.assertFalse(deduplicator.is_duplicate({'uuid': '1'}, 'ok'))
+        self.assertTrue(deduplicator.is_duplicate({'uuid': '1'}, 'ok'))
+        self.assertFalse(deduplicator.is_duplicate({'uuid': '2'}, 'ok'))
+        self.assertFalse(deduplicator.is_duplicate({'uuid': '3'}, 'ok'))
+        # the oldest key has been forgotten
+        self.assertFalse(deduplicator.is_duplicate({'uuid': '1'}, 'ok'))
+
+
+class DedupOptionTestCase(unittest.TestCase):
+
+    def run_agent_command(self, line):
+        replies = [reply('a', ['same'], uuid='u1'), reply('b', ['same'], uuid='u2'), reply('c', ['other'], uuid='u3')]
+        cmd = agent_commands.AgentCommands('all', 'https://base_url', 'token', 1)
+        with mock.patch.object(sub_command.api, 'call', return_value=(iter(replies), None)) as call:
+            with testutils.capture_stdout() as capture:
+                cmd.onecmd(line)
+        return cmd, call, capture.stdout.getvalue().splitlines()
+
+    def test_dedup_by_content(self):
+        cmd, call, lines = self.run_agent_command('dedup=content get_configuration')
+        self.assertEqual(lines, ['a | same', 'c | other'])
+        self.assertIn('/get_configuration/agent/all', call.call_args[0][2])
+        # the option applies to one command only
+        self.assertEqual(cmd.deduplicate_by, sub_command.DEDUPLICATE_BY_UUID)
+
+    def test_dedup_by_uuid_is_default(self):
+        _, _, lines = self.run_agent_command('get_configuration')
+        self.assertEqual(lines, ['a | same', 'b | same', 'c | other'])
+
+    def test_invalid_dedup_option(self):
+        _, call, lines = self.run_agent_command('dedup=foo get_configuration')
+        self.assertEqual(call.call_count, 0)
+        self.assertIn('invalid value of option dedup', lines[0])
+
+
+class ReadNamesTestCase(unittest.TestCase):
+
+    def test_read_names(self):
+        lines = ['# after maintenance\n', 'dev1 dev2\n', '\n', 'dev3,dev1\n']
+        self.assertEqual(sub_command.read_names(lines), ['dev1', 'dev2', 'dev3'])
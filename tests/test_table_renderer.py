@@ -0,0 +1,52 @@
+import io
+import unittest
+
+import testutils
+from nsgcli import response_formatter
+from nsgcli import table_renderer
+
+
+class StreamingTableRendererTestCase(unittest.TestCase):
+
+    def render(self, rows, sample_size, overflow=table_renderer.OVERFLOW_TRUNCATE):
+        out = io.StringIO()
+        renderer = table_renderer.StreamingTableRenderer(['device', 'n'], rows[:sample_size], overflow=overflow,
+                                                         out=out)
+        renderer.print_header()
+        for row in rows:
+            renderer.print_row(row)
+        renderer.print_footer()
+        return out.getvalue().splitlines()
+
+    def test_widths_from_sample(self):
+        lines = self.render([['dev1', 1], ['dev2', 20]], sample_size=2)
+        self.assertEqual(lines, ['╒══════════╤═════╕',
+                                 '│ device   │   n │',
+                                 '╞══════════╪═════╡',
+                                 '│ dev1     │   1 │',
+                                 '│ dev2     │  20 │',
+                                 '╘══════════╧═════╛'])
+
+    def test_truncate_wide_value(self):
+        lines = self.render([['dev1', 1], ['very-long-device', 2]], sample_size=1)
+        self.assertEqual(lines[4], '│ very-lo… │   2 │')
+
+    def test_widen_column(self):
+        lines = self.render([['dev1', 1], ['very-long-device', 2]], sample_size=1,
+                            overflow=table_renderer.OVERFLOW_WIDEN)
+        self.assertEqual(lines[4], '╞══════════════════╪═════╡')
+        self.assertEqual(lines[5], '│ very-long-device │   2 │')
+
+
+class StreamingResponseFormatterTestCase(unittest.TestCase):
+
+    def test_large_table_is_streamed(self):
+        resp = {'columns': [{'text': 'device'}], 'rows': iter([['dev{0}'.format(i)] for i in range(5)]),
+                'server': 'nsg-api-1', 'processingTimeMs': 10, 'queryId': 1}
+        formatter = response_formatter.ResponseFormatter(stream_sample_size=2)
+        with testutils.capture_stdout() as capture:
+            formatter.print_result_as_table(resp)
+        lines = capture.stdout.getvalue().splitlines()
+        self.assertEqual(lines[3], '│ dev0     │')
+        self.assertEqual(lines[7], '│ dev4     │')
+        self.assertIn('Count: 5, served by: nsg-api-1', lines[9])
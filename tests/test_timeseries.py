@@ -0,0 +1,79 @@
+import json
+import unittest
+
+import numpy as np
+
+import testutils
+from nsgcli import timeseries
+from nsgcli.nsgql_main import NsgQLCommandLine
+
+
+def make_series(values, step_ms=60000):
+    times = np.arange(len(values), dtype=np.int64) * step_ms
+    return timeseries.Series('s', times, np.array(values, dtype=np.float64))
+
+
+class TimeSeriesTestCase(unittest.TestCase):
+
+    def test_decode_series(self):
+        data = json.loads(testutils.read_file('nsgql_time_series_resp.json'))
+        series, errors = timeseries.decode_series(data)
+        self.assertEqual([s.name for s in series], ['dev1:eth0', 'dev2:eth0'])
+        self.assertEqual(errors, ['Table foo does not exist'])
+        self.assertEqual(series[0].times.dtype, np.int64)
+        self.assertTrue(np.isnan(series[0].values[2]))
+        self.assertEqual(series[0].to_dict()['datapoints'][2], [None, 1641997920000])
+
+    def test_decode_unordered(self):
+        series = timeseries.Series.from_datapoints('s', [[2, 2000], [1, 1000]])
+        self.assertEqual(series.times.tolist(), [1000, 2000])
+        self.assertEqual(series.values.tolist(), [1, 2])
+
+    def test_lttb_keeps_peak(self):
+        values = np.sin(np.linspace(0, 20, 5000))
+        values[2500] = 10.0
+        result = timeseries.lttb(make_series(values), 100)
+        self.assertEqual(len(result), 100)
+        self.assertEqual(result.times[0], 0)
+        self.assertEqual(result.times[-1], 4999 * 60000)
+        self.assertIn(10.0, result.values)
+        self.assertTrue(np.all(np.diff(result.times) > 0))
+
+    def test_minmax(self):
+        values = np.arange(1000, dtype=np.float64) % 10
+        values[123] = -5
+        result = timeseries.minmax(make_series(values), 20)
+        self.assertLessEqual(len(result), 20)
+        self.assertIn(-5, result.values)
+        self.assertIn(9, result.values)
+        self.assertTrue(np.all(np.diff(result.times) > 0))
+
+    def test_short_series_not_downsampled(self):
+        series = make_series([1, np.nan, 3])
+        self.assertEqual(timeseries.lttb(series, 10).values.tolist(), [1, 3])
+        self.assertEqual(timeseries.minmax(series, 10).values.tolist(), [1, 3])
+
+    def test_sparkline_and_bars(self):
+        series = make_series([0, 1, 2, 3, 4, 5, 6, 7])
+        self.assertEqual(timeseries.sparkline(series, width=8), '▁▂▃▄▅▆▇█')
+        lines = timeseries.bar_chart(series, width=8, height=2)
+        self.assertEqual(lines, ['7 │    ▂▄▆█', '0 │▁▃▅▇████'])
+        self.assertEqual(timeseries.sparkline(make_series([np.nan]), width=3), '   ')
+
+    def test_nsgql_chart(self):
+        content = testutils.read_file('nsgql_time_series_resp.json', as_text=False)
+        nsgql = NsgQLCommandLine(base_url='https://base_url', token='token', netid=1, output_format='time_series',
+                                 downsample=timeseries.DOWNSAMPLE_LTTB, points=3, chart=timeseries.CHART_SPARKLINE)
+        actual = testutils.run_cmd_with_mock('SELECT ifInRate FROM ifInRate', 'post', 200, content, cmd=nsgql)
+        self.assertIn('Server error: Table foo does not exist', actual)
+        self.assertIn('dev1:eth0: 3 points (of 6)', actual)
+        self.assertIn('dev2:eth0: 2 points', actual)
+
+    def test_nsgql_downsample_json(self):
+        content = testutils.read_file('nsgql_time_series_resp.json', as_text=False)
+        nsgql = NsgQLCommandLine(base_url='https://base_url', token='token', netid=1, output_format='time_series',
+                                 downsample=timeseries.DOWNSAMPLE_MINMAX, points=2)
+        actual = testutils.run_cmd_with_mock('SELECT ifInRate FROM ifInRate', 'post', 200, content, cmd=nsgql)
+        result = json.loads(actual.splitlines()[-1])
+        self.assertEqual(result[0], {'target': 'dev1:eth0', 'datapoints': [[1.0, 1641997800000],
+                                                                           [8.0, 1641997980000]]})
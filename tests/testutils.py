@@ -1,5 +1,6 @@
 import contextlib
 import io
+import json
 import os
 from pathlib import Path
 from unittest import mock
@@ -55,11 +56,21 @@ def read_file(file_name, as_text=True):
         return file_path.read_bytes()
 
 
-def mock_response(status_code, content, content_type):
+def iter_content(content, chunk_size=1, decode_unicode=False):
+    if decode_unicode and isinstance(content, bytes):
+        content = content.decode('utf-8')
+    for idx in range(0, len(content), chunk_size):
+        yield content[idx:idx + chunk_size]
+
+
+def mock_response(status_code, content, content_type, fixed_chunk_size=None):
     mock_resp = mock.Mock()
     mock_resp.status_code = status_code
     mock_resp.content = content
     mock_resp.encoding = 'utf-8'
+    mock_resp.json = lambda: json.loads(content)
+    mock_resp.iter_content = lambda chunk_size=1, decode_unicode=False: iter_content(
+        content, chunk_size if fixed_chunk_size is None else fixed_chunk_size, decode_unicode)
     if content_type is None:
         mock_resp.headers = {'Content-Type': 'application/json'}
     else:
@@ -67,12 +78,13 @@ def mock_response(status_code, content, content_type):
     return mock_resp
 
 
-def run_cmd_with_mock(cmdline, method, status, content, content_type=None):
+def run_cmd_with_mock(cmdline, method, status, content, content_type=None, cmd=None, fixed_chunk_size=None):
     with mock.patch.object(Session, method) as mock_get:
-        mock_resp = mock_response(status, content, content_type)
+        mock_resp = mock_response(status, content, content_type, fixed_chunk_size=fixed_chunk_size)
         mock_get.return_value = mock_resp
         mock_get.return_value.__enter__ = mock_resp
         mock_get.return_value.__exit__ = mock.Mock(return_value=False)
-        nsgcli = get_nsgcli()
-        actual = run_cmd(nsgcli, cmdline)
+        if cmd is None:
+            cmd = get_nsgcli()
+        actual = run_cmd(cmd, cmdline)
         return actual